@@ -1,7 +1,8 @@
 import sqlite3
+import threading
 from datetime import datetime
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import json
 import os
 from pathlib import Path
@@ -18,6 +19,12 @@ class DatabaseManager:
         
         self.db_path = str(db_path)
         self.conn = sqlite3.connect(self.db_path)
+        # Tables written off the event loop (travel cache, LLM call log) go
+        # through a connection per thread, so their commits can never end a
+        # transaction that is open on self.conn (e.g. a batch in log_assignments)
+        self._thread_local = threading.local()
+        self._thread_conns: List[sqlite3.Connection] = []
+        self._thread_conns_lock = threading.Lock()
         self.create_tables()
 
     def create_tables(self):
@@ -90,10 +97,25 @@ class DatabaseManager:
                 travel_time INTEGER,
                 priority_score REAL,
                 reasoning TEXT,
+                assignment_date TEXT,
+                shift TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
         
+        # Add date columns to assignments tables created before the weekly horizon
+        cursor.execute("PRAGMA table_info(assignments)")
+        assignment_columns = {row[1] for row in cursor.fetchall()}
+        if 'assignment_date' not in assignment_columns:
+            cursor.execute("ALTER TABLE assignments ADD COLUMN assignment_date TEXT")
+            cursor.execute("UPDATE assignments SET assignment_date = date(created_at)")
+        if 'shift' not in assignment_columns:
+            cursor.execute("ALTER TABLE assignments ADD COLUMN shift TEXT")
+        
+        # Indexes for range queries over the scheduling horizon
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_assignments_employee_date ON assignments (employee_id, assignment_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_assignments_date_shift ON assignments (assignment_date, shift)")
+        
         # Table for operations log
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS operations_log (
@@ -117,6 +139,47 @@ class DatabaseManager:
             )
         ''')
         
+        # Rolling log of LLM calls for latency and spend analysis
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS llm_calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                operation TEXT NOT NULL,
+                model TEXT,
+                source TEXT NOT NULL,
+                duration_ms REAL NOT NULL,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                retries INTEGER,
+                cost_usd REAL,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Table for cached prompt extraction results (keyed on the normalized prompt)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS extraction_cache (
+                cache_key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Table for cached travel times (keyed on normalized addresses, mode and time-of-day bucket)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS travel_cache (
+                origin TEXT NOT NULL,
+                destination TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                time_bucket INTEGER NOT NULL,
+                minutes INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (origin, destination, mode, time_bucket)
+            )
+        ''')
+        
         self.conn.commit()
 
     def store_employees(self, employees: List[Dict[str, Any]]):
@@ -194,30 +257,53 @@ class DatabaseManager:
         self.conn.commit()
         logger.info(f"Logged data upload: {filename} - {employees_count} employees, {patients_count} patients")
 
-    def log_assignment(self, assignment: Dict[str, Any]):
+    def log_assignment(self, assignment: Dict[str, Any]) -> int:
+        """Store an assignment and return its row id"""
+        return self.log_assignments([assignment])[0]
+
+    def log_assignments(self, assignments: List[Dict[str, Any]]) -> List[int]:
+        """Store several assignments in one transaction and return their row ids"""
         cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT INTO assignments (
-                employee_id, employee_name, patient_id, patient_name, service_type, assigned_time,
-                start_time, end_time, duration, travel_time,
-                priority_score, reasoning
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            assignment['employee_id'],
-            assignment['employee_name'],
-            assignment['patient_id'],
-            assignment['patient_name'],
-            assignment['service_type'],
-            assignment['assigned_time'],
-            assignment.get('start_time'),
-            assignment.get('end_time'),
-            assignment.get('estimated_duration'),
-            assignment.get('travel_time'),
-            assignment.get('priority_score'),
-            assignment.get('assignment_reason')
-        ))
+        row_ids = []
+        try:
+            for assignment in assignments:
+                cursor.execute('''
+                    INSERT INTO assignments (
+                        employee_id, employee_name, patient_id, patient_name, service_type, assigned_time,
+                        start_time, end_time, duration, travel_time,
+                        priority_score, reasoning, assignment_date, shift
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    assignment['employee_id'],
+                    assignment['employee_name'],
+                    assignment['patient_id'],
+                    assignment['patient_name'],
+                    assignment['service_type'],
+                    assignment['assigned_time'],
+                    assignment.get('start_time'),
+                    assignment.get('end_time'),
+                    assignment.get('estimated_duration'),
+                    assignment.get('travel_time'),
+                    assignment.get('priority_score'),
+                    assignment.get('assignment_reason'),
+                    assignment.get('assignment_date'),
+                    assignment.get('shift')
+                ))
+                row_ids.append(cursor.lastrowid)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        for assignment in assignments:
+            logger.info(f"Logged assignment: {assignment['employee_id']} to {assignment['patient_id']}")
+        return row_ids
+
+    def delete_assignment(self, assignment_id: int):
+        """Delete an assignment by row id"""
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM assignments WHERE id = ?", (assignment_id,))
         self.conn.commit()
-        logger.info(f"Logged assignment: {assignment['employee_id']} to {assignment['patient_id']}")
+        logger.info(f"Deleted assignment {assignment_id}")
 
     def log_operation(self, operation_type: str, description: str, details: Dict[str, Any] = None):
         cursor = self.conn.cursor()
@@ -234,6 +320,118 @@ class DatabaseManager:
         columns = [col[0] for col in cursor.description]
         return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
+    def get_assignments_between(self, start_date: str, end_date: str) -> List[Dict]:
+        """Get all assignments between two dates (inclusive)"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT * FROM assignments
+            WHERE assignment_date BETWEEN ? AND ?
+            ORDER BY assignment_date, start_time
+        ''', (start_date, end_date))
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_employee_assignments(self, employee_id: str, start_date: str, end_date: str) -> List[Dict]:
+        """Get an employee's assignments between two dates (inclusive)"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT * FROM assignments
+            WHERE employee_id = ? AND assignment_date BETWEEN ? AND ?
+            ORDER BY assignment_date, start_time
+        ''', (employee_id, start_date, end_date))
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_shift_assignments(self, assignment_date: str, shift: str) -> List[Dict]:
+        """Get all assignments of one shift on one day"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT * FROM assignments
+            WHERE assignment_date = ? AND shift = ?
+            ORDER BY start_time
+        ''', (assignment_date, shift))
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_cached_extraction(self, cache_key: str, now: float) -> Optional[Dict[str, Any]]:
+        """Get an unexpired extraction result and its expiry time"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT result, expires_at FROM extraction_cache WHERE cache_key = ? AND expires_at > ?",
+            (cache_key, now)
+        )
+        row = cursor.fetchone()
+        return {"result": json.loads(row[0]), "expires_at": row[1]} if row else None
+
+    def store_cached_extraction(self, cache_key: str, result: Dict[str, Any], expires_at: float):
+        """Store an extraction result, dropping expired entries"""
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM extraction_cache WHERE expires_at <= ?", (datetime.now().timestamp(),))
+        cursor.execute(
+            "INSERT OR REPLACE INTO extraction_cache (cache_key, result, expires_at) VALUES (?, ?, ?)",
+            (cache_key, json.dumps(result), expires_at)
+        )
+        self.conn.commit()
+
+    def _thread_conn(self) -> sqlite3.Connection:
+        """This thread's connection for the tables written off the event loop"""
+        conn = getattr(self._thread_local, "conn", None)
+        if conn is None:
+            # Only used by the thread that opened it; close() may run on another
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._thread_local.conn = conn
+            with self._thread_conns_lock:
+                self._thread_conns.append(conn)
+        return conn
+
+    def get_cached_travel(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """Get cached travel minutes and their expiry time (expired entries included)"""
+        cursor = self._thread_conn().cursor()
+        cursor.execute(
+            "SELECT minutes, expires_at FROM travel_cache WHERE origin = ? AND destination = ? AND mode = ? AND time_bucket = ?",
+            key
+        )
+        row = cursor.fetchone()
+        return {"minutes": row[0], "expires_at": row[1]} if row else None
+
+    def store_cached_travel_many(self, entries: List[tuple]):
+        """Store (key, minutes, expires_at) entries, keyed on (origin, destination, mode, time_bucket), in one transaction"""
+        conn = self._thread_conn()
+        try:
+            conn.executemany('''
+                INSERT OR REPLACE INTO travel_cache (origin, destination, mode, time_bucket, minutes, expires_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', [(*key, minutes, expires_at) for key, minutes, expires_at in entries])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def log_llm_calls(self, calls: List[Dict[str, Any]], max_rows: int = 10000):
+        """Store a batch of LLM calls in one transaction, keeping only the newest max_rows rows"""
+        conn = self._thread_conn()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT INTO llm_calls (operation, model, source, duration_ms, prompt_tokens, completion_tokens, retries, cost_usd, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(
+                call["operation"], call.get("model"), call["source"], call["duration_ms"],
+                call["prompt_tokens"], call["completion_tokens"], call["retries"], call.get("cost_usd", 0.0), call.get("error")
+            ) for call in calls])
+            cursor.execute("DELETE FROM llm_calls WHERE id <= (SELECT MAX(id) FROM llm_calls) - ?", (max_rows,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def get_llm_calls(self, limit: int = 100) -> List[Dict]:
+        """Most recent LLM calls, newest first"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT * FROM llm_calls ORDER BY id DESC LIMIT ?", (limit,))
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
     def get_logs(self) -> List[Dict]:
         cursor = self.conn.cursor()
         cursor.execute("SELECT * FROM operations_log ORDER BY created_at DESC")
@@ -263,8 +461,15 @@ class DatabaseManager:
         cursor.execute("DELETE FROM assignments")
         cursor.execute("DELETE FROM operations_log")
         cursor.execute("DELETE FROM data_uploads")
+        cursor.execute("DELETE FROM extraction_cache")
+        cursor.execute("DELETE FROM llm_calls")
+        cursor.execute("DELETE FROM travel_cache")
         self.conn.commit()
         logger.info("Cleared all data from database")
 
     def close(self):
+        with self._thread_conns_lock:
+            for conn in self._thread_conns:
+                conn.close()
+            self._thread_conns.clear()
         self.conn.close() 
\ No newline at end of file
@@ -0,0 +1 @@
+# Development and load-testing tools for the AI Rota System 
\ No newline at end of file
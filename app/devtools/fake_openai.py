@@ -0,0 +1,203 @@
+"""
+Local stand-in for the OpenAI chat-completions API, for load and latency
+testing without network access or spend.
+
+Answers are deterministic and follow the prompts OpenAIService sends:
+extraction prompts are read with the local prompt parser and selection
+prompts pick the candidate with the shortest travel time. Latency and error
+rates are configurable, and streamed requests ("stream": true) receive the
+answer in small chunks.
+
+Run it and point the backend at it:
+
+    python -m app.devtools.fake_openai --port 8100 --latency lognormal:800:0.4 --error-rate 0.02
+    OPENAI_BASE_URL=http://localhost:8100/v1 uvicorn app.main:app
+"""
+from typing import Dict, List, Any, Optional
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from ..services.prompt_parser import PromptParser
+from ..services.prompt_compiler import (
+    SELECTION_PREFIX, BATCH_SELECTION_PREFIX, estimate_tokens, read_table
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyModel:
+    """
+    Response latency in milliseconds from a spec string:
+    "fixed:MS", "uniform:MIN:MAX" or "lognormal:MEDIAN:SIGMA"
+    """
+
+    def __init__(self, spec: str = "fixed:0", rng: Optional[random.Random] = None):
+        self.spec = spec
+        self.rng = rng or random.Random()
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(param) for param in params]
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2}
+        if kind not in expected or len(self.params) != expected[kind]:
+            raise ValueError(f"Invalid latency spec: {spec}")
+
+    def sample_ms(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(*self.params)
+        median, sigma = self.params
+        return self.rng.lognormvariate(math.log(max(median, 1e-3)), sigma)
+
+
+def _by_travel(candidates: Dict[str, float]) -> List[str]:
+    """Candidate IDs ordered by travel time, then ID"""
+    return sorted(candidates, key=lambda emp_id: (candidates[emp_id], emp_id))
+
+
+def answer(messages: List[Dict[str, str]], parser: PromptParser) -> Dict[str, Any]:
+    """Deterministic answer for one of OpenAIService's prompts"""
+    system = next((m["content"] for m in messages if m["role"] == "system"), "")
+    user = next((m["content"] for m in messages if m["role"] == "user"), "")
+
+    if "Extract the following information" in system:
+        return parser.parse(user)["details"]
+
+    if system == BATCH_SELECTION_PREFIX:
+        selections = []
+        for request in read_table(user, "Requests:"):
+            candidates = dict(item.split(":") for item in request["candidates"].split())
+            ranked = _by_travel({emp_id: int(minutes) for emp_id, minutes in candidates.items()})
+            if ranked:
+                selections.append({
+                    "request_id": request["request_id"],
+                    "employee_id": ranked[0],
+                    "reasoning": "Shortest travel time among candidates",
+                    "priority_score": 7,
+                    "estimated_duration": 30,
+                    "ranked_employee_ids": ranked[:3]
+                })
+        return {"selections": selections}
+
+    if system == SELECTION_PREFIX:
+        travel = {row["id"]: int(row["travel_min"]) for row in read_table(user, "Candidates:")}
+        ranked = _by_travel(travel)
+        return {
+            "employee_id": ranked[0] if ranked else None,
+            "reasoning": "Shortest travel time among qualified employees",
+            "priority_score": 7,
+            "estimated_travel_time": travel[ranked[0]] if ranked else 15,
+            "estimated_duration": 30,
+            "ranked_employee_ids": ranked[:5]
+        }
+
+    return {
+        "conflicts": [],
+        "efficiency_score": 7,
+        "suggestions": [],
+        "workload_balance": "Balanced"
+    }
+
+
+def create_app(
+    latency: str = "fixed:0",
+    error_rate: float = 0.0,
+    seed: Optional[int] = None,
+    token_ms: float = 0.0
+) -> FastAPI:
+    """
+    Build the fake API. Errors are split between 500 and 429 responses.
+    Streamed answers are sent in 8-character chunks, token_ms apart.
+    """
+    rng = random.Random(seed)
+    latency_model = LatencyModel(latency, rng)
+    parser = PromptParser()
+    stats = {"requests": 0, "errors": 0}
+    app = FastAPI(title="Fake OpenAI API")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        await asyncio.sleep(latency_model.sample_ms() / 1000)
+
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            status = rng.choice([500, 429])
+            return JSONResponse(
+                status_code=status,
+                content={"error": {"message": "Simulated failure", "type": "server_error" if status == 500 else "rate_limit_error"}}
+            )
+
+        messages = body.get("messages", [])
+        content = json.dumps(answer(messages, parser))
+        prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in messages)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": estimate_tokens(content),
+            "total_tokens": prompt_tokens + estimate_tokens(content)
+        }
+        completion = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-3.5-turbo")
+        }
+
+        if body.get("stream"):
+            async def chunks():
+                pieces = [content[i:i + 8] for i in range(0, len(content), 8)]
+                for i, piece in enumerate(pieces):
+                    delta = {"role": "assistant", "content": piece} if i == 0 else {"content": piece}
+                    yield "data: " + json.dumps(dict(completion, object="chat.completion.chunk", choices=[
+                        {"index": 0, "delta": delta, "finish_reason": None}
+                    ])) + "\n\n"
+                    await asyncio.sleep(token_ms / 1000)
+                yield "data: " + json.dumps(dict(completion, object="chat.completion.chunk", choices=[
+                    {"index": 0, "delta": {}, "finish_reason": "stop"}
+                ])) + "\n\n"
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    yield "data: " + json.dumps(dict(completion, object="chat.completion.chunk", choices=[], usage=usage)) + "\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+
+        return dict(completion, object="chat.completion", usage=usage, choices=[{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }])
+
+    @app.get("/stats")
+    async def get_stats():
+        return dict(stats, latency=latency, error_rate=error_rate)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat-completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", default=os.getenv("FAKE_OPENAI_LATENCY", "fixed:0"),
+                        help='"fixed:MS", "uniform:MIN:MAX" or "lognormal:MEDIAN:SIGMA" (milliseconds)')
+    parser.add_argument("--error-rate", type=float, default=float(os.getenv("FAKE_OPENAI_ERROR_RATE", "0")))
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--token-ms", type=float, default=float(os.getenv("FAKE_OPENAI_TOKEN_MS", "0")),
+                        help="Delay between streamed chunks (milliseconds)")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(args.latency, args.error_rate, args.seed, args.token_ms), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
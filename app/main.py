@@ -1,15 +1,29 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
+import json
 import os
+import time
 from pathlib import Path
 
 from .services.data_processor import DataProcessor
 from .services.openai_service import OpenAIService
+from .services.extraction_cache import ExtractionCache
+from .services.llm_metrics import LLMMetrics
+from .services.prompt_parser import PromptParser
 from .services.rota_service import RotaService
+from .services.simulation_service import SimulationService
+from .services.request_coalescer import RequestCoalescer, IdempotencyConflict, request_fingerprint
 from .services.travel_service import TravelService
-from .models.schemas import RotaRequest, RotaResponse, EmployeeAssignment
+from .services.travel_cache import TravelCache
+from .services.schedule_horizon import week_dates
+from .models.schemas import (
+    RotaRequest, RotaResponse, EmployeeAssignment, ConfirmAlternativeRequest,
+    BatchRotaRequest, BatchRotaResponse, SimulationRequest
+)
 from .database import DatabaseManager
 
 app = FastAPI(
@@ -30,14 +44,31 @@ app.add_middleware(
 # Initialize services
 db_manager = DatabaseManager()
 data_processor = DataProcessor(db_manager)
-openai_service = OpenAIService()
-travel_service = TravelService()
+openai_service = OpenAIService(
+    extraction_cache=ExtractionCache(
+        db_manager=db_manager if os.getenv("OPENAI_EXTRACTION_CACHE_PERSIST", "false").lower() == "true" else None
+    ),
+    prompt_parser=PromptParser(patient_ids=lambda: [patient.PatientID for patient in data_processor.patients]),
+    metrics=LLMMetrics(db_manager=db_manager)
+)
+travel_service = TravelService(
+    cache=TravelCache(
+        db_manager=db_manager if os.getenv("TRAVEL_CACHE_PERSIST", "true").lower() == "true" else None
+    )
+)
 rota_service = RotaService(data_processor, openai_service, db_manager, travel_service)
+simulation_service = SimulationService(rota_service)
+assignment_coalescer = RequestCoalescer(ttl_seconds=float(os.getenv("ROTA_IDEMPOTENCY_TTL_SECONDS", "600")))
 
 # Ensure input_files directory exists
 INPUT_FILES_DIR = Path("/app/input_files")
 INPUT_FILES_DIR.mkdir(exist_ok=True)
 
+@app.on_event("shutdown")
+async def shutdown():
+    await openai_service.close()
+    rota_service.close()
+
 @app.get("/")
 async def root():
     return {"message": "AI Rota System for Healthcare is running - Development Mode Active!"}
@@ -87,10 +118,13 @@ async def upload_data(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
 @app.post("/assign-employee", response_model=RotaResponse)
-async def assign_employee(request: RotaRequest):
+async def assign_employee(request: RotaRequest, idempotency_key: Optional[str] = Header(default=None)):
     """
     Assign an employee to a patient based on the requirements.
     Example: "The patient P001 is required Exercise today can you assign available employee."
+    
+    Send an Idempotency-Key header to make retries safe: a repeated key returns
+    the original result. Identical prompts already in flight share one run.
     """
     try:
         # Check if we have data loaded
@@ -100,15 +134,25 @@ async def assign_employee(request: RotaRequest):
                 detail="No data loaded. Please upload employee and patient data first."
             )
         
-        # Process the assignment request
-        assignment = await rota_service.process_assignment_request(request.prompt)
+        # Process the assignment request, coalescing duplicates
+        fingerprint = request_fingerprint(request.prompt)
+        result = await assignment_coalescer.run(
+            key=f"key:{idempotency_key}" if idempotency_key else f"prompt:{fingerprint}",
+            fingerprint=fingerprint,
+            factory=lambda: rota_service.propose_assignment(request.prompt),
+            cache_result=idempotency_key is not None
+        )
         
         return RotaResponse(
             success=True,
             message="Employee assigned successfully",
-            assignment=assignment
+            assignment=result["assignment"],
+            alternative_options=result["alternatives"] or None,
+            proposal_id=result["proposal_id"]
         )
     
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         return RotaResponse(
             success=False,
@@ -116,14 +160,261 @@ async def assign_employee(request: RotaRequest):
             assignment=None
         )
 
+@app.post("/assign-employee/stream")
+async def assign_employee_stream(request: RotaRequest, idempotency_key: Optional[str] = Header(default=None)):
+    """
+    Streaming variant of /assign-employee over Server-Sent Events. Stages are
+    sent as they complete: accepted, parsed, shortlist, travel_times, token
+    (pieces of the AI's answer as it is generated), selected, and finally
+    result (the /assign-employee response body) or error.
+    
+    Closing the connection cancels the request, unless a duplicate request is
+    still waiting on the same run; the assignment is only committed after the
+    selected event. Idempotency-Key works as for /assign-employee: repeats and
+    duplicates in flight only receive the result.
+    """
+    if not data_processor.has_data():
+        raise HTTPException(
+            status_code=400,
+            detail="No data loaded. Please upload employee and patient data first."
+        )
+    
+    started = time.perf_counter()
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def sse(stage: str, data) -> str:
+        payload = {"elapsed_ms": round((time.perf_counter() - started) * 1000, 2), "data": data}
+        return f"event: {stage}\ndata: {json.dumps(payload, default=str)}\n\n"
+    
+    async def run():
+        try:
+            fingerprint = request_fingerprint(request.prompt)
+            result = await assignment_coalescer.run(
+                key=f"key:{idempotency_key}" if idempotency_key else f"prompt:{fingerprint}",
+                fingerprint=fingerprint,
+                factory=lambda: rota_service.propose_assignment(
+                    request.prompt,
+                    on_event=lambda stage, data: events.put_nowait((stage, data))
+                ),
+                cache_result=idempotency_key is not None
+            )
+            response = RotaResponse(
+                success=True,
+                message="Employee assigned successfully",
+                assignment=result["assignment"],
+                alternative_options=result["alternatives"] or None,
+                proposal_id=result["proposal_id"]
+            )
+            events.put_nowait(("result", response.dict()))
+        except asyncio.CancelledError:
+            response = RotaResponse(success=False, message="Assignment request was cancelled")
+            events.put_nowait(("error", response.dict()))
+            raise
+        except Exception as e:
+            response = RotaResponse(success=False, message=f"Error processing assignment: {str(e)}")
+            events.put_nowait(("error", response.dict()))
+    
+    async def stream():
+        task = asyncio.create_task(run())
+        try:
+            yield sse("accepted", {"prompt": request.prompt})
+            while True:
+                stage, data = await events.get()
+                yield sse(stage, data)
+                if stage in ("result", "error"):
+                    break
+        finally:
+            # The client disconnected before the end: stop the remaining stages
+            if not task.done():
+                task.cancel()
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/assign-employee/confirm", response_model=RotaResponse)
+async def confirm_alternative(request: ConfirmAlternativeRequest):
+    """
+    Replace an assignment with one of the alternative options returned with it,
+    without re-running extraction or scoring.
+    """
+    try:
+        assignment = rota_service.confirm_alternative(request.proposal_id, request.employee_id)
+        return RotaResponse(
+            success=True,
+            message="Alternative assignment confirmed",
+            assignment=assignment
+        )
+    except Exception as e:
+        return RotaResponse(
+            success=False,
+            message=f"Error confirming alternative: {str(e)}",
+            assignment=None
+        )
+
+@app.post("/assign-employees", response_model=BatchRotaResponse)
+async def assign_employees(request: BatchRotaRequest):
+    """
+    Assign employees for a batch of requests (prompts or structured items).
+    Requests are solved jointly and committed in one transaction.
+    """
+    try:
+        if not data_processor.has_data():
+            raise HTTPException(
+                status_code=400,
+                detail="No data loaded. Please upload employee and patient data first."
+            )
+
+        result = await rota_service.process_batch_requests(request.requests)
+        assigned = sum(1 for item in result["results"] if item["success"])
+        return BatchRotaResponse(
+            success=assigned > 0,
+            message=f"Assigned {assigned} of {len(request.requests)} requests",
+            results=result["results"],
+            timing_ms=result["timing_ms"]
+        )
+
+    except Exception as e:
+        return BatchRotaResponse(
+            success=False,
+            message=f"Error processing batch assignment: {str(e)}",
+            results=[]
+        )
+
 @app.post("/generate-weekly-rota")
-async def generate_weekly_rota():
+async def generate_weekly_rota(
+    partitioned: bool = False,
+    partition_by: str = "region",
+    week_start: Optional[str] = None,
+    days: int = 7
+):
+    """
+    Generate the rota for each day from week_start (YYYY-MM-DD, default today).
+    With partitioned=true each day is split (by postcode region, or partition_by=day
+    for whole days) and the partitions are solved in parallel worker processes.
+    """
     try:
-        assignments = await rota_service.generate_weekly_schedule()
+        assignments = await rota_service.generate_weekly_schedule(
+            partitioned=partitioned,
+            partition_by=partition_by,
+            week_start=week_start,
+            days=days
+        )
         return {"success": True, "assignments": [a.dict() for a in assignments]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating weekly rota: {str(e)}")
 
+@app.post("/simulate")
+async def simulate(request: SimulationRequest):
+    """
+    Run what-if scenarios (e.g. an employee off on Friday, extra requests, a
+    weekly rota) against snapshots of the live rota without persisting anything.
+    Returns a diff and metrics against live state for each scenario.
+    """
+    try:
+        if not data_processor.has_data():
+            raise HTTPException(
+                status_code=400,
+                detail="No data loaded. Please upload employee and patient data first."
+            )
+        return {"scenarios": await simulation_service.run_scenarios(request.scenarios)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error running simulation: {str(e)}")
+
+@app.get("/schedule/employee/{employee_id}")
+async def get_employee_week(employee_id: str, start_date: Optional[str] = None, days: int = 7):
+    """Get an employee's assignments over a date range (default: the week from today)"""
+    try:
+        dates = week_dates(start_date, days)
+        assignments = rota_service.employee_assignments(employee_id, dates[0], dates[-1])
+        return {"employee_id": employee_id, "start_date": dates[0], "end_date": dates[-1], "assignments": [a.dict() for a in assignments]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching employee schedule: {str(e)}")
+
+@app.get("/schedule/shift")
+async def get_shift_schedule(date: str, shift: str):
+    """Get all assignments of one shift (Breakfast/Lunch/Evening) on one day"""
+    try:
+        assignments = rota_service.shift_assignments(date, shift)
+        return {"date": date, "shift": shift, "assignments": [a.dict() for a in assignments]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching shift schedule: {str(e)}")
+
+@app.get("/analytics")
+async def get_schedule_analytics():
+    """Get schedule analytics (utilization, workload balance, travel, coverage, conflicts)"""
+    try:
+        return rota_service.get_analytics()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing analytics: {str(e)}")
+
+@app.get("/optimize-schedule")
+async def optimize_schedule():
+    """Get schedule analytics with improvement suggestions"""
+    try:
+        return rota_service.optimize_schedule()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error optimizing schedule: {str(e)}")
+
+@app.get("/validate-rota")
+async def validate_rota(start_date: Optional[str] = None, days: int = 7):
+    """
+    Check the whole rota (or the days from start_date) against the business
+    rules and return a violations report
+    """
+    try:
+        return rota_service.validate_rota(start_date, days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error validating rota: {str(e)}")
+
+@app.get("/metrics/llm")
+async def get_llm_metrics(recent: int = 0):
+    """
+    Get LLM call statistics per operation (latency histograms, tokens, spend,
+    retries, cache and fallback use) and the circuit breaker state, optionally
+    with the most recent calls
+    """
+    try:
+        stats = openai_service.metrics.get_stats()
+        stats["circuit_breaker"] = openai_service.breaker.get_stats()
+        if recent:
+            stats["recent"] = await openai_service.metrics.recent_calls(recent)
+        return stats
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching LLM metrics: {str(e)}")
+
+@app.get("/metrics/extraction")
+async def get_extraction_metrics():
+    """Get prompt extraction statistics (local parser fast path and cache)"""
+    return openai_service.get_extraction_stats()
+
+@app.get("/metrics/travel")
+async def get_travel_metrics():
+    """Get travel provider calls (including coalesced lookups) and travel cache statistics (hit rate, refreshes)"""
+    return travel_service.get_stats()
+
+@app.get("/metrics/requests")
+async def get_request_metrics():
+    """Get request coalescing and employee reservation statistics for /assign-employee"""
+    return {
+        "coalescing": assignment_coalescer.get_stats(),
+        "reservations": rota_service.reservations.get_stats()
+    }
+
+@app.get("/pipeline/stats")
+async def get_pipeline_stats():
+    """Get cumulative candidate-pruning statistics per stage and AI shortlist statistics"""
+    try:
+        stats = rota_service.candidate_pipeline.get_stats()
+        stats["shortlist"] = rota_service.get_shortlist_stats()
+        return stats
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching pipeline stats: {str(e)}")
+
 @app.get("/employees")
 async def get_employees():
     """Get all employees data"""
@@ -143,14 +434,27 @@ async def get_patients():
         raise HTTPException(status_code=500, detail=f"Error fetching patients: {str(e)}")
 
 @app.get("/assignments")
-async def get_assignments():
-    """Get all current assignments"""
+async def get_assignments(
+    employee_id: Optional[str] = None,
+    patient_id: Optional[str] = None,
+    service_type: Optional[str] = None,
+    date: Optional[str] = None
+):
+    """Get current assignments, optionally filtered by employee, patient, service type or date"""
     try:
-        assignments = rota_service.get_current_assignments()
+        assignments = rota_service.get_current_assignments(employee_id, patient_id, service_type, date)
         return {"assignments": assignments}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching assignments: {str(e)}")
 
+@app.get("/assignments/workload")
+async def get_assignments_workload(employee_id: Optional[str] = None):
+    """Get running workload totals (visits, minutes worked, travel minutes) per employee"""
+    try:
+        return {"workload": rota_service.get_employee_workload(employee_id)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching workload: {str(e)}")
+
 @app.get("/data-status")
 async def get_data_status():
     """Get the current status of data in the system"""
@@ -159,7 +463,7 @@ async def get_data_status():
             "has_data": data_processor.has_data(),
             "employees_count": len(data_processor.employees),
             "patients_count": len(data_processor.patients),
-            "assignments_count": len(rota_service.get_current_assignments()),
+            "assignments_count": len(rota_service.assignment_store),
             "database_has_data": db_manager.has_data()
         }
     except Exception as e:
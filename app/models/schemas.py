@@ -126,6 +126,8 @@ class EmployeeAssignment(BaseModel):
     end_time: str
     priority_score: float
     assignment_reason: str
+    assignment_date: Optional[str] = None  # YYYY-MM-DD
+    shift: Optional[str] = None  # Breakfast/Lunch/Evening
 
 class RotaRequest(BaseModel):
     prompt: str = Field(..., description="Natural language request for employee assignment")
@@ -136,6 +138,51 @@ class RotaResponse(BaseModel):
     message: str
     assignment: Optional[EmployeeAssignment] = None
     alternative_options: Optional[List[EmployeeAssignment]] = Field(default=None)
+    proposal_id: Optional[str] = Field(default=None, description="Confirm an alternative option against this proposal")
+
+class ConfirmAlternativeRequest(BaseModel):
+    proposal_id: str = Field(..., description="Proposal returned with the original assignment")
+    employee_id: str = Field(..., description="Employee of the chosen alternative option")
+
+class AssignmentRequestItem(BaseModel):
+    prompt: Optional[str] = Field(default=None, description="Natural language request; structured fields below take precedence")
+    patient_id: Optional[str] = Field(default=None, description="Patient identifier, e.g. P001")
+    service_type: Optional[ServiceType] = Field(default=None, description="Service required (defaults to the patient's primary service)")
+    preferred_time: Optional[str] = Field(default=None, description="Preferred start time (HH:MM)")
+    preferred_date: Optional[str] = Field(default=None, description="today, tomorrow, a weekday name or YYYY-MM-DD")
+    urgency: Optional[str] = Field(default=None, description="high, medium or low")
+
+class BatchRotaRequest(BaseModel):
+    requests: List[AssignmentRequestItem] = Field(..., description="Assignment requests solved together")
+
+class BatchItemResult(BaseModel):
+    index: int
+    success: bool
+    message: str
+    assignment: Optional[EmployeeAssignment] = None
+    timing_ms: Dict[str, float] = Field(default_factory=dict)
+
+class BatchRotaResponse(BaseModel):
+    success: bool
+    message: str
+    results: List[BatchItemResult]
+    timing_ms: Dict[str, float] = Field(default_factory=dict)
+
+class EmployeeUnavailability(BaseModel):
+    employee_id: str
+    date: Optional[str] = Field(default=None, description="today, tomorrow, a weekday name or YYYY-MM-DD; omit for the whole scenario")
+
+class SimulationScenario(BaseModel):
+    name: Optional[str] = Field(default=None, description="Label echoed back in the results")
+    unavailable: List[EmployeeUnavailability] = Field(default_factory=list, description="Staff taken off; their affected visits are re-assigned")
+    requests: List[AssignmentRequestItem] = Field(default_factory=list, description="Extra assignment requests to try")
+    generate_weekly: bool = Field(default=False, description="Also generate a weekly rota in the scenario")
+    partitioned: bool = Field(default=False, description="Use the partitioned local solver for weekly generation")
+    week_start: Optional[str] = None
+    days: int = 7
+
+class SimulationRequest(BaseModel):
+    scenarios: List[SimulationScenario] = Field(..., description="Scenarios run concurrently against snapshots of live state")
 
 class DailySchedule(BaseModel):
     employee_id: str
@@ -0,0 +1,190 @@
+from typing import Dict, List, Optional, Any, Iterator, Set
+
+from .schedule_horizon import ScheduleHorizon
+from ..models.schemas import EmployeeAssignment
+
+
+class AssignmentStore:
+    """
+    In-memory assignment store with secondary indexes by employee, patient,
+    service type and day, plus per-employee running totals. Indexes and totals
+    are maintained on insert and delete, so queries cost O(result).
+
+    Records are keyed by their database row id when persisted. `version` is
+    bumped on every change so derived data can be cached against it.
+
+    snapshot() returns a copy-on-write copy for what-if simulations: index
+    buckets are shared until either store modifies them.
+    """
+
+    def __init__(self):
+        self._records: Dict[int, EmployeeAssignment] = {}
+        self._serialized: Dict[int, Dict[str, Any]] = {}
+        # Index values are dicts used as insertion-ordered sets of record ids
+        self._by_employee: Dict[str, Dict[int, None]] = {}
+        self._by_patient: Dict[str, Dict[int, None]] = {}
+        self._by_service: Dict[str, Dict[int, None]] = {}
+        self._by_day: Dict[str, Dict[int, None]] = {}
+        self._totals: Dict[str, Dict[str, int]] = {}
+        self.horizon = ScheduleHorizon()
+        self._owned: Set[int] = set()
+        self._next_id = 1
+        self.version = 0
+
+    def _bucket(self, index: Dict, key) -> Dict[int, None]:
+        """Return an index bucket this store may modify, copying it if it is shared"""
+        bucket = index.get(key)
+        if bucket is None or id(bucket) not in self._owned:
+            bucket = dict(bucket) if bucket is not None else {}
+            index[key] = bucket
+            self._owned.add(id(bucket))
+        return bucket
+
+    def snapshot(self) -> "AssignmentStore":
+        """Cheap copy-on-write copy sharing the index buckets with this store"""
+        clone = AssignmentStore()
+        clone._records = dict(self._records)
+        clone._serialized = dict(self._serialized)
+        clone._by_employee = dict(self._by_employee)
+        clone._by_patient = dict(self._by_patient)
+        clone._by_service = dict(self._by_service)
+        clone._by_day = dict(self._by_day)
+        clone._totals = {employee_id: dict(totals) for employee_id, totals in self._totals.items()}
+        clone.horizon = self.horizon.snapshot()
+        clone._next_id = self._next_id
+        clone.version = self.version
+        # Every existing bucket is now shared with the clone
+        self._owned = set()
+        return clone
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[EmployeeAssignment]:
+        return iter(list(self._records.values()))
+
+    def _index_keys(self, assignment: EmployeeAssignment):
+        return (
+            (self._by_employee, assignment.employee_id),
+            (self._by_patient, assignment.patient_id),
+            (self._by_service, assignment.service_type.value),
+            (self._by_day, assignment.assignment_date)
+        )
+
+    def add(self, assignment: EmployeeAssignment, record_id: Optional[int] = None, hold: Optional[int] = None) -> int:
+        """Insert an assignment and return its record id; `hold` is the horizon hold it commits, if any"""
+        if record_id is None:
+            record_id = self._next_id
+        self._next_id = max(self._next_id, record_id + 1)
+
+        self._records[record_id] = assignment
+        self._serialized[record_id] = assignment.dict()
+        for index, key in self._index_keys(assignment):
+            self._bucket(index, key)[record_id] = None
+
+        totals = self._totals.setdefault(assignment.employee_id, {"visits": 0, "minutes_worked": 0, "travel_minutes": 0})
+        totals["visits"] += 1
+        totals["minutes_worked"] += assignment.estimated_duration
+        totals["travel_minutes"] += assignment.travel_time
+
+        held = self.horizon.take_hold(hold) if hold is not None else None
+        if held is not assignment:
+            if held is not None:
+                self.horizon.remove(held)
+            self.horizon.add(assignment)
+        self.version += 1
+        return record_id
+
+    def remove(self, record_id: int) -> Optional[EmployeeAssignment]:
+        """Delete an assignment by record id, returning it if it existed"""
+        assignment = self._records.pop(record_id, None)
+        if assignment is None:
+            return None
+        self._serialized.pop(record_id, None)
+        for index, key in self._index_keys(assignment):
+            bucket = self._bucket(index, key)
+            bucket.pop(record_id, None)
+            if not bucket:
+                del index[key]
+
+        totals = self._totals[assignment.employee_id]
+        totals["visits"] -= 1
+        totals["minutes_worked"] -= assignment.estimated_duration
+        totals["travel_minutes"] -= assignment.travel_time
+        if totals["visits"] == 0:
+            del self._totals[assignment.employee_id]
+
+        self.horizon.remove(assignment)
+        self.version += 1
+        return assignment
+
+    def clear(self):
+        self._records = {}
+        self._serialized = {}
+        self._by_employee = {}
+        self._by_patient = {}
+        self._by_service = {}
+        self._by_day = {}
+        self._totals = {}
+        self._owned = set()
+        self.horizon.clear()
+        self.version += 1
+
+    def get(self, record_id: int) -> Optional[EmployeeAssignment]:
+        return self._records.get(record_id)
+
+    def record_ids(self) -> List[int]:
+        return list(self._records)
+
+    def all(self) -> List[EmployeeAssignment]:
+        return list(self._records.values())
+
+    def serialized(self, record_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """Serialized assignments (computed once at insert)"""
+        if record_ids is None:
+            return list(self._serialized.values())
+        return [self._serialized[record_id] for record_id in record_ids]
+
+    def query(
+        self,
+        employee_id: Optional[str] = None,
+        patient_id: Optional[str] = None,
+        service_type: Optional[str] = None,
+        day: Optional[str] = None
+    ) -> List[int]:
+        """Record ids matching all given filters, scanning only the smallest index"""
+        filters = [
+            index.get(key, {})
+            for index, key in (
+                (self._by_employee, employee_id),
+                (self._by_patient, patient_id),
+                (self._by_service, service_type),
+                (self._by_day, day)
+            )
+            if key is not None
+        ]
+        if not filters:
+            return list(self._records)
+        filters.sort(key=len)
+        smallest, rest = filters[0], filters[1:]
+        return [record_id for record_id in smallest if all(record_id in other for other in rest)]
+
+    def by_employee(self, employee_id: str) -> List[EmployeeAssignment]:
+        return [self._records[record_id] for record_id in self._by_employee.get(employee_id, {})]
+
+    def by_patient(self, patient_id: str) -> List[EmployeeAssignment]:
+        return [self._records[record_id] for record_id in self._by_patient.get(patient_id, {})]
+
+    def by_service(self, service_type: str) -> List[EmployeeAssignment]:
+        return [self._records[record_id] for record_id in self._by_service.get(service_type, {})]
+
+    def by_day(self, day: str) -> List[EmployeeAssignment]:
+        return [self._records[record_id] for record_id in self._by_day.get(day, {})]
+
+    def employee_totals(self, employee_id: str) -> Dict[str, int]:
+        """Running totals (visits, minutes worked, travel minutes) for an employee"""
+        return dict(self._totals.get(employee_id, {"visits": 0, "minutes_worked": 0, "travel_minutes": 0}))
+
+    def workload(self) -> Dict[str, Dict[str, int]]:
+        """Running totals for every employee with at least one assignment"""
+        return {employee_id: dict(totals) for employee_id, totals in self._totals.items()}
@@ -0,0 +1,237 @@
+from typing import Dict, List, Any, Optional
+from datetime import datetime
+import logging
+import os
+import time
+
+from .schedule_horizon import ScheduleHorizon, shift_for_time, to_minutes
+from .travel_service import TravelService
+from ..models.schemas import Employee, ServiceType, QualificationEnum
+
+logger = logging.getLogger(__name__)
+
+# Maximum travel time between assignments in minutes (BR-013)
+MAX_TRAVEL_MINUTES = 45
+
+
+class PruningStage:
+    """
+    A hard-constraint filter over candidate employees. Each stage keeps running
+    totals of how many candidates it saw and removed and how long it took, which
+    the pipeline uses to order stages by selectivity and cost.
+    """
+    name = "stage"
+    # Assumed cost per candidate (seconds) before any measurements exist
+    default_cost = 1e-6
+
+    def __init__(self):
+        self.evaluated = 0
+        self.removed = 0
+        self.seconds = 0.0
+
+    async def prepare(self, employees: List[Employee], request: Dict[str, Any]):
+        """Optional bulk work over the remaining candidates before keep() is called for each"""
+
+    def keep(self, employee: Employee, request: Dict[str, Any]) -> bool:
+        raise NotImplementedError
+
+    @property
+    def pass_rate(self) -> float:
+        if not self.evaluated:
+            return 0.5
+        return 1.0 - self.removed / self.evaluated
+
+    @property
+    def cost(self) -> float:
+        if not self.evaluated:
+            return self.default_cost
+        return self.seconds / self.evaluated
+
+    @property
+    def rank(self) -> float:
+        """Cost per removed candidate; cheap, selective stages run first"""
+        return self.cost / max(1.0 - self.pass_rate, 1e-3)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "stage": self.name,
+            "evaluated": self.evaluated,
+            "removed": self.removed,
+            "pass_rate": round(self.pass_rate, 4),
+            "avg_cost_us": round(self.cost * 1e6, 3),
+            "total_seconds": round(self.seconds, 6)
+        }
+
+
+class QualificationStage(PruningStage):
+    """Only qualified nurses can take medicine services (BR-001)"""
+    name = "qualification"
+
+    def keep(self, employee, request):
+        if request["service_type"] == ServiceType.MEDICINE:
+            return employee.Qualification == QualificationEnum.NURSE
+        return True
+
+
+class CertificateStage(PruningStage):
+    """Certificates must be valid on the day of the assignment (FR-E002)"""
+    name = "certificate"
+
+    def keep(self, employee, request):
+        try:
+            expiry = datetime.strptime(employee.CertificateExpiryDate[:10], "%Y-%m-%d").date().isoformat()
+        except ValueError:
+            return False
+        return expiry >= request["assignment_date"]
+
+
+class ShiftStage(PruningStage):
+    """The requested time must fall in one of the employee's shifts (FR-E004)"""
+    name = "shift"
+
+    def keep(self, employee, request):
+        if not request.get("preferred_time"):
+            return True
+        shifts = employee.Shifts.lower()
+        return "all" in shifts or shift_for_time(request["preferred_time"]).lower() in shifts
+
+
+class WorkingHoursStage(PruningStage):
+    """The visit must fit between the employee's EarliestStart and LatestEnd (FR-E005)"""
+    name = "working_hours"
+
+    def __init__(self, horizon: ScheduleHorizon):
+        super().__init__()
+        self.horizon = horizon
+
+    def keep(self, employee, request):
+        try:
+            earliest = to_minutes(employee.EarliestStart)
+            latest = to_minutes(employee.LatestEnd)
+        except (ValueError, AttributeError):
+            return True
+        if latest <= earliest:
+            latest += 24 * 60  # Overnight window
+        duration = request.get("duration", 30)
+
+        if request.get("preferred_time"):
+            start = to_minutes(request["preferred_time"])
+            if start < earliest:
+                start += 24 * 60
+        else:
+            start = self.horizon.next_free_start(employee.EmployeeID, request["assignment_date"], earliest, duration)
+        return earliest <= start and start + duration <= latest
+
+
+class TransportStage(PruningStage):
+    """Travel to the patient must stay within the 45 minute cap (BR-013, FR-E006)"""
+    name = "transport"
+    default_cost = 1e-3
+
+    def __init__(self, travel_service: TravelService, max_minutes: int = MAX_TRAVEL_MINUTES):
+        super().__init__()
+        self.travel_service = travel_service
+        self.max_minutes = max_minutes
+
+    async def prepare(self, employees, request):
+        # One matrix lookup for the candidates that survived the cheaper stages,
+        # instead of a request per employee
+        known = request["travel_times"]
+        missing = [emp for emp in employees if emp.EmployeeID not in known]
+        if missing:
+            column = (await self.travel_service.roster_matrix_async(missing, [request["patient"]]))[:, 0]
+            known.update({emp.EmployeeID: int(minutes) for emp, minutes in zip(missing, column)})
+
+    def keep(self, employee, request):
+        return request["travel_times"][employee.EmployeeID] <= self.max_minutes
+
+
+class CapacityStage(PruningStage):
+    """Employees cannot take more visits than their daily maximum (BR-002)"""
+    name = "capacity"
+
+    def __init__(self, horizon: ScheduleHorizon):
+        super().__init__()
+        self.horizon = horizon
+
+    def keep(self, employee, request):
+        return self.horizon.has_capacity(employee.EmployeeID, request["assignment_date"], employee.max_patients_per_day)
+
+
+class CandidatePipeline:
+    """
+    Runs the enabled pruning stages over the roster, cheapest and most selective
+    first, so only a small feasible shortlist reaches the expensive scoring steps.
+    """
+
+    def __init__(self, stages: List[PruningStage]):
+        self.stages = stages
+        self.runs = 0
+
+    def ordered_stages(self) -> List[PruningStage]:
+        return sorted(self.stages, key=lambda stage: stage.rank)
+
+    async def run(self, employees: List[Employee], request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Filter employees for a request. The request dict holds the patient,
+        service_type, assignment_date and optional preferred_time/duration;
+        travel times computed along the way are left in request["travel_times"].
+        Only the candidates still left when a stage runs reach its prepare(), so
+        travel is looked up for the survivors of the cheaper stages only.
+        """
+        request.setdefault("travel_times", {})
+        candidates = list(employees)
+        report = []
+        for stage in self.ordered_stages():
+            if not candidates:
+                break
+            started = time.perf_counter()
+            await stage.prepare(candidates, request)
+            kept = [emp for emp in candidates if stage.keep(emp, request)]
+            elapsed = time.perf_counter() - started
+
+            stage.evaluated += len(candidates)
+            stage.removed += len(candidates) - len(kept)
+            stage.seconds += elapsed
+            report.append({
+                "stage": stage.name,
+                "removed": len(candidates) - len(kept),
+                "remaining": len(kept),
+                "seconds": round(elapsed, 6)
+            })
+            candidates = kept
+
+        self.runs += 1
+        logger.debug(f"Candidate pruning: {report}")
+        return {"candidates": candidates, "stages": report}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cumulative per-stage statistics in current execution order"""
+        return {
+            "runs": self.runs,
+            "stages": [stage.stats() for stage in self.ordered_stages()]
+        }
+
+
+def build_candidate_pipeline(
+    travel_service: TravelService,
+    horizon: ScheduleHorizon,
+    stage_names: Optional[List[str]] = None
+) -> CandidatePipeline:
+    """Build the pipeline from stage names (default: ROTA_PRUNING_STAGES or all stages)"""
+    available = {
+        "qualification": lambda: QualificationStage(),
+        "certificate": lambda: CertificateStage(),
+        "shift": lambda: ShiftStage(),
+        "working_hours": lambda: WorkingHoursStage(horizon),
+        "transport": lambda: TransportStage(travel_service),
+        "capacity": lambda: CapacityStage(horizon)
+    }
+    if stage_names is None:
+        configured = os.getenv("ROTA_PRUNING_STAGES")
+        stage_names = [name.strip() for name in configured.split(",") if name.strip()] if configured else list(available)
+
+    unknown = [name for name in stage_names if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown pruning stages: {', '.join(unknown)}")
+    return CandidatePipeline([available[name]() for name in stage_names])
@@ -0,0 +1,61 @@
+from typing import Dict, List, Any, Optional
+import re
+
+# Seniority weighting for complex cases (FR-A002: Senior Carer > Carer)
+SENIORITY_WEIGHTS = {
+    "Nurse": 3.0,
+    "Senior Carer": 2.0,
+    "Carer": 1.0
+}
+
+_LANGUAGE_SPLIT = re.compile(r"[/,;]")
+
+
+def split_languages(languages: Optional[str]) -> List[str]:
+    """Split a 'English/Urdu' or 'English, Urdu' language string into a list"""
+    if not languages:
+        return []
+    return [lang.strip().lower() for lang in _LANGUAGE_SPLIT.split(languages) if lang.strip()]
+
+
+def language_match(employee_languages: Optional[str], patient_languages: Optional[str]) -> bool:
+    """Check whether the employee speaks the patient's preferred (non-English) language"""
+    patient_langs = [lang for lang in split_languages(patient_languages) if lang != "english"]
+    if not patient_langs:
+        return True
+    employee_langs = set(split_languages(employee_languages))
+    return any(lang in employee_langs for lang in patient_langs)
+
+
+def score_candidate(
+    employee: Dict[str, Any],
+    patient: Dict[str, Any],
+    travel_time: float,
+    current_load: int,
+    max_load: int
+) -> float:
+    """
+    Score an employee for a patient locally (higher is better).
+
+    Works on plain dictionaries (model dumps) so it can be used inside
+    worker processes without the service layer.
+    """
+    score = 0.0
+
+    # Geographic optimization: every minute of travel costs a little
+    score -= float(travel_time) * 0.1
+
+    # Language and cultural matching
+    if language_match(employee.get("LanguageSpoken"), patient.get("LanguagePreference")):
+        score += 2.0
+
+    # Workload balance: prefer employees with spare capacity
+    if max_load > 0:
+        score += 2.0 * (1.0 - min(current_load, max_load) / max_load)
+
+    # Seniority
+    qualification = employee.get("Qualification")
+    qualification = getattr(qualification, "value", qualification)
+    score += 0.5 * SENIORITY_WEIGHTS.get(qualification, 1.0)
+
+    return round(score, 4)
@@ -0,0 +1,107 @@
+from typing import Dict, Any, Optional
+from collections import deque
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpen(Exception):
+    """The LLM is marked unhealthy; callers should use their local fallback"""
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome of the last `window` LLM calls. A call counts as bad
+    when it fails or takes longer than `slow_ms`. Once at least `min_calls`
+    are recorded and the bad share reaches `failure_rate`, the circuit opens
+    and calls are refused straight away so requests fall back to the local
+    engine instead of waiting on timeouts.
+
+    After `cooldown_seconds` one probe call is let through (half-open): a
+    good probe closes the circuit again, a bad one re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window: Optional[int] = None,
+        failure_rate: Optional[float] = None,
+        slow_ms: Optional[float] = None,
+        min_calls: Optional[int] = None,
+        cooldown_seconds: Optional[float] = None
+    ):
+        self.window = window if window is not None else int(os.getenv("OPENAI_BREAKER_WINDOW", "20"))
+        self.failure_rate = failure_rate if failure_rate is not None else float(os.getenv("OPENAI_BREAKER_FAILURE_RATE", "0.5"))
+        self.slow_ms = slow_ms if slow_ms is not None else float(os.getenv("OPENAI_BREAKER_SLOW_MS", "2000"))
+        self.min_calls = min_calls if min_calls is not None else int(os.getenv("OPENAI_BREAKER_MIN_CALLS", "5"))
+        self.cooldown_seconds = cooldown_seconds if cooldown_seconds is not None else float(os.getenv("OPENAI_BREAKER_COOLDOWN_SECONDS", "30"))
+        self.state = self.CLOSED
+        self._outcomes: deque = deque(maxlen=self.window)
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self.trips = 0
+        self.rejected = 0
+        self.probes = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go to the LLM now"""
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self._opened_at >= self.cooldown_seconds:
+            self.state = self.HALF_OPEN
+        # One probe at a time; a probe that never reported back (cancelled)
+        # is replaced after another cooldown
+        if self.state == self.HALF_OPEN and (
+            self._probe_started is None or now - self._probe_started >= self.cooldown_seconds
+        ):
+            self._probe_started = now
+            self.probes += 1
+            logger.info("LLM circuit half-open, sending probe call")
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, success: bool, duration_ms: float = 0.0):
+        """Record the outcome of a call let through by allow()"""
+        good = success and duration_ms <= self.slow_ms
+        if self.state == self.HALF_OPEN:
+            self._probe_started = None
+            if good:
+                self.state = self.CLOSED
+                self._outcomes.clear()
+                logger.info("LLM circuit closed after successful probe")
+            else:
+                self._open()
+            return
+
+        self._outcomes.append(good)
+        bad = self._outcomes.count(False)
+        if (self.state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                and bad / len(self._outcomes) >= self.failure_rate):
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self.trips += 1
+        logger.warning(f"LLM circuit opened, using local fallbacks for {self.cooldown_seconds:g}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        bad = self._outcomes.count(False)
+        return {
+            "state": self.state,
+            "recent_calls": len(self._outcomes),
+            "recent_failure_rate": round(bad / len(self._outcomes), 4) if self._outcomes else 0.0,
+            "failure_rate_threshold": self.failure_rate,
+            "slow_ms": self.slow_ms,
+            "cooldown_seconds": self.cooldown_seconds,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "probes": self.probes
+        }
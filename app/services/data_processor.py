@@ -9,6 +9,15 @@ from ..database import DatabaseManager
 
 logger = logging.getLogger(__name__)
 
+# Keyword found in a service name -> service type, checked in order
+SERVICE_KEYWORDS = [
+    ("medicine", ServiceType.MEDICINE),
+    ("exercise", ServiceType.EXERCISE),
+    ("companion", ServiceType.COMPANIONSHIP),
+    ("personal", ServiceType.PERSONAL_CARE),
+    ("care", ServiceType.PERSONAL_CARE)
+]
+
 class DataProcessor:
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
@@ -18,6 +27,15 @@ class DataProcessor:
         # Try to load existing data from database
         self._load_from_database()
     
+    def snapshot(self) -> "DataProcessor":
+        """Copy of the in-memory roster for what-if runs (patients are shared read-only)"""
+        clone = DataProcessor.__new__(DataProcessor)
+        clone.db_manager = self.db_manager
+        clone.employees = [emp.copy() for emp in self.employees]
+        clone.patients = self.patients
+        clone.data_loaded = self.data_loaded
+        return clone
+    
     def _load_from_database(self):
         """Load existing data from database"""
         try:
@@ -277,14 +295,10 @@ class DataProcessor:
         
         for service in service_list:
             service_lower = service.lower()
-            if 'medicine' in service_lower:
-                services.append(ServiceType.MEDICINE)
-            elif 'exercise' in service_lower:
-                services.append(ServiceType.EXERCISE)
-            elif 'companion' in service_lower:
-                services.append(ServiceType.COMPANIONSHIP)
-            elif 'personal' in service_lower or 'care' in service_lower:
-                services.append(ServiceType.PERSONAL_CARE)
+            for keyword, service_type in SERVICE_KEYWORDS:
+                if keyword in service_lower:
+                    services.append(service_type)
+                    break
         
         return services
     
@@ -348,4 +362,12 @@ class DataProcessor:
                 # Other services can be handled by both nurses and care workers
                 qualified.append(emp)
         
-        return qualified 
\ No newline at end of file
+        return qualified
+
+    def get_primary_service(self, patient: Patient) -> ServiceType:
+        """Get the service that drives a patient's assignment (medication first, BR-006)"""
+        if patient.RequiresMedication.strip().upper() == 'Y' or 'medic' in patient.RequiredSupport.lower():
+            return ServiceType.MEDICINE
+
+        services = self._parse_services(patient.RequiredSupport)
+        return services[0] if services else ServiceType.PERSONAL_CARE
\ No newline at end of file
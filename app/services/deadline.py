@@ -0,0 +1,37 @@
+from typing import Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+
+# Monotonic time by which the request being served must answer
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Too little of the request's time budget is left for the call"""
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """
+    Give the code in the block (and tasks it starts) a time budget. Nested
+    budgets never extend an outer one. None or <= 0 means no budget.
+    """
+    if not seconds or seconds <= 0:
+        yield
+        return
+    expires_at = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(min(expires_at, outer) if outer is not None else expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left in the current budget, or None without one"""
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return max(0.0, expires_at - time.monotonic())
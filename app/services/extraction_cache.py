@@ -0,0 +1,122 @@
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+import copy
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Spellings of relative date words mapped to the canonical word. Extraction
+# returns these words (not dates), so cached results stay valid across days.
+_DATE_WORDS = {
+    "tmr": "tomorrow", "tmrw": "tomorrow", "tomorow": "tomorrow", "tommorow": "tomorrow", "tommorrow": "tomorrow",
+    "tdy": "today", "2day": "today",
+    "tue": "tuesday", "tues": "tuesday", "weds": "wednesday",
+    "thu": "thursday", "thur": "thursday", "thurs": "thursday"
+}
+# Abbreviations that are also ordinary words ("patient sat in a chair") are
+# only read as days right after a word that introduces a date
+_AMBIGUOUS_DAYS = {"mon": "monday", "wed": "wednesday", "fri": "friday", "sat": "saturday", "sun": "sunday"}
+_AMBIGUOUS_DAY = re.compile(r"\b(on|this|next|every|by|until|till|from) (" + "|".join(_AMBIGUOUS_DAYS) + r")\b")
+_WORD = re.compile(r"[a-z0-9]+")
+_UK_DATE = re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4})\b")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Canonical form of a prompt for cache lookups: lower case, collapsed
+    whitespace, no trailing punctuation, date words and DD/MM/YYYY dates
+    in one spelling
+    """
+    text = " ".join((prompt or "").lower().split()).rstrip(" .!?")
+    text = _UK_DATE.sub(lambda m: f"{m.group(3)}-{int(m.group(2)):02d}-{int(m.group(1)):02d}", text)
+    text = _AMBIGUOUS_DAY.sub(lambda m: f"{m.group(1)} {_AMBIGUOUS_DAYS[m.group(2)]}", text)
+    return _WORD.sub(lambda m: _DATE_WORDS.get(m.group(0), m.group(0)), text)
+
+
+class ExtractionCache:
+    """
+    LRU cache with a TTL for prompt extraction results, keyed on the
+    normalized prompt. With a DatabaseManager, entries are also written to
+    SQLite and read back on a memory miss, so they survive restarts.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        db_manager=None
+    ):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("OPENAI_EXTRACTION_CACHE_SIZE", "1000"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("OPENAI_EXTRACTION_CACHE_TTL_SECONDS", "86400"))
+        self.db_manager = db_manager
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, prompt: str) -> Optional[Dict[str, Any]]:
+        key = normalize_prompt(prompt)
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(result)
+            del self._entries[key]
+            self.expirations += 1
+
+        if self.db_manager is not None:
+            try:
+                stored = self.db_manager.get_cached_extraction(key, now)
+            except Exception as e:
+                logger.warning(f"Error reading extraction cache: {str(e)}")
+                stored = None
+            if stored:
+                self._remember(key, stored["result"], stored["expires_at"])
+                self.persistent_hits += 1
+                return copy.deepcopy(stored["result"])
+
+        self.misses += 1
+        return None
+
+    def put(self, prompt: str, result: Dict[str, Any]):
+        key = normalize_prompt(prompt)
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, copy.deepcopy(result), expires_at)
+        if self.db_manager is not None:
+            try:
+                self.db_manager.store_cached_extraction(key, result, expires_at)
+            except Exception as e:
+                logger.warning(f"Error writing extraction cache: {str(e)}")
+
+    def _remember(self, key: str, result: Dict[str, Any], expires_at: float):
+        self._entries[key] = (expires_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.persistent_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "persistent": self.db_manager is not None,
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.persistent_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
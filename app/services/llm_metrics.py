@@ -0,0 +1,232 @@
+from typing import Dict, Any, Optional, List, Set
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+import asyncio
+import functools
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS_MS = [10, 50, 100, 250, 500, 1000, 2000, 5000, 10000]
+
+# USD per million (prompt, completion) tokens, for spend estimates
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4": (30.00, 60.00)
+}
+
+# Call record of the instrumented OpenAIService method running in this task
+_current_call: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_llm_call", default=None)
+
+
+def current_call() -> Optional[Dict[str, Any]]:
+    """Record of the instrumented call in progress, if any"""
+    return _current_call.get()
+
+
+def mark_call(**fields):
+    """Update the record of the call in progress (e.g. source="cache")"""
+    call = _current_call.get()
+    if call is not None:
+        call.update(fields)
+
+
+def estimate_cost(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+    prices = next((price for name, price in sorted(MODEL_PRICES.items(), key=lambda item: -len(item[0]))
+                   if model and model.startswith(name)), (0.0, 0.0))
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+def instrumented(operation: str):
+    """
+    Decorator for OpenAIService coroutines: times the call and records it in
+    `self.metrics`. The method and _chat fill in tokens (estimated from the
+    compiled prompt and as billed), candidates trimmed to fit the token
+    budget, retries and the source of the answer (llm, cache, local_parser
+    or a fallback).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            call = {
+                "operation": operation,
+                "model": None,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "estimated_prompt_tokens": 0,
+                "candidates_trimmed": 0,
+                "retries": 0,
+                "source": "llm",
+                "error": None
+            }
+            token = _current_call.set(call)
+            started = time.perf_counter()
+            try:
+                return await func(self, *args, **kwargs)
+            except asyncio.CancelledError:
+                # e.g. a streaming client disconnected
+                call["error"] = "cancelled"
+                raise
+            except Exception as e:
+                call["error"] = str(e)
+                raise
+            finally:
+                call["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                _current_call.reset(token)
+                self.metrics.record(call)
+        return wrapper
+    return decorator
+
+
+class LLMMetrics:
+    """
+    Aggregated statistics of OpenAIService calls per operation: latency
+    histograms and percentiles, token counts and estimated spend, retries and
+    where answers came from. With a DatabaseManager every call is also kept in
+    a rolling `llm_calls` table (the newest LLM_METRICS_MAX_ROWS rows).
+
+    Calls are buffered in memory and written off the event loop, one
+    transaction per batch: when `batch_size` calls are pending, or
+    `flush_seconds` after the first pending call, and on flush()/close().
+    """
+
+    def __init__(
+        self,
+        db_manager=None,
+        max_rows: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_seconds: Optional[float] = None
+    ):
+        self.db_manager = db_manager
+        self.max_rows = max_rows if max_rows is not None else int(os.getenv("LLM_METRICS_MAX_ROWS", "10000"))
+        self.batch_size = batch_size if batch_size is not None else int(os.getenv("LLM_METRICS_BATCH_SIZE", "50"))
+        self.flush_seconds = flush_seconds if flush_seconds is not None else float(os.getenv("LLM_METRICS_FLUSH_SECONDS", "5"))
+        self._operations: Dict[str, Dict[str, Any]] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._writes: Set[asyncio.Future] = set()
+        # A single writer thread, so batches reach the table in order
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-metrics")
+        self.written = 0
+
+    def _operation(self, name: str) -> Dict[str, Any]:
+        if name not in self._operations:
+            self._operations[name] = {
+                "calls": 0,
+                "errors": 0,
+                "sources": defaultdict(int),
+                "retries": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "estimated_prompt_tokens": 0,
+                "candidates_trimmed": 0,
+                "cost_usd": 0.0,
+                "total_ms": 0.0,
+                "histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                "recent_ms": deque(maxlen=1000)
+            }
+        return self._operations[name]
+
+    def record(self, call: Dict[str, Any]):
+        call["cost_usd"] = estimate_cost(call.get("model"), call["prompt_tokens"], call["completion_tokens"])
+        stats = self._operation(call["operation"])
+        stats["calls"] += 1
+        stats["errors"] += 1 if call["error"] else 0
+        stats["sources"][call["source"]] += 1
+        stats["retries"] += call["retries"]
+        stats["prompt_tokens"] += call["prompt_tokens"]
+        stats["completion_tokens"] += call["completion_tokens"]
+        stats["estimated_prompt_tokens"] += call["estimated_prompt_tokens"]
+        stats["candidates_trimmed"] += call["candidates_trimmed"]
+        stats["cost_usd"] += call["cost_usd"]
+        stats["total_ms"] += call["duration_ms"]
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if call["duration_ms"] <= bound), len(LATENCY_BUCKETS_MS))
+        stats["histogram"][bucket] += 1
+        stats["recent_ms"].append(call["duration_ms"])
+
+        if self.db_manager is not None:
+            self._pending.append(call)
+            if len(self._pending) >= self.batch_size:
+                self._start_flush()
+            elif self._flush_timer is None:
+                try:
+                    self._flush_timer = asyncio.get_running_loop().call_later(self.flush_seconds, self._start_flush)
+                except RuntimeError:
+                    # No event loop: the calls wait for the next batch or flush()
+                    pass
+
+    def _start_flush(self):
+        """Hand the pending calls to the writer thread"""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        write = asyncio.get_running_loop().run_in_executor(self.executor, self._write, batch)
+        self._writes.add(write)
+        write.add_done_callback(self._writes.discard)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            self.db_manager.log_llm_calls(batch, self.max_rows)
+            self.written += len(batch)
+        except Exception as e:
+            logger.warning(f"Error logging {len(batch)} LLM calls: {str(e)}")
+
+    async def flush(self):
+        """Write every pending call and wait for the writes to finish"""
+        self._start_flush()
+        if self._writes:
+            await asyncio.gather(*list(self._writes))
+
+    async def close(self):
+        await self.flush()
+        self.executor.shutdown()
+
+    def get_stats(self) -> Dict[str, Any]:
+        operations = {}
+        for name, stats in self._operations.items():
+            recent = sorted(stats["recent_ms"])
+            labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+            operations[name] = {
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "sources": dict(stats["sources"]),
+                "retries": stats["retries"],
+                "prompt_tokens": stats["prompt_tokens"],
+                "completion_tokens": stats["completion_tokens"],
+                "estimated_prompt_tokens": stats["estimated_prompt_tokens"],
+                "candidates_trimmed": stats["candidates_trimmed"],
+                "cost_usd": round(stats["cost_usd"], 6),
+                "total_ms": round(stats["total_ms"], 2),
+                "avg_ms": round(stats["total_ms"] / stats["calls"], 2) if stats["calls"] else 0.0,
+                "p50_ms": recent[len(recent) // 2] if recent else 0.0,
+                "p95_ms": recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0,
+                "histogram": dict(zip(labels, stats["histogram"]))
+            }
+        return {
+            "operations": operations,
+            "persisted": {"written": self.written, "pending": len(self._pending)},
+            "totals": {
+                "calls": sum(op["calls"] for op in operations.values()),
+                "prompt_tokens": sum(op["prompt_tokens"] for op in operations.values()),
+                "completion_tokens": sum(op["completion_tokens"] for op in operations.values()),
+                "estimated_prompt_tokens": sum(op["estimated_prompt_tokens"] for op in operations.values()),
+                "cost_usd": round(sum(op["cost_usd"] for op in operations.values()), 6),
+                "total_ms": round(sum(op["total_ms"] for op in operations.values()), 2)
+            }
+        }
+
+    async def recent_calls(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent calls, pending ones written first (empty without a database)"""
+        if self.db_manager is None:
+            return []
+        await self.flush()
+        return self.db_manager.get_llm_calls(limit)
@@ -1,10 +1,20 @@
 import openai
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Tuple
+import asyncio
 import json
 import logging
 import os
+import random
+import time
 from dotenv import load_dotenv
 
+from .extraction_cache import ExtractionCache
+from .prompt_parser import PromptParser
+from .llm_metrics import LLMMetrics, instrumented, mark_call, current_call
+from .circuit_breaker import CircuitBreaker, CircuitOpen
+from .deadline import DeadlineExceeded, remaining_budget
+from .candidate_ranker import score_candidate
+from .prompt_compiler import PromptCompiler, estimate_tokens
 from ..models.schemas import Employee, Patient, ServiceType, EmployeeAssignment
 
 # Load environment variables
@@ -12,24 +22,223 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+
+# Part of a request's deadline budget kept back for the local fallback
+FALLBACK_RESERVE_SECONDS = 0.1
+
+SELECTION_NUMBERS = ("priority_score", "estimated_travel_time", "estimated_duration")
+
+
+def validated_selection(selection: Any) -> Dict[str, Any]:
+    """
+    Check the AI's selection reply: an object with a non-empty employee_id.
+    Optional fields of the wrong type are dropped so callers use their
+    defaults. Raises ValueError if the reply is unusable.
+    """
+    if not isinstance(selection, dict):
+        raise ValueError(f"Selection reply is not an object: {selection!r}")
+    employee_id = selection.get("employee_id")
+    if not isinstance(employee_id, str) or not employee_id.strip():
+        raise ValueError(f"Selection reply has no employee_id: {selection!r}")
+    selection["employee_id"] = employee_id.strip()
+    for field in SELECTION_NUMBERS:
+        value = selection.get(field)
+        if field in selection and (isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0):
+            del selection[field]
+    ranked = selection.get("ranked_employee_ids")
+    if ranked is not None:
+        if isinstance(ranked, list):
+            selection["ranked_employee_ids"] = [emp_id for emp_id in ranked if isinstance(emp_id, str)]
+        else:
+            del selection["ranked_employee_ids"]
+    if not isinstance(selection.get("reasoning", ""), str):
+        selection["reasoning"] = str(selection["reasoning"])
+    return selection
+
+
 class OpenAIService:
-    def __init__(self):
-        self.client = openai.OpenAI(
-            api_key=os.getenv("OPENAI_API_KEY")
+    def __init__(
+        self,
+        extraction_cache: Optional[ExtractionCache] = None,
+        prompt_parser: Optional[PromptParser] = None,
+        metrics: Optional[LLMMetrics] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        prompt_compiler: Optional[PromptCompiler] = None
+    ):
+        self.timeout = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "10"))
+        self.max_concurrency = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+        self.max_retries = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+        self.retry_base_seconds = float(os.getenv("OPENAI_RETRY_BASE_SECONDS", "0.5"))
+        # One async client (and so one keep-alive connection pool) for every
+        # call; retries are handled in _chat
+        self.client = openai.AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            # OpenAI-compatible endpoint, e.g. app.devtools.fake_openai for load tests
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            timeout=self.timeout,
+            max_retries=0
         )
         self.model = "gpt-3.5-turbo"  # You can change to gpt-4 if needed
+        # Created on first use so it binds to the server's event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.extraction_cache = extraction_cache if extraction_cache is not None else ExtractionCache()
+        self.prompt_parser = prompt_parser if prompt_parser is not None else PromptParser()
+        self.metrics = metrics if metrics is not None else LLMMetrics()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.prompt_compiler = prompt_compiler if prompt_compiler is not None else PromptCompiler()
+    
+    async def _create(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        timeout: float,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> Tuple[str, Optional[str], Any]:
+        """One completion as (content, model, usage), streamed to on_token if given"""
+        async with self._semaphore:
+            if on_token is None:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    timeout=timeout
+                )
+                return response.choices[0].message.content, getattr(response, "model", None), getattr(response, "usage", None)
+            
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                timeout=timeout,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            parts, model, usage = [], None, None
+            async for chunk in stream:
+                model = getattr(chunk, "model", None) or model
+                usage = getattr(chunk, "usage", None) or usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    on_token(delta)
+            return "".join(parts), model, usage
+    
+    async def _chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        timeout: Optional[float] = None,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """
+        Run one chat completion without blocking the event loop. At most
+        OPENAI_MAX_CONCURRENCY calls are in flight at once; timeouts, connection
+        errors, rate limits and server errors are retried with jittered
+        exponential backoff.
+
+        Raises CircuitOpen straight away while the circuit breaker has the LLM
+        marked unhealthy, and cuts calls and retries short to leave time for
+        the local fallback when the request has a deadline budget.
+
+        With on_token the answer is streamed and passed on piece by piece.
+        An attempt that already streamed tokens is not retried.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if not self.breaker.allow():
+            raise CircuitOpen("LLM circuit is open, using local fallback")
+        
+        call = current_call()
+        streamed = []
+        
+        def forward(text: str):
+            streamed.append(text)
+            on_token(text)
+        
+        for attempt in range(self.max_retries + 1):
+            if call is not None:
+                call["retries"] = attempt
+                call["model"] = self.model
+            attempt_timeout = timeout or self.timeout
+            budget = remaining_budget()
+            if budget is not None:
+                budget -= FALLBACK_RESERVE_SECONDS
+                if budget <= 0:
+                    raise DeadlineExceeded("No time left in the request budget for an LLM call")
+            started = time.perf_counter()
+            try:
+                if budget is None:
+                    content, model, usage = await self._create(messages, temperature, attempt_timeout, forward if on_token else None)
+                else:
+                    # The wait for a concurrency slot counts against the budget too
+                    content, model, usage = await asyncio.wait_for(
+                        self._create(messages, temperature, attempt_timeout, forward if on_token else None), budget
+                    )
+            except asyncio.TimeoutError:
+                self.breaker.record(False)
+                raise DeadlineExceeded(f"LLM call cut off after {budget:.2f}s to meet the request deadline")
+            except (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError) as e:
+                self.breaker.record(False)
+                delay = self.retry_base_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+                budget = remaining_budget()
+                if (attempt == self.max_retries or self.breaker.state != CircuitBreaker.CLOSED or streamed
+                        or (budget is not None and budget - delay <= FALLBACK_RESERVE_SECONDS)):
+                    raise
+                logger.warning(f"OpenAI call failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            except Exception:
+                self.breaker.record(False)
+                raise
+            self.breaker.record(True, (time.perf_counter() - started) * 1000)
+            
+            if call is not None:
+                call["model"] = model or self.model
+                call["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+                call["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+            return content
     
+    def _fallback(self, message: str, error: Exception):
+        """Log a failed LLM call and record which fallback path was taken"""
+        if isinstance(error, (CircuitOpen, DeadlineExceeded)):
+            # Expected while the LLM is unhealthy or slow; not worth an error per request
+            logger.warning(f"{message}: {str(error)}")
+            source = "circuit_open" if isinstance(error, CircuitOpen) else "deadline"
+        else:
+            logger.error(f"{message}: {str(error)}")
+            source = "fallback"
+        mark_call(source=source, error=str(error))
+    
+    async def close(self):
+        """Close the shared HTTP connection pool and write out pending call metrics"""
+        await self.client.close()
+        await self.metrics.close()
+    
+    @instrumented("extract_assignment_details")
     async def extract_assignment_details(self, prompt: str) -> Dict[str, Any]:
         """
-        Extract assignment details from natural language prompt
+        Extract assignment details from natural language prompt.
+        Prompts the local parser reads confidently skip the LLM. LLM results
+        are cached on the normalized prompt; fallbacks are not cached.
         """
+        parsed = self.prompt_parser.try_parse(prompt)
+        if parsed is not None:
+            mark_call(source="local_parser")
+            return parsed
+        
+        cached = self.extraction_cache.get(prompt)
+        if cached is not None:
+            mark_call(source="cache")
+            return cached
+        
         try:
             system_prompt = """
             You are an AI assistant for a healthcare rota system. 
             Extract the following information from the user's prompt:
             - patient_id: The patient identifier (e.g., P001, P002)
             - service_type: The type of service required (medicine, exercise, companionship, personal_care)
-            - preferred_time: If mentioned, the preferred time for the service
+            - preferred_time: If mentioned, the preferred time for the service (HH:MM)
+            - preferred_date: If mentioned, the day of the service ("today", "tomorrow", a weekday name such as "friday", or YYYY-MM-DD)
             - urgency: How urgent the request is (high, medium, low)
             
             Return the information as a JSON object. If information is not provided, use null.
@@ -40,12 +249,12 @@ class OpenAIService:
                 "patient_id": "P001",
                 "service_type": "exercise",
                 "preferred_time": null,
+                "preferred_date": "today",
                 "urgency": "medium"
             }
             """
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            content = await self._chat(
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt}
@@ -53,113 +262,135 @@ class OpenAIService:
                 temperature=0.1
             )
             
-            result = response.choices[0].message.content
-            return json.loads(result)
+            result = json.loads(content)
+            self.extraction_cache.put(prompt, result)
+            return result
             
         except Exception as e:
-            logger.error(f"Error extracting assignment details: {str(e)}")
-            # Fallback: try to extract patient ID manually
-            words = prompt.upper().split()
-            patient_id = None
-            for word in words:
-                if word.startswith('P') and len(word) <= 5:
-                    patient_id = word
-                    break
-            
-            return {
-                "patient_id": patient_id,
-                "service_type": "medicine",  # Default assumption
-                "preferred_time": None,
-                "urgency": "medium"
-            }
+            self._fallback("Error extracting assignment details", e)
+            # Fallback: whatever the local parser could read, however unsure
+            details = self.prompt_parser.parse(prompt)["details"]
+            details["service_type"] = details["service_type"] or "medicine"  # Default assumption
+            return details
     
+    def get_extraction_stats(self) -> Dict[str, Any]:
+        """Local parser fast-path and extraction cache statistics"""
+        return {
+            "local_parser": self.prompt_parser.get_stats(),
+            "cache": self.extraction_cache.get_stats()
+        }
+    
+    def estimate_candidate_tokens(self, employees: List[Employee], travel_times: Dict[str, int]) -> int:
+        """Estimated prompt tokens taken by the candidate table"""
+        return estimate_tokens(self.prompt_compiler.candidate_table(employees, travel_times))
+    
+    def _local_selection(
+        self,
+        patient: Patient,
+        employees: List[Employee],
+        travel_times: Dict[str, int]
+    ) -> Dict[str, Any]:
+        """
+        Selection by local score (travel, language, workload, seniority) in
+        the same shape as the AI's answer. Ties keep the callers' order.
+        """
+        patient_data = patient.dict()
+        ranked = sorted(
+            employees,
+            key=lambda emp: score_candidate(
+                emp.dict(), patient_data, travel_times.get(emp.EmployeeID, 15),
+                emp.current_assignments, emp.max_patients_per_day
+            ),
+            reverse=True
+        )
+        best = ranked[0]
+        return {
+            "employee_id": best.EmployeeID,
+            "reasoning": "Selected by local ranking (travel time, language, workload, seniority) as the AI service was unavailable",
+            "priority_score": 5.0,
+            "estimated_travel_time": travel_times.get(best.EmployeeID, 15),
+            "estimated_duration": 30,
+            "ranked_employee_ids": [emp.EmployeeID for emp in ranked[:5]]
+        }
+    
+    @instrumented("find_best_assignment")
     async def find_best_assignment(
         self, 
         patient: Patient, 
         qualified_employees: List[Employee],
         service_type: ServiceType,
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        on_token: Optional[Callable[[str], None]] = None
     ) -> Dict[str, Any]:
         """
-        Use AI to find the best employee assignment based on multiple criteria
+        Use AI to find the best employee assignment based on multiple criteria.
+        With on_token the answer is streamed as it is generated.
         """
         try:
-            # Prepare data for AI analysis
-            patient_data = {
-                "id": patient.PatientID,
-                "name": patient.PatientName,
-                "location": patient.Address,
-                "preferred_language": patient.LanguagePreference,
-                "medical_conditions": [patient.Illness] if patient.Illness else [],
-                "priority_level": 1  # Default priority level
-            }
+            compiled = self.prompt_compiler.selection(patient, qualified_employees, service_type, context)
+            mark_call(estimated_prompt_tokens=compiled["prompt_tokens"], candidates_trimmed=compiled["trimmed"])
             
-            employees_data = []
-            for emp in qualified_employees:
-                employees_data.append({
-                    "id": emp.EmployeeID,
-                    "name": emp.Name,
-                    "type": emp.Qualification.value,
-                    "location": emp.Address,
-                    "postcode": emp.PostCode,
-                    "languages": emp.LanguageSpoken.split(','),
-                    "transport": emp.TransportMode.value,
-                    "shifts": emp.Shifts,
-                    "earliest_start": emp.EarliestStart,
-                    "latest_end": emp.LatestEnd,
-                    "current_assignments": emp.current_assignments if hasattr(emp, 'current_assignments') else 0,
-                    "travel_time_to_patient": context.get("employee_travel_times", {}).get(emp.EmployeeID, 15)
-                })
-            
-            system_prompt = f"""
-            You are an AI assistant for a healthcare rota system. Your task is to select the best employee for a patient assignment based on complex criteria.
-            
-            Key Rules and Priorities (in order):
-            1. Qualification Matching: Only qualified nurses for medication tasks. Prioritize Senior Carer > Carer for complex cases. Verify certificate validity.
-            2. Geographic Optimization: Minimize travel time based on transport mode, cluster assignments geographically, consider traffic.
-            3. Language and Cultural Matching: Prioritize language match, consider cultural/religious compatibility.
-            4. Schedule Optimization: Balance workload, respect shift constraints, ensure coverage, handle emergencies.
-            5. Other: Respect earliest start/latest end times, transport limitations.
-            
-            Patient Details: {json.dumps(patient_data, indent=2)}
-            Service Required: {service_type.value}
-            Qualified Employees: {json.dumps(employees_data, indent=2)}
-            
-            Select the best employee and provide:
-            1. employee_id: The selected employee's ID
-            2. reasoning: Detailed explanation including how it matches each criterion
-            3. priority_score: Score 1-10
-            4. estimated_travel_time: Estimated in minutes (use reasonable estimate based on locations)
-            5. estimated_duration: Estimated service duration in minutes
-            
-            Return as JSON format only.
-            """
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt}
-                ],
-                temperature=0.2
+            result = await self._chat(
+                messages=compiled["messages"],
+                temperature=0.2,
+                on_token=on_token
             )
-            
-            result = response.choices[0].message.content
-            return json.loads(result)
+            return validated_selection(json.loads(result))
             
         except Exception as e:
-            logger.error(f"Error finding best assignment: {str(e)}")
-            # Fallback: select first available employee
+            self._fallback("Error finding best assignment", e)
+            # Fallback: the best candidates by local score
             if qualified_employees:
-                return {
-                    "employee_id": qualified_employees[0].EmployeeID,
-                    "reasoning": "Automatic selection due to AI service error",
-                    "priority_score": 5.0,
-                    "estimated_travel_time": 15,
-                    "estimated_duration": 30
-                }
+                return self._local_selection(patient, qualified_employees, context.get("employee_travel_times", {}))
             else:
                 raise Exception("No qualified employees available")
     
+    @instrumented("find_best_assignments_batch")
+    async def find_best_assignments_batch(self, requests: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Select employees for several patients in one AI call. Each request has
+        a "key", "patient", "service_type" and its own "candidates" shortlist
+        with "travel_times". Employee details are listed once and shared by
+        all requests.
+
+        Returns selections by request key. Requests the AI skipped or answered
+        with an employee outside their shortlist are left out, so the caller
+        can retry them individually.
+        """
+        if not requests:
+            return {}
+        try:
+            compiled = self.prompt_compiler.batch_selection(requests)
+            mark_call(estimated_prompt_tokens=compiled["prompt_tokens"], candidates_trimmed=compiled["trimmed"])
+            
+            content = await self._chat(
+                messages=compiled["messages"],
+                temperature=0.2
+            )
+            selections = json.loads(content).get("selections", [])
+        except Exception as e:
+            self._fallback("Error in batched assignment selection", e)
+            return {}
+        
+        by_key = {request["key"]: request for request in requests}
+        results = {}
+        for selection in selections:
+            try:
+                selection = validated_selection(selection)
+            except ValueError as e:
+                logger.warning(f"Skipping batched selection: {str(e)}")
+                continue
+            request = by_key.get(str(selection.get("request_id")))
+            if not request:
+                continue
+            candidate_ids = {emp.EmployeeID for emp in request["candidates"]}
+            if selection.get("employee_id") not in candidate_ids:
+                continue
+            selection["estimated_travel_time"] = request["travel_times"].get(selection["employee_id"], 15)
+            results[request["key"]] = selection
+        return results
+    
+    @instrumented("generate_schedule_optimization")
     async def generate_schedule_optimization(
         self, 
         assignments: List[EmployeeAssignment]
@@ -168,45 +399,17 @@ class OpenAIService:
         Use AI to optimize the overall schedule
         """
         try:
-            assignments_data = [
-                {
-                    "employee_id": a.employee_id,
-                    "patient_id": a.patient_id,
-                    "service_type": a.service_type.value,
-                    "start_time": a.start_time,
-                    "end_time": a.end_time,
-                    "travel_time": a.travel_time
-                }
-                for a in assignments
-            ]
-            
-            system_prompt = f"""
-            You are an AI assistant for optimizing healthcare staff schedules.
-            
-            Current assignments: {json.dumps(assignments_data, indent=2)}
+            compiled = self.prompt_compiler.optimization(assignments)
+            mark_call(estimated_prompt_tokens=compiled["prompt_tokens"])
             
-            Analyze the schedule and provide optimization suggestions:
-            1. conflicts: Any time conflicts or overbooked employees
-            2. efficiency_score: Overall efficiency score (1-10)
-            3. suggestions: List of specific improvements
-            4. workload_balance: Assessment of workload distribution
-            
-            Return as JSON format.
-            """
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt}
-                ],
+            result = await self._chat(
+                messages=compiled["messages"],
                 temperature=0.3
             )
-            
-            result = response.choices[0].message.content
             return json.loads(result)
             
         except Exception as e:
-            logger.error(f"Error generating schedule optimization: {str(e)}")
+            self._fallback("Error generating schedule optimization", e)
             return {
                 "conflicts": [],
                 "efficiency_score": 7,
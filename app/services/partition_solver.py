@@ -0,0 +1,123 @@
+from typing import Dict, List, Any, Callable
+from collections import defaultdict
+import re
+
+from .candidate_ranker import score_candidate
+
+_POSTCODE_AREA = re.compile(r"^[A-Z]+")
+
+
+def postcode_area(postcode: str) -> str:
+    """Return the postcode area (leading letters), e.g. 'NE' for 'NE5 7EE'"""
+    match = _POSTCODE_AREA.match((postcode or "").strip().upper())
+    return match.group(0) if match else "UNKNOWN"
+
+
+# Patients are always partitioned by day first; these keys split a day further
+PARTITION_KEYS: Dict[str, Callable[[Any], str]] = {
+    "region": lambda item: postcode_area(item.PostCode),
+    "day": lambda item: "ALL"
+}
+
+
+def build_partitions(patients: List[Any], employees: List[Any], partition_by: str = "region") -> Dict[str, Dict[str, List[Any]]]:
+    """
+    Group patients into independent partitions together with the roster slice
+    that serves them. Partitions without local staff get the full roster.
+    """
+    if partition_by not in PARTITION_KEYS:
+        raise ValueError(f"Unknown partition key: {partition_by}")
+    key_fn = PARTITION_KEYS[partition_by]
+
+    employees_by_key = defaultdict(list)
+    for emp in employees:
+        employees_by_key[key_fn(emp)].append(emp)
+
+    partitions: Dict[str, Dict[str, List[Any]]] = {}
+    for patient in patients:
+        key = key_fn(patient)
+        if key not in partitions:
+            partitions[key] = {
+                "patients": [],
+                "employees": employees_by_key.get(key) or list(employees)
+            }
+        partitions[key]["patients"].append(patient)
+    return partitions
+
+
+def solve_partition(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Greedily solve one partition. Runs inside a worker process, so the payload
+    only contains plain data:
+
+    - date: the day being solved (YYYY-MM-DD)
+    - patients: patient dicts with an extra "service_type" entry
+    - employees: employee dicts (the roster slice)
+    - travel: travel minutes, one row per patient and one column per employee
+    - feasible: optional, one row per patient and one column per employee;
+      False where the pair fails a hard constraint (see CandidatePipeline)
+    - loads / max_loads: visits that day and maximum visits per day per employee
+
+    Medicine patients are solved first (BR-006). Returns one selection per
+    patient that could be served; unserved patients are left out.
+    """
+    patients = payload["patients"]
+    employees = payload["employees"]
+    travel = payload["travel"]
+    feasible = payload.get("feasible")
+    loads = dict(payload["loads"])
+    max_loads = payload["max_loads"]
+
+    order = sorted(range(len(patients)), key=lambda i: patients[i]["service_type"] != "medicine")
+    selections = []
+    for i in order:
+        patient = patients[i]
+        best = None
+        for j, emp in enumerate(employees):
+            emp_id = emp["EmployeeID"]
+            if loads[emp_id] >= max_loads[emp_id]:
+                continue
+            if feasible is not None and not feasible[i][j]:
+                continue
+            # Rule 1: Medicine services require qualified nurses
+            if patient["service_type"] == "medicine" and emp["Qualification"] != "Nurse":
+                continue
+            score = score_candidate(emp, patient, travel[i][j], loads[emp_id], max_loads[emp_id])
+            if best is None or score > best[0]:
+                best = (score, j)
+
+        if best is None:
+            continue
+        score, j = best
+        emp = employees[j]
+        loads[emp["EmployeeID"]] += 1
+        selections.append({
+            "patient_id": patient["PatientID"],
+            "employee_id": emp["EmployeeID"],
+            "service_type": patient["service_type"],
+            "assignment_date": payload.get("date"),
+            "score": score,
+            "estimated_travel_time": travel[i][j],
+            "reasoning": f"Partition solver: best local score {score} ({payload.get('key', 'all')})"
+        })
+    return selections
+
+
+def reconcile_selections(selections: List[Dict[str, Any]], remaining_capacity: Dict[tuple, int]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Merge selections from independently solved partitions. Staff shared by
+    several partitions may have been booked past their remaining capacity for
+    a day (keyed by (employee_id, date)); the highest-scoring selections are
+    kept and the rest are rejected so their patients can be re-solved.
+    """
+    by_employee_day = defaultdict(list)
+    for selection in selections:
+        by_employee_day[(selection["employee_id"], selection["assignment_date"])].append(selection)
+
+    accepted, rejected = [], []
+    for key, emp_selections in by_employee_day.items():
+        emp_selections.sort(key=lambda s: s["score"], reverse=True)
+        limit = max(0, remaining_capacity.get(key, 0))
+        accepted.extend(emp_selections[:limit])
+        rejected.extend(emp_selections[limit:])
+    return {"accepted": accepted, "rejected": rejected}
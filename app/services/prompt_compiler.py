@@ -0,0 +1,210 @@
+from typing import Dict, List, Any, Optional
+import logging
+import os
+
+from ..models.schemas import Employee, Patient, ServiceType, EmployeeAssignment
+
+logger = logging.getLogger(__name__)
+
+# Selection rules shared by the single and batched selection prompts
+SELECTION_RULES = """Key Rules and Priorities (in order):
+1. Qualification Matching: Only qualified nurses for medication tasks. Prioritize Senior Carer > Carer for complex cases. Verify certificate validity.
+2. Geographic Optimization: Minimize travel time based on transport mode, cluster assignments geographically, consider traffic.
+3. Language and Cultural Matching: Prioritize language match, consider cultural/religious compatibility.
+4. Schedule Optimization: Balance workload, respect shift constraints, ensure coverage, handle emergencies.
+5. Other: Respect earliest start/latest end times, transport limitations."""
+
+TABLE_NOTE = 'Tables have a header row and one row per line, with columns separated by "|".'
+
+# Fixed system messages. They never contain request data, so every call of a
+# kind starts with the same tokens and providers can cache the prefix.
+SELECTION_PREFIX = f"""You are an AI assistant for a healthcare rota system. Your task is to select the best employee for a patient assignment based on complex criteria.
+
+{SELECTION_RULES}
+
+{TABLE_NOTE} Candidates are listed best local rank first; travel_min is the travel time to the patient and load the employee's assignments so far.
+
+Select the best employee and return JSON only with:
+1. employee_id: The selected employee's ID
+2. reasoning: Short explanation of how it matches the criteria
+3. priority_score: Score 1-10
+4. estimated_travel_time: Estimated in minutes
+5. estimated_duration: Estimated service duration in minutes
+6. ranked_employee_ids: Up to 5 employee IDs in order of preference, starting with the selected one"""
+
+BATCH_SELECTION_PREFIX = f"""You are an AI assistant for a healthcare rota system. Your task is to select the best employee for each of several patient assignments.
+
+{SELECTION_RULES}
+
+{TABLE_NOTE} Employees are listed once. Each request lists its own candidates as id:travel_min, best local rank first; choose only from a request's candidates.
+
+Return JSON only, in the form {{"selections": [...]}} with one entry per request containing:
+request_id, employee_id, reasoning (one sentence), priority_score (1-10),
+estimated_duration (minutes) and ranked_employee_ids (up to 3 IDs, starting with the selected one)."""
+
+OPTIMIZATION_PREFIX = f"""You are an AI assistant for optimizing healthcare staff schedules.
+
+{TABLE_NOTE}
+
+Analyze the schedule and return JSON only with:
+1. conflicts: Any time conflicts or overbooked employees
+2. efficiency_score: Overall efficiency score (1-10)
+3. suggestions: List of specific improvements
+4. workload_balance: Assessment of workload distribution"""
+
+EMPLOYEE_COLUMNS = ["id", "name", "type", "postcode", "languages", "transport", "shifts", "start", "end", "load"]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English/JSON text (about four characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def _cell(value: Any) -> str:
+    if value is None or value == "":
+        return "-"
+    if isinstance(value, (list, tuple)):
+        return "/".join(_cell(item) for item in value)
+    value = getattr(value, "value", value)
+    return str(value).replace("|", "/").replace("\n", " ").strip()
+
+
+def table(heading: str, columns: List[str], rows: List[List[Any]]) -> str:
+    """A heading line, a header row and one "|"-separated line per row"""
+    lines = [heading, "|".join(columns)]
+    lines.extend("|".join(_cell(value) for value in row) for row in rows)
+    return "\n".join(lines)
+
+
+def read_table(text: str, heading: str) -> List[Dict[str, str]]:
+    """Rows of the table under `heading` (up to the next blank line) as dicts"""
+    lines = text.split("\n")
+    start = lines.index(heading) + 1
+    columns = lines[start].split("|")
+    rows = []
+    for line in lines[start + 1:]:
+        if not line.strip():
+            break
+        rows.append(dict(zip(columns, line.split("|"))))
+    return rows
+
+
+class PromptCompiler:
+    """
+    Builds the selection and optimization prompts: a fixed system message
+    (see the *_PREFIX constants) followed by one user message holding the
+    request data as compact tables, so keys are not repeated per candidate.
+
+    Selection prompts are kept within `token_budget` estimated tokens by
+    dropping the lowest ranked candidates (at least one is always kept).
+    """
+
+    def __init__(self, token_budget: Optional[int] = None):
+        self.token_budget = token_budget if token_budget is not None else int(os.getenv("OPENAI_PROMPT_TOKEN_BUDGET", "2000"))
+
+    def _over_budget(self, messages: List[Dict[str, str]]) -> bool:
+        return self.token_budget > 0 and self.prompt_tokens(messages) > self.token_budget
+
+    @staticmethod
+    def prompt_tokens(messages: List[Dict[str, str]]) -> int:
+        return sum(estimate_tokens(message["content"]) for message in messages)
+
+    @staticmethod
+    def _employee_row(emp: Employee) -> List[Any]:
+        return [
+            emp.EmployeeID, emp.Name, emp.Qualification, emp.PostCode, emp.LanguageSpoken,
+            emp.TransportMode, emp.Shifts, emp.EarliestStart, emp.LatestEnd, emp.current_assignments
+        ]
+
+    def candidate_table(self, employees: List[Employee], travel_times: Dict[str, int]) -> str:
+        return table(
+            "Candidates:",
+            EMPLOYEE_COLUMNS + ["travel_min"],
+            [self._employee_row(emp) + [travel_times.get(emp.EmployeeID, 15)] for emp in employees]
+        )
+
+    def _compiled(self, prefix: str, data: str, candidates: int = 0, trimmed: int = 0) -> Dict[str, Any]:
+        messages = [
+            {"role": "system", "content": prefix},
+            {"role": "user", "content": data}
+        ]
+        return {
+            "messages": messages,
+            "prompt_tokens": self.prompt_tokens(messages),
+            "candidates": candidates,
+            "trimmed": trimmed
+        }
+
+    def selection(
+        self,
+        patient: Patient,
+        employees: List[Employee],
+        service_type: ServiceType,
+        context: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Prompt for choosing one employee; `employees` must be in rank order"""
+        travel_times = context.get("employee_travel_times", {})
+        header = "\n".join([
+            f"Patient: {patient.PatientID} | postcode {patient.PostCode} | language {_cell(patient.LanguagePreference)} | conditions {_cell(patient.Illness)}",
+            f"Service: {service_type.value}",
+            f"Date: {_cell(context.get('assignment_date'))} | preferred time {_cell(context.get('preferred_time'))} | urgency {_cell(context.get('urgency'))}",
+            ""
+        ])
+        kept = list(employees)
+        compiled = self._compiled(SELECTION_PREFIX, header + self.candidate_table(kept, travel_times), len(kept))
+        while len(kept) > 1 and self._over_budget(compiled["messages"]):
+            kept.pop()
+            compiled = self._compiled(
+                SELECTION_PREFIX, header + self.candidate_table(kept, travel_times),
+                len(kept), len(employees) - len(kept)
+            )
+        return compiled
+
+    def batch_selection(self, requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Prompt for several selections. Requests hold a "key", "patient",
+        "service_type", ranked "candidates" and "travel_times". Over budget,
+        the longest candidate lists lose their last candidate first.
+        """
+        kept = {request["key"]: list(request["candidates"]) for request in requests}
+
+        def build() -> Dict[str, Any]:
+            employees = {}
+            for candidates in kept.values():
+                for emp in candidates:
+                    employees.setdefault(emp.EmployeeID, emp)
+            request_rows = []
+            for request in requests:
+                patient = request["patient"]
+                request_rows.append([
+                    request["key"], patient.PatientID, patient.PostCode, patient.LanguagePreference,
+                    patient.Illness, request["service_type"],
+                    " ".join(f"{emp.EmployeeID}:{request['travel_times'].get(emp.EmployeeID, 15)}" for emp in kept[request["key"]])
+                ])
+            data = "\n\n".join([
+                table("Employees:", EMPLOYEE_COLUMNS, [self._employee_row(emp) for emp in employees.values()]),
+                table("Requests:", ["request_id", "patient", "postcode", "language", "conditions", "service", "candidates"], request_rows)
+            ])
+            total = sum(len(request["candidates"]) for request in requests)
+            sent = sum(len(candidates) for candidates in kept.values())
+            return self._compiled(BATCH_SELECTION_PREFIX, data, sent, total - sent)
+
+        compiled = build()
+        while self._over_budget(compiled["messages"]):
+            longest = max(kept, key=lambda key: len(kept[key]))
+            if len(kept[longest]) <= 1:
+                break
+            kept[longest].pop()
+            compiled = build()
+        return compiled
+
+    def optimization(self, assignments: List[EmployeeAssignment]) -> Dict[str, Any]:
+        """Prompt for reviewing a schedule (assignments are never trimmed)"""
+        rows = [
+            [a.employee_id, a.patient_id, a.service_type, a.assignment_date, a.start_time, a.end_time, a.travel_time]
+            for a in assignments
+        ]
+        return self._compiled(
+            OPTIMIZATION_PREFIX,
+            table("Current assignments:", ["employee", "patient", "service", "date", "start", "end", "travel_min"], rows)
+        )
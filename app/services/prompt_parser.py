@@ -0,0 +1,153 @@
+from typing import Callable, Dict, Any, Iterable, Optional
+import logging
+import os
+import re
+
+from .extraction_cache import normalize_prompt
+from .schedule_horizon import WEEKDAYS
+from ..models.schemas import ServiceType
+
+logger = logging.getLogger(__name__)
+
+_PATIENT_ID = re.compile(r"\bp\d+\b")
+_ID_NUMBER = re.compile(r"^p0*(\d+)$")
+_TIME_24H = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)\b(?!\s*[ap]\.?m)")
+_TIME_12H = re.compile(r"\b(1[0-2]|0?[1-9])(?::([0-5]\d))?\s*([ap])\.?m\b")
+_ISO_DATE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+_DATE_WORD = re.compile(r"\b(today|tomorrow|" + "|".join(WEEKDAYS) + r")\b")
+# Word stem in a prompt -> service type, in priority order. Broader than the
+# upload keywords (data_processor.SERVICE_KEYWORDS): "medic" also matches
+# medication and medical
+PROMPT_SERVICE_KEYWORDS = [
+    ("medic", ServiceType.MEDICINE),
+    ("exercise", ServiceType.EXERCISE),
+    ("companion", ServiceType.COMPANIONSHIP),
+    ("personal", ServiceType.PERSONAL_CARE),
+    ("care", ServiceType.PERSONAL_CARE)
+]
+_SERVICE_WORD = re.compile(r"\b(" + "|".join(keyword for keyword, _ in PROMPT_SERVICE_KEYWORDS) + r")\w*")
+# Prompts that change or undo something need the LLM to read them properly
+_NEGATION = re.compile(r"\b(not|don't|dont|cancel|instead|except|without|unless|remove)\b")
+
+# Checked in order, so "not urgent" is read as low before "urgent" matches
+URGENCY_WORDS = {
+    "low": re.compile(r"\b(low priority|no rush|whenever|not urgent)\b"),
+    "high": re.compile(r"\b(urgent|urgently|asap|emergency|immediately|high priority|critical)\b")
+}
+
+
+class PromptParser:
+    """
+    Rule-based extraction for the common prompt shapes ("The patient P001 is
+    required Exercise today..."). Returns the same fields as the LLM
+    extraction plus a confidence score; callers only fall back to the LLM
+    when the confidence is below `threshold`.
+
+    `patient_ids` returns the loaded patient IDs. Patient references are
+    matched against them, so "p7" or "P0007" resolve to whichever ID has
+    that number ("P007"); without it they are only uppercased.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, patient_ids: Optional[Callable[[], Iterable[str]]] = None):
+        self.threshold = threshold if threshold is not None else float(os.getenv("OPENAI_LOCAL_PARSE_THRESHOLD", "0.8"))
+        self.patient_ids = patient_ids
+        self.parsed = 0
+        self.fast_path = 0
+
+    def _resolve_patient_ids(self, tokens: Iterable[str]) -> Dict[str, bool]:
+        """Patient ID for each referenced token, mapped to whether it is a known patient"""
+        known = list(self.patient_ids()) if self.patient_ids else []
+        by_id = {patient_id.lower(): patient_id for patient_id in known}
+        by_number: Dict[int, list] = {}
+        for patient_id in known:
+            match = _ID_NUMBER.match(patient_id.lower())
+            if match:
+                by_number.setdefault(int(match.group(1)), []).append(patient_id)
+
+        resolved = {}
+        for token in tokens:
+            patient_id = by_id.get(token)
+            if patient_id is None:
+                # Same number, different zero padding; ambiguous numbers stay unresolved
+                matches = by_number.get(int(_ID_NUMBER.match(token).group(1)), [])
+                patient_id = matches[0] if len(matches) == 1 else None
+            if patient_id is not None:
+                resolved[patient_id] = True
+            else:
+                resolved.setdefault(token.upper(), False)
+        return resolved
+
+    def parse(self, prompt: str) -> Dict[str, Any]:
+        """Extract assignment details and a confidence score in [0, 1]"""
+        text = normalize_prompt(prompt)
+        confidence = 0.0
+
+        patient_ids = self._resolve_patient_ids(_PATIENT_ID.findall(text))
+        patient_id = next(iter(patient_ids)) if len(patient_ids) == 1 else None
+        # An ID that matches no loaded patient is left to the LLM to read
+        if patient_id and (patient_ids[patient_id] or self.patient_ids is None):
+            confidence += 0.5
+
+        # Several services resolve to the highest priority one (medicine first, BR-006)
+        found = {dict(PROMPT_SERVICE_KEYWORDS)[match] for match in _SERVICE_WORD.findall(text)}
+        services = [service_type for _, service_type in PROMPT_SERVICE_KEYWORDS if service_type in found]
+        if len(found) == 1:
+            confidence += 0.3
+        elif found:
+            confidence += 0.2
+
+        times = [f"{int(hour):02d}:{minute}" for hour, minute in _TIME_24H.findall(text)]
+        for hour, minute, meridiem in _TIME_12H.findall(text):
+            hour = int(hour) % 12 + (12 if meridiem == "p" else 0)
+            times.append(f"{hour:02d}:{minute or '00'}")
+        # Conflicting times or dates are left to the LLM
+        if len(set(times)) <= 1:
+            confidence += 0.1
+        else:
+            confidence -= 0.2
+            times = []
+
+        dates = set(_DATE_WORD.findall(text)) | set(_ISO_DATE.findall(text))
+        if len(dates) <= 1:
+            confidence += 0.1
+        else:
+            confidence -= 0.2
+            dates = set()
+
+        urgency = "medium"
+        for level, pattern in URGENCY_WORDS.items():
+            if pattern.search(text):
+                urgency = level
+                break
+
+        if _NEGATION.search(text.replace("not urgent", "")):
+            confidence -= 0.3
+
+        return {
+            "details": {
+                "patient_id": patient_id,
+                "service_type": services[0].value if services else None,
+                "preferred_time": times[0] if times else None,
+                "preferred_date": next(iter(dates)) if dates else None,
+                "urgency": urgency
+            },
+            "confidence": round(max(0.0, confidence), 2)
+        }
+
+    def try_parse(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Parsed details if confident enough to skip the LLM, otherwise None"""
+        result = self.parse(prompt)
+        self.parsed += 1
+        if result["confidence"] >= self.threshold:
+            self.fast_path += 1
+            logger.debug(f"Local parse (confidence {result['confidence']}): {result['details']}")
+            return result["details"]
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "threshold": self.threshold,
+            "parsed": self.parsed,
+            "fast_path": self.fast_path,
+            "fast_path_rate": round(self.fast_path / self.parsed, 4) if self.parsed else 0.0
+        }
@@ -0,0 +1,57 @@
+from typing import Dict, Any, Optional
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket: `rate` tokens per second refill a bucket of `burst` tokens,
+    and acquire() waits on the event loop until enough are available. Used to
+    keep provider calls within their quota before they go to the thread pool.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: int = 1, timeout: Optional[float] = None) -> bool:
+        """Take `tokens`, waiting up to `timeout` seconds (forever if None); False if the wait would be longer"""
+        if self.rate <= 0:
+            return True
+        tokens = min(tokens, self.burst)
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.acquired += 1
+                    if now > started:
+                        self.waited_seconds += now - started
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if timeout is not None and now + wait - started > timeout:
+                self.throttled += 1
+                return False
+            await asyncio.sleep(wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "waited_seconds": round(self.waited_seconds, 3)
+        }
@@ -0,0 +1,121 @@
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """Stable hash of a request's normalized content"""
+    text = "\x1f".join(" ".join(str(part).lower().split()) for part in parts)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused for a different request"""
+
+
+class RequestCoalescer:
+    """
+    Runs each distinct request once. Concurrent callers with the same key await
+    the same in-flight task, which is only cancelled when every one of them has
+    been cancelled, and results of keyed requests are replayed for
+    `ttl_seconds` afterwards. Failures are never cached.
+    """
+
+    def __init__(self, ttl_seconds: float = 600, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self._completed: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+        self.executed = 0
+        self.coalesced = 0
+        self.replayed = 0
+
+    def _purge(self, now: float):
+        while self._completed:
+            key, (expires_at, _, _) = next(iter(self._completed.items()))
+            if expires_at > now and len(self._completed) <= self.max_entries:
+                break
+            del self._completed[key]
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        factory: Callable[[], Awaitable[Any]],
+        cache_result: bool = True
+    ) -> Any:
+        """
+        Return the result for `key`, running `factory` only if no identical
+        request is in flight or cached. Raises IdempotencyConflict if the key
+        was used for a request with a different fingerprint.
+        """
+        now = time.monotonic()
+        self._purge(now)
+
+        cached = self._completed.get(key)
+        if cached:
+            _, cached_fingerprint, result = cached
+            if cached_fingerprint != fingerprint:
+                raise IdempotencyConflict(f"Idempotency key {key} was already used for a different request")
+            self.replayed += 1
+            return result
+
+        in_flight = self._in_flight.get(key)
+        if in_flight:
+            in_flight_fingerprint, task = in_flight
+            if in_flight_fingerprint != fingerprint:
+                raise IdempotencyConflict(f"Idempotency key {key} is in use by a different request")
+            self.coalesced += 1
+        else:
+            # The run is detached from the caller that starts it, so a caller
+            # going away does not cancel it for the others waiting on it
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = (fingerprint, task)
+            self.executed += 1
+            task.add_done_callback(lambda done: self._finished(key, fingerprint, done, cache_result))
+        return await self._wait(key, task)
+
+    async def _wait(self, key: str, task: asyncio.Future) -> Any:
+        """Await a shared run; the run is cancelled once its last waiter is"""
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                task.cancel()
+                # Later duplicates must start afresh rather than join a cancelled run
+                if self._in_flight.get(key, (None, None))[1] is task:
+                    del self._in_flight[key]
+            raise
+        finally:
+            remaining = self._waiters[task] - 1
+            if remaining:
+                self._waiters[task] = remaining
+            else:
+                del self._waiters[task]
+
+    def _finished(self, key: str, fingerprint: str, task: asyncio.Future, cache_result: bool):
+        if self._in_flight.get(key, (None, None))[1] is task:
+            del self._in_flight[key]
+        if task.cancelled():
+            return
+        # Retrieving the exception also keeps asyncio from logging it when nobody was waiting
+        if task.exception() is None and cache_result:
+            self._completed[key] = (time.monotonic() + self.ttl_seconds, fingerprint, task.result())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "replayed": self.replayed,
+            "in_flight": len(self._in_flight),
+            "waiting": sum(self._waiters.values()),
+            "cached": len(self._completed),
+            "ttl_seconds": self.ttl_seconds
+        }
@@ -0,0 +1,86 @@
+from typing import Callable, Dict, Any, Optional
+from contextlib import contextmanager
+import logging
+
+from .schedule_horizon import ScheduleHorizon, to_minutes
+from ..models.schemas import Employee, EmployeeAssignment
+
+logger = logging.getLogger(__name__)
+
+
+class ReservationConflict(Exception):
+    """The employee no longer has capacity or a free slot for the assignment"""
+
+
+class ReservationManager:
+    """
+    Tentative holds on employee capacity and time slots, with optimistic
+    re-validation: a request validates its chosen employee against the live
+    day horizon only after its slow steps (the AI call) have finished, places
+    a hold and then commits or releases it.
+
+    No lock is needed. The check and the hold happen together without an
+    await, so on the event loop two requests for the same employee cannot
+    both take its last slot; the loser falls back to its next ranked
+    candidate. Holds are keyed on the horizon, so they may be kept across
+    awaits: committing passes the key to AssignmentStore.add(), which turns
+    the hold into the committed visit, and release() drops any hold that
+    was not committed.
+    """
+
+    def __init__(self, horizon: ScheduleHorizon):
+        self.horizon = horizon
+        self.held = 0
+        self.committed = 0
+        self.released = 0
+        self.conflicts = 0
+
+    def check(self, employee: Employee, assignment: EmployeeAssignment) -> Optional[str]:
+        """Return why the assignment cannot be held, or None if it can"""
+        day = assignment.assignment_date
+        if not self.horizon.has_capacity(employee.EmployeeID, day, employee.max_patients_per_day):
+            return f"{employee.Name} has no capacity left on {day}"
+        start = to_minutes(assignment.start_time)
+        if self.horizon.overlaps(employee.EmployeeID, day, start, start + assignment.estimated_duration):
+            return f"{employee.Name} already has a visit at {assignment.start_time} on {day}"
+        return None
+
+    def hold(self, employee: Employee, assignment: EmployeeAssignment) -> int:
+        """Re-check the assignment and hold its slot, returning the hold key; raises ReservationConflict"""
+        reason = self.check(employee, assignment)
+        if reason:
+            self.conflicts += 1
+            raise ReservationConflict(reason)
+        self.held += 1
+        return self.horizon.hold(assignment)
+
+    def release(self, hold: int):
+        """End a hold: dropped if it was not committed, counted as committed if it was"""
+        if self.horizon.release(hold):
+            self.released += 1
+        else:
+            self.committed += 1
+
+    @contextmanager
+    def reserve(self, employee: Employee, build: Callable[[], EmployeeAssignment]):
+        """
+        Hold a slot for the assignment returned by `build` (called here, so it
+        sees every earlier hold) and yield (assignment, hold key). Raises
+        ReservationConflict if the employee cannot take it. The block commits
+        the assignment with the hold key; otherwise the hold is released when
+        the block exits.
+        """
+        assignment = build()
+        hold = self.hold(employee, assignment)
+        try:
+            yield assignment, hold
+        finally:
+            self.release(hold)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "held": self.held,
+            "committed": self.committed,
+            "released": self.released,
+            "conflicts": self.conflicts
+        }
@@ -1,165 +1,947 @@
-from typing import List, Dict, Optional, Any
-from datetime import datetime, timedelta
+from typing import Callable, List, Dict, Optional, Any, Tuple
+from datetime import datetime, timedelta, date
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
 import logging
+import os
+import time
+import uuid
 
 from .data_processor import DataProcessor
 from .openai_service import OpenAIService
-from .travel_service import TravelService
+from .travel_service import TravelService, DEFAULT_TRAVEL_MINUTES
+from .partition_solver import build_partitions, solve_partition, reconcile_selections
+from .schedule_horizon import shift_for_time, to_minutes, week_dates, resolve_date
+from .assignment_store import AssignmentStore
+from .candidate_ranker import score_candidate
+from .candidate_pipeline import build_candidate_pipeline
+from .reservations import ReservationManager, ReservationConflict
+from .rota_validator import validate_rota
+from .schedule_analytics import ScheduleAnalytics
+from .deadline import deadline
 from ..models.schemas import (
     EmployeeAssignment, Employee, Patient, ServiceType, 
-    EmployeeType, DailySchedule, QualificationEnum
+    EmployeeType, DailySchedule, AssignmentRequestItem
 )
 from ..database import DatabaseManager
 
 logger = logging.getLogger(__name__)
 
 class RotaService:
-    def __init__(self, data_processor: DataProcessor, openai_service: OpenAIService, db_manager: DatabaseManager, travel_service: TravelService):
+    def __init__(
+        self,
+        data_processor: DataProcessor,
+        openai_service: OpenAIService,
+        db_manager: DatabaseManager,
+        travel_service: TravelService,
+        assignment_store: Optional[AssignmentStore] = None,
+        persist: bool = True,
+        partition_executor: Optional[ProcessPoolExecutor] = None
+    ):
         self.data_processor = data_processor
         self.openai_service = openai_service
-        self.current_assignments: List[EmployeeAssignment] = []
+        self.assignment_store = assignment_store if assignment_store is not None else AssignmentStore()
+        self.horizon = self.assignment_store.horizon
         self.db_manager = db_manager
         self.travel_service = travel_service
+        # When False (simulations), nothing is written to the database
+        self.persist = persist
+        self.candidate_pipeline = build_candidate_pipeline(travel_service, self.horizon)
+        self.reservations = ReservationManager(self.horizon)
+        self.analytics = ScheduleAnalytics()
+        # Only the top locally ranked candidates are sent to the AI
+        self.shortlist_size = int(os.getenv("OPENAI_SHORTLIST_SIZE", "10"))
+        # Patients per batched AI selection call during weekly generation
+        self.selection_batch_size = int(os.getenv("OPENAI_SELECTION_BATCH_SIZE", "10"))
+        # Time budget for the AI steps of a single assignment request (NFR-P004);
+        # calls still running when it is spent fall back to local engines
+        self.request_deadline = float(os.getenv("ROTA_REQUEST_DEADLINE_SECONDS", "2"))
+        self.shortlist_stats = {
+            "requests": 0,
+            "candidates_seen": 0,
+            "candidates_sent": 0,
+            "estimated_tokens_sent": 0,
+            "estimated_tokens_saved": 0,
+            "off_list_picks": 0
+        }
+        # Ranked alternatives kept per committed assignment, awaiting confirmation
+        self.proposals: Dict[str, Dict[str, Any]] = {}
+        self.alternatives_count = int(os.getenv("ROTA_ALTERNATIVES", "3"))
+        self.proposal_ttl = int(os.getenv("ROTA_PROPOSAL_TTL_SECONDS", "900"))
+        # Only assignments inside the active horizon window are held in memory
+        # Worker processes for partitioned solving, started on first use and
+        # shared with forks; closed by close()
+        self.partition_executor = partition_executor if partition_executor is not None else ProcessPoolExecutor(
+            max_workers=int(os.getenv("ROTA_PARTITION_WORKERS", "0")) or os.cpu_count()
+        )
+        self.horizon_past_days = int(os.getenv("ROTA_HORIZON_PAST_DAYS", "7"))
+        self.horizon_future_days = int(os.getenv("ROTA_HORIZON_FUTURE_DAYS", "56"))
+        self.loaded_range: Optional[Tuple[str, str]] = None
         # Load existing assignments from database
-        self._load_assignments_from_database()
+        if assignment_store is None:
+            self._load_assignments_from_database()
+    
+    def fork(self) -> "RotaService":
+        """
+        Copy-on-write snapshot of this service for what-if runs: copied roster,
+        snapshotted assignment indexes and persistence disabled
+        """
+        forked = RotaService(
+            self.data_processor.snapshot(),
+            self.openai_service,
+            self.db_manager,
+            self.travel_service,
+            assignment_store=self.assignment_store.snapshot(),
+            persist=False,
+            partition_executor=self.partition_executor
+        )
+        forked.loaded_range = self.loaded_range
+        return forked
+    
+    def close(self):
+        """Stop the partition worker processes"""
+        self.partition_executor.shutdown(cancel_futures=True)
+    
+    def _log_operation(self, operation_type: str, description: str, details: Dict[str, Any] = None):
+        """Log an operation unless persistence is disabled"""
+        if self.persist:
+            self.db_manager.log_operation(operation_type, description, details)
+    
+    def _assignment_from_row(self, assignment_data: Dict[str, Any]) -> EmployeeAssignment:
+        """Build an assignment from a database row"""
+        return EmployeeAssignment(
+            employee_id=assignment_data['employee_id'],
+            employee_name=assignment_data['employee_name'],
+            patient_id=assignment_data['patient_id'],
+            patient_name=assignment_data['patient_name'],
+            service_type=ServiceType(assignment_data['service_type']),
+            assigned_time=assignment_data['assigned_time'],
+            estimated_duration=assignment_data.get('duration', 30),
+            travel_time=assignment_data.get('travel_time', 15),
+            start_time=assignment_data.get('start_time', ''),
+            end_time=assignment_data.get('end_time', ''),
+            priority_score=assignment_data.get('priority_score', 5.0),
+            assignment_reason=assignment_data.get('reasoning', ''),
+            assignment_date=assignment_data.get('assignment_date') or (assignment_data.get('created_at') or '')[:10] or None,
+            shift=assignment_data.get('shift') or (shift_for_time(assignment_data['start_time']) if assignment_data.get('start_time') else None)
+        )
+    
+    def _assignments_from_rows(self, rows: List[Dict[str, Any]]) -> List[EmployeeAssignment]:
+        assignments = []
+        for assignment_data in rows:
+            try:
+                assignments.append(self._assignment_from_row(assignment_data))
+            except Exception as e:
+                logger.warning(f"Error loading assignment {assignment_data.get('id', 'unknown')}: {str(e)}")
+        return assignments
     
     def _load_assignments_from_database(self):
-        """Load existing assignments from database"""
+        """Load the assignments of the active horizon window from the database"""
         try:
-            db_assignments = self.db_manager.get_assignments()
-            self.current_assignments = []
-            for assignment_data in db_assignments:
+            today = date.today()
+            self.assignment_store.clear()
+            self.loaded_range = None
+            self._ensure_loaded(
+                (today - timedelta(days=self.horizon_past_days)).isoformat(),
+                (today + timedelta(days=self.horizon_future_days)).isoformat()
+            )
+            logger.info(f"Loaded {len(self.assignment_store)} assignments from database for {self.loaded_range[0]}..{self.loaded_range[1]}")
+        except Exception as e:
+            logger.error(f"Error loading assignments from database: {str(e)}")
+    
+    def _ensure_loaded(self, start_date: str, end_date: str):
+        """Extend the in-memory window to cover start_date..end_date with bounded range queries"""
+        if self.loaded_range is None:
+            ranges = [(start_date, end_date)]
+        else:
+            loaded_start, loaded_end = self.loaded_range
+            ranges = []
+            if start_date < loaded_start:
+                ranges.append((start_date, (date.fromisoformat(loaded_start) - timedelta(days=1)).isoformat()))
+            if end_date > loaded_end:
+                ranges.append(((date.fromisoformat(loaded_end) + timedelta(days=1)).isoformat(), end_date))
+            start_date, end_date = min(start_date, loaded_start), max(end_date, loaded_end)
+        if not ranges:
+            return
+        
+        for range_start, range_end in ranges:
+            for assignment_data in self.db_manager.get_assignments_between(range_start, range_end):
+                if self.assignment_store.get(assignment_data.get('id')) is not None:
+                    continue
                 try:
-                    assignment = EmployeeAssignment(
-                        employee_id=assignment_data['employee_id'],
-                        employee_name=assignment_data['employee_name'],
-                        patient_id=assignment_data['patient_id'],
-                        patient_name=assignment_data['patient_name'],
-                        service_type=ServiceType(assignment_data['service_type']),
-                        assigned_time=assignment_data['assigned_time'],
-                        estimated_duration=assignment_data.get('duration', 30),
-                        travel_time=assignment_data.get('travel_time', 15),
-                        start_time=assignment_data.get('start_time', ''),
-                        end_time=assignment_data.get('end_time', ''),
-                        priority_score=assignment_data.get('priority_score', 5.0),
-                        assignment_reason=assignment_data.get('reasoning', '')
-                    )
-                    self.current_assignments.append(assignment)
+                    self.assignment_store.add(self._assignment_from_row(assignment_data), record_id=assignment_data.get('id'))
                 except Exception as e:
                     logger.warning(f"Error loading assignment {assignment_data.get('id', 'unknown')}: {str(e)}")
-            
-            logger.info(f"Loaded {len(self.current_assignments)} assignments from database")
-        except Exception as e:
-            logger.error(f"Error loading assignments from database: {str(e)}")
+        self.loaded_range = (start_date, end_date)
+        
+        # Restore employee workload counters from the store totals
+        for employee in self.data_processor.employees:
+            employee.current_assignments = self.assignment_store.employee_totals(employee.EmployeeID)["visits"]
+    
+    def _in_loaded_range(self, start_date: str, end_date: str) -> bool:
+        return self.loaded_range is not None and self.loaded_range[0] <= start_date and end_date <= self.loaded_range[1]
+    
+    def employee_assignments(self, employee_id: str, start_date: str, end_date: Optional[str] = None) -> List[EmployeeAssignment]:
+        """An employee's assignments over a date range, from the horizon inside the loaded window, else the database"""
+        end_date = end_date or start_date
+        if self._in_loaded_range(start_date, end_date):
+            return self.horizon.employee_assignments(employee_id, start_date, end_date)
+        return self._assignments_from_rows(self.db_manager.get_employee_assignments(employee_id, start_date, end_date))
+    
+    def shift_assignments(self, assignment_date: str, shift: str) -> List[EmployeeAssignment]:
+        """All assignments of one shift on one day, from the horizon inside the loaded window, else the database"""
+        if self._in_loaded_range(assignment_date, assignment_date):
+            return self.horizon.shift_assignments(assignment_date, shift)
+        return self._assignments_from_rows(self.db_manager.get_shift_assignments(assignment_date, shift))
     
-    async def process_assignment_request(self, prompt: str) -> EmployeeAssignment:
+    async def process_assignment_request(self, prompt: str, assignment_date: Optional[str] = None) -> EmployeeAssignment:
         """
-        Process a natural language assignment request and return the best assignment
+        Process a natural language assignment request and return the best assignment.
+        An explicit assignment_date (YYYY-MM-DD) overrides any day named in the prompt.
         """
+        result = await self.propose_assignment(prompt, assignment_date, top_k=0)
+        return result["assignment"]
+    
+    async def propose_assignment(
+        self,
+        prompt: str,
+        assignment_date: Optional[str] = None,
+        top_k: Optional[int] = None,
+        on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Commit the best assignment for a request and keep the next top_k ranked
+        candidates as pre-built alternatives that confirm_alternative can swap in
+        without another extraction or scoring pass.
+
+        on_event(stage, data) is called as each stage completes ("parsed",
+        "shortlist", "travel_times", "token" for each piece of the AI's answer
+        as it is generated, and "selected") so callers can stream progress.
+        """
+        top_k = self.alternatives_count if top_k is None else top_k
+        emit = on_event or (lambda stage, data: None)
         try:
-            # Step 1: Extract details from the prompt using AI
-            assignment_details = await self.openai_service.extract_assignment_details(prompt)
-            
-            patient_id = assignment_details.get("patient_id")
-            service_type_str = assignment_details.get("service_type", "medicine")
-            preferred_time = assignment_details.get("preferred_time")
-            urgency = assignment_details.get("urgency", "medium")
-            
-            if not patient_id:
-                raise Exception("Could not identify patient ID from the request")
-            
-            # Step 2: Get patient information
-            patient = self.data_processor.get_patient_by_id(patient_id)
-            if not patient:
-                raise Exception(f"Patient {patient_id} not found")
-            
-            # Step 3: Map service type
-            service_type = self._map_service_type(service_type_str)
-            
-            # Step 4: Get qualified employees for this service
-            qualified_employees = self.data_processor.get_qualified_employees_for_service(service_type)
-            
-            if not qualified_employees:
-                raise Exception(f"No qualified employees available for {service_type.value} service")
-            
-            # Step 5: Filter available employees based on current workload
-            available_employees = self._filter_available_employees(qualified_employees)
+            with deadline(self.request_deadline):
+                # Step 1: Extract details from the prompt using AI
+                assignment_details = await self.openai_service.extract_assignment_details(prompt)
+                emit("parsed", assignment_details)
+                
+                # Steps 2-6: Resolve, prune and shortlist
+                request = await self._prepare_request(assignment_details, assignment_date)
+                emit("shortlist", {
+                    "patient_id": request["patient"].PatientID,
+                    "service_type": request["service_type"].value,
+                    "assignment_date": request["assignment_date"],
+                    "candidates": len(request["candidates"]),
+                    "pruning": request["pruning"],
+                    "shortlist": [
+                        {"id": emp.EmployeeID, "name": emp.Name, "qualification": emp.Qualification.value}
+                        for emp in request["shortlist"]
+                    ]
+                })
+                emit("travel_times", {
+                    emp.EmployeeID: request["travel_times"].get(emp.EmployeeID, 15) for emp in request["shortlist"]
+                })
+                
+                ai_result = await self.openai_service.find_best_assignment(
+                    request["patient"], request["shortlist"], request["service_type"], request["context"],
+                    on_token=(lambda text: emit("token", {"text": text})) if on_event else None
+                )
+                emit("selected", {
+                    "employee_id": ai_result.get("employee_id"),
+                    "ranked_employee_ids": ai_result.get("ranked_employee_ids") or [],
+                    "reasoning": ai_result.get("reasoning")
+                })
             
-            if not available_employees:
-                raise Exception("No employees available at this time")
+            # Steps 7-8: Reserve, commit and build alternatives
+            return await self._finalize_request(request, ai_result, top_k, prompt)
             
-            # Calculate travel times
-            employee_travel_times = {}
-            for emp in available_employees:
-                travel_time = self.travel_service.calculate_travel_time(emp.Address, patient.Address, emp.TransportMode.value.lower())
-                employee_travel_times[emp.EmployeeID] = travel_time
-
+        except Exception as e:
+            logger.error(f"Error processing assignment request: {str(e)}")
+            raise
+    
+    async def _prepare_request(
+        self,
+        assignment_details: Dict[str, Any],
+        assignment_date: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Resolve extracted details, prune the roster and shortlist candidates for
+        the AI. Travel is looked up while pruning, for the employees that pass
+        the cheaper stages only.
+        """
+        patient_id = assignment_details.get("patient_id")
+        service_type_str = assignment_details.get("service_type") or "medicine"
+        preferred_time = assignment_details.get("preferred_time")
+        urgency = assignment_details.get("urgency", "medium")
+        assignment_date = assignment_date or resolve_date(assignment_details.get("preferred_date"))
+        self._ensure_loaded(assignment_date, assignment_date)
+        
+        if not patient_id:
+            raise Exception("Could not identify patient ID from the request")
+        
+        # Step 2: Get patient information
+        patient = self.data_processor.get_patient_by_id(patient_id)
+        if not patient:
+            raise Exception(f"Patient {patient_id} not found")
+        
+        # Step 3: Map service type
+        service_type = self._map_service_type(service_type_str)
+        
+        # Step 4: Prune the roster with the hard-constraint stages (qualification,
+        # certificates, shift, working hours, transport, capacity)
+        pruning_request = {
+            "patient": patient,
+            "service_type": service_type,
+            "assignment_date": assignment_date,
+            "preferred_time": preferred_time,
+            "travel_times": {}
+        }
+        pruning = await self.candidate_pipeline.run(self.data_processor.employees, pruning_request)
+        available_employees = pruning["candidates"]
+        
+        if not available_employees:
+            eliminated_at = pruning["stages"][-1]["stage"] if pruning["stages"] else "none"
+            raise Exception(f"No employees available for {service_type.value} service on {assignment_date} (eliminated at {eliminated_at} stage)")
+        
+        # Step 5: Travel times for the candidates (reusing those computed while pruning)
+        employee_travel_times = await self._travel_times(patient, available_employees, pruning_request["travel_times"])
+        
+        # Step 6: Rank locally (travel, language, load, seniority) and send
+        # only the top candidates to the AI to bound the prompt size
+        local_ranking = self._rank_candidates(patient, available_employees, employee_travel_times, assignment_date)
+        shortlist = local_ranking[:self.shortlist_size] if self.shortlist_size > 0 else local_ranking
+        self._record_shortlist(patient, local_ranking, shortlist, employee_travel_times)
+        
+        return {
+            "patient": patient,
+            "service_type": service_type,
+            "service_type_str": service_type_str,
+            "preferred_time": preferred_time,
+            "assignment_date": assignment_date,
+            "candidates": available_employees,
+            "travel_times": employee_travel_times,
+            "shortlist": shortlist,
+            "pruning": pruning["stages"],
             # Enhanced context with more details
-            context = {
+            "context": {
                 "preferred_time": preferred_time,
+                "assignment_date": assignment_date,
                 "urgency": urgency,
-                "current_assignments": len(self.current_assignments),
+                "current_assignments": len(self.assignment_store),
                 "requirements": "Follow all system requirements for matching",
                 "employee_travel_times": employee_travel_times
             }
-            
-            ai_result = await self.openai_service.find_best_assignment(
-                patient, available_employees, service_type, context
-            )
-            
-            # Step 7: Create the assignment
-            selected_employee = self.data_processor.get_employee_by_id(ai_result["employee_id"])
-            if not selected_employee:
-                raise Exception("Selected employee not found")
-            
-            assignment = self._create_assignment(
-                employee=selected_employee,
-                patient=patient,
-                service_type=service_type,
-                ai_result=ai_result,
-                preferred_time=preferred_time
-            )
-            
-            # Step 8: Add to current assignments
-            self.current_assignments.append(assignment)
-            
-            # Step 9: Update employee's current assignment count
-            selected_employee.current_assignments += 1
-            
-            logger.info(f"Assignment created: {selected_employee.Name} -> {patient.PatientName} for {service_type.value}")
-            
-            # Log operation
-            self.db_manager.log_operation(
-                operation_type="assignment_request",
-                description=f"Processed assignment for patient {patient_id}",
-                details={"prompt": prompt, "service_type": service_type_str}
+        }
+    
+    async def _finalize_request(self, request: Dict[str, Any], ai_result: Dict[str, Any], top_k: int, prompt: str) -> Dict[str, Any]:
+        """Commit the AI's choice (or the next available ranked candidate) and build alternatives"""
+        patient = request["patient"]
+        service_type = request["service_type"]
+        preferred_time = request["preferred_time"]
+        assignment_date = request["assignment_date"]
+        employee_travel_times = request["travel_times"]
+        
+        # Full ranking: the AI preference order among the shortlist first, then
+        # the remaining candidates by local score (with loads as they are now)
+        shortlist_ids = {emp.EmployeeID for emp in request["shortlist"]}
+        selected_id = ai_result.get("employee_id")
+        preferred_ids = [
+            emp_id for emp_id in [selected_id] + list(ai_result.get("ranked_employee_ids") or [])
+            if emp_id in shortlist_ids
+        ]
+        if selected_id not in shortlist_ids:
+            self.shortlist_stats["off_list_picks"] += 1
+            logger.warning(f"AI selected employee {selected_id} is not on the shortlist, using local ranking")
+        ranked_employees = self._rank_candidates(
+            patient, request["candidates"], employee_travel_times, assignment_date,
+            preferred_ids=preferred_ids
+        )
+        
+        # Step 7: Reserve and commit. Other requests may have booked staff
+        # while the AI call was running, so each candidate is re-checked when
+        # its slot is held and the next ranked one is tried on conflict.
+        assignment = selected_employee = record_id = None
+        for rank, emp in enumerate(ranked_employees, start=1):
+            if emp.EmployeeID == selected_id:
+                emp_result = ai_result
+            else:
+                emp_result = {
+                    "estimated_travel_time": employee_travel_times.get(emp.EmployeeID, 15),
+                    "estimated_duration": ai_result.get("estimated_duration", 30),
+                    "priority_score": ai_result.get("priority_score", 5.0),
+                    "reasoning": f"Rank {rank} candidate by local score"
+                }
+            try:
+                with self.reservations.reserve(emp, lambda: self._create_assignment(
+                    employee=emp,
+                    patient=patient,
+                    service_type=service_type,
+                    ai_result=emp_result,
+                    preferred_time=preferred_time,
+                    assignment_date=assignment_date
+                )) as (held, hold):
+                    # Step 8: Add to current assignments and update workload
+                    record_id = self._commit_assignment(held, emp, hold=hold)
+            except ReservationConflict as e:
+                logger.info(f"Reservation conflict, trying next candidate: {str(e)}")
+                continue
+            assignment, selected_employee = held, emp
+            ranked_employees = ranked_employees[rank:]
+            break
+        
+        if assignment is None:
+            raise Exception(f"No employees still available for {service_type.value} service on {assignment_date}")
+        
+        alternatives = []
+        for emp in ranked_employees:
+            if len(alternatives) >= top_k:
+                break
+            try:
+                alternatives.append(self._create_assignment(
+                    employee=emp,
+                    patient=patient,
+                    service_type=service_type,
+                    ai_result={
+                        "estimated_travel_time": employee_travel_times.get(emp.EmployeeID, 15),
+                        "estimated_duration": ai_result.get("estimated_duration", 30),
+                        "priority_score": ai_result.get("priority_score", 5.0),
+                        "reasoning": f"Alternative to {selected_employee.Name} (rank {len(alternatives) + 2})"
+                    },
+                    preferred_time=preferred_time,
+                    assignment_date=assignment_date
+                ))
+            except ReservationConflict:
+                continue
+        proposal_id = self._store_proposal(record_id, alternatives) if alternatives else None
+        
+        logger.info(f"Assignment created: {selected_employee.Name} -> {patient.PatientName} for {service_type.value}")
+        
+        # Log operation
+        self._log_operation(
+            operation_type="assignment_request",
+            description=f"Processed assignment for patient {patient.PatientID}",
+            details={
+                "prompt": prompt,
+                "service_type": request["service_type_str"],
+                "assignment_date": assignment_date,
+                "pruning": request["pruning"]
+            }
+        )
+
+        return {"assignment": assignment, "alternatives": alternatives, "proposal_id": proposal_id}
+    
+    async def process_batch_requests(self, items: List[AssignmentRequestItem]) -> Dict[str, Any]:
+        """
+        Process many assignment requests together: extract all prompts in
+        parallel, solve the requests jointly (urgent and most constrained first)
+        so they do not compete for the same staff, and commit in one transaction.
+        Selection uses the local candidate ranking, not one AI call per item.
+        """
+        batch_started = time.perf_counter()
+        results = [
+            {"index": i, "success": False, "message": "", "assignment": None, "timing_ms": {}}
+            for i in range(len(items))
+        ]
+
+        # Step 1: Extract details for all prompts in parallel
+        async def extract(i: int, item: AssignmentRequestItem) -> Dict[str, Any]:
+            started = time.perf_counter()
+            details = {}
+            if item.prompt and not (item.patient_id and item.service_type):
+                details = await self.openai_service.extract_assignment_details(item.prompt)
+            results[i]["timing_ms"]["extraction"] = round((time.perf_counter() - started) * 1000, 2)
+            return details
+
+        extracted = await asyncio.gather(*[extract(i, item) for i, item in enumerate(items)])
+
+        # Step 2: Resolve each request and prune its candidates, in parallel so
+        # their travel lookups overlap
+        async def prune(i: int, item: AssignmentRequestItem, details: Dict[str, Any]):
+            started = time.perf_counter()
+            try:
+                patient_id = item.patient_id or details.get("patient_id")
+                if not patient_id:
+                    raise Exception("Could not identify patient ID from the request")
+                patient = self.data_processor.get_patient_by_id(patient_id)
+                if not patient:
+                    raise Exception(f"Patient {patient_id} not found")
+
+                if item.service_type:
+                    service_type = item.service_type
+                elif details.get("service_type"):
+                    service_type = self._map_service_type(details["service_type"])
+                else:
+                    service_type = self.data_processor.get_primary_service(patient)
+
+                assignment_date = resolve_date(item.preferred_date or details.get("preferred_date"))
+                self._ensure_loaded(assignment_date, assignment_date)
+                request = {
+                    "patient": patient,
+                    "service_type": service_type,
+                    "assignment_date": assignment_date,
+                    "preferred_time": item.preferred_time or details.get("preferred_time"),
+                    "urgency": item.urgency or details.get("urgency") or "medium",
+                    "travel_times": {}
+                }
+                pruning = await self.candidate_pipeline.run(self.data_processor.employees, request)
+                if not pruning["candidates"]:
+                    raise Exception(f"No employees available for {service_type.value} service on {request['assignment_date']}")
+                return (i, request, pruning["candidates"])
+            except Exception as e:
+                results[i]["message"] = str(e)
+            finally:
+                results[i]["timing_ms"]["pruning"] = round((time.perf_counter() - started) * 1000, 2)
+            return None
+
+        pending = [
+            entry for entry in await asyncio.gather(*[prune(i, item, details) for i, (item, details) in enumerate(zip(items, extracted))])
+            if entry is not None
+        ]
+
+        # Step 3: Joint solve. Each pick is re-checked and held through the
+        # reservation manager, so later requests (in this batch or concurrent
+        # single requests) see it when checking capacity and free slots.
+        urgency_order = {"high": 0, "medium": 1, "low": 2}
+        pending.sort(key=lambda entry: (urgency_order.get(entry[1]["urgency"], 1), len(entry[2])))
+        selected = []
+        holds = []
+        try:
+            for i, request, candidates in pending:
+                started = time.perf_counter()
+                patient = request["patient"]
+                day = request["assignment_date"]
+                travel_times = await self._travel_times(patient, candidates, request["travel_times"])
+                chosen = None
+                for rank, emp in enumerate(self._rank_candidates(patient, candidates, travel_times, day), start=1):
+                    try:
+                        assignment = self._create_assignment(
+                            employee=emp,
+                            patient=patient,
+                            service_type=request["service_type"],
+                            ai_result={
+                                "estimated_travel_time": travel_times[emp.EmployeeID],
+                                "reasoning": f"Batch assignment: rank {rank} of {len(candidates)} by local score"
+                            },
+                            preferred_time=request["preferred_time"],
+                            assignment_date=day
+                        )
+                        holds.append(self.reservations.hold(emp, assignment))
+                    except ReservationConflict:
+                        continue
+                    chosen = (assignment, emp)
+                    break
+
+                if chosen:
+                    selected.append((i, chosen[0], chosen[1], holds[-1]))
+                else:
+                    results[i]["message"] = "No employee left with capacity for this request"
+                results[i]["timing_ms"]["solve"] = round((time.perf_counter() - started) * 1000, 2)
+
+            # Step 4: Commit everything in one transaction; each hold becomes its committed visit
+            commit_started = time.perf_counter()
+            try:
+                self._commit_assignments(
+                    [(assignment, emp) for _, assignment, emp, _ in selected],
+                    holds=[hold for _, _, _, hold in selected]
+                )
+            except Exception as e:
+                logger.error(f"Error committing batch assignments: {str(e)}")
+                for i, _, _, _ in selected:
+                    results[i]["message"] = f"Commit failed: {str(e)}"
+                selected = []
+        finally:
+            # Holds not committed (a failed commit, or an error or cancellation
+            # while solving) are dropped here
+            for hold in holds:
+                self.reservations.release(hold)
+        for i, assignment, _, _ in selected:
+            results[i].update(success=True, message="Employee assigned successfully", assignment=assignment)
+
+        timing = {
+            "commit": round((time.perf_counter() - commit_started) * 1000, 2),
+            "total": round((time.perf_counter() - batch_started) * 1000, 2)
+        }
+        self._log_operation(
+            operation_type="batch_assignment_request",
+            description=f"Processed batch of {len(items)} assignment requests",
+            details={"requested": len(items), "assigned": len(selected), "timing_ms": timing}
+        )
+        return {"results": results, "timing_ms": timing}
+    
+    async def _travel_times(self, patient: Patient, employees: List[Employee], known: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        """Travel minutes from each employee to the patient, reusing known values"""
+        known = known or {}
+        travel_times = {emp.EmployeeID: known[emp.EmployeeID] for emp in employees if emp.EmployeeID in known}
+        missing = [emp for emp in employees if emp.EmployeeID not in travel_times]
+        if missing:
+            column = (await self.travel_service.roster_matrix_async(missing, [patient]))[:, 0]
+            travel_times.update({emp.EmployeeID: int(minutes) for emp, minutes in zip(missing, column)})
+        return {emp.EmployeeID: travel_times[emp.EmployeeID] for emp in employees}
+    
+    def _rank_candidates(
+        self,
+        patient: Patient,
+        employees: List[Employee],
+        travel_times: Dict[str, int],
+        assignment_date: str,
+        preferred_ids: Optional[List[str]] = None
+    ) -> List[Employee]:
+        """Order candidates: preferred IDs (in order) first, the rest by local score"""
+        by_id = {emp.EmployeeID: emp for emp in employees}
+        ranked = []
+        for emp_id in preferred_ids or []:
+            emp = by_id.pop(emp_id, None)
+            if emp:
+                ranked.append(emp)
+
+        patient_data = patient.dict()
+        scored = [
+            (
+                score_candidate(
+                    emp.dict(), patient_data, travel_times.get(emp.EmployeeID, 15),
+                    self.horizon.count(emp.EmployeeID, assignment_date), emp.max_patients_per_day
+                ),
+                emp
             )
+            for emp in by_id.values()
+        ]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return ranked + [emp for _, emp in scored]
+    
+    def _record_shortlist(
+        self,
+        patient: Patient,
+        ranking: List[Employee],
+        shortlist: List[Employee],
+        travel_times: Dict[str, int]
+    ):
+        """Track shortlist sizes and the prompt tokens saved by leaving candidates out"""
+        sent_tokens = self.openai_service.estimate_candidate_tokens(shortlist, travel_times)
+        omitted = len(ranking) - len(shortlist)
+        stats = self.shortlist_stats
+        stats["requests"] += 1
+        stats["candidates_seen"] += len(ranking)
+        stats["candidates_sent"] += len(shortlist)
+        stats["estimated_tokens_sent"] += sent_tokens
+        stats["estimated_tokens_saved"] += sent_tokens * omitted // max(1, len(shortlist))
+        logger.debug(f"Shortlisted {len(shortlist)} of {len(ranking)} candidates for {patient.PatientID}")
+    
+    def get_shortlist_stats(self) -> Dict[str, Any]:
+        """Cumulative shortlist statistics, with per-request averages"""
+        stats = dict(self.shortlist_stats)
+        requests = max(1, stats["requests"])
+        stats["shortlist_size"] = self.shortlist_size
+        stats["avg_tokens_saved_per_request"] = round(stats["estimated_tokens_saved"] / requests, 1)
+        return stats
+    
+    def _store_proposal(self, record_id: int, alternatives: List[EmployeeAssignment]) -> str:
+        """Keep alternatives for a committed assignment until confirmed or expired"""
+        now = time.time()
+        for expired in [key for key, proposal in self.proposals.items() if proposal["expires_at"] < now]:
+            del self.proposals[expired]
 
-            # After creating assignment
-            self.db_manager.log_assignment(assignment.dict())
+        proposal_id = uuid.uuid4().hex
+        self.proposals[proposal_id] = {
+            "record_id": record_id,
+            "alternatives": alternatives,
+            "expires_at": now + self.proposal_ttl
+        }
+        return proposal_id
+    
+    def confirm_alternative(self, proposal_id: str, employee_id: str) -> EmployeeAssignment:
+        """
+        Replace the committed assignment of a proposal with one of its pre-built
+        alternatives. No extraction or scoring is re-run.
+        """
+        proposal = self.proposals.get(proposal_id)
+        if not proposal or proposal["expires_at"] < time.time():
+            self.proposals.pop(proposal_id, None)
+            raise Exception(f"Proposal {proposal_id} not found or expired")
 
-            return assignment
-            
-        except Exception as e:
-            logger.error(f"Error processing assignment request: {str(e)}")
-            raise
+        alternative = next((a for a in proposal["alternatives"] if a.employee_id == employee_id), None)
+        if not alternative:
+            raise Exception(f"Employee {employee_id} is not an alternative of proposal {proposal_id}")
+
+        employee = self.data_processor.get_employee_by_id(employee_id)
+        start = to_minutes(alternative.start_time)
+        if (not employee
+                or not self.horizon.has_capacity(employee_id, alternative.assignment_date, employee.max_patients_per_day)
+                or self.horizon.overlaps(employee_id, alternative.assignment_date, start, start + alternative.estimated_duration)):
+            raise Exception(f"Employee {employee_id} is no longer available for this assignment")
+
+        # Release the original assignment, then commit the alternative
+        original = self.assignment_store.remove(proposal["record_id"])
+        if original:
+            if self.persist:
+                self.db_manager.delete_assignment(proposal["record_id"])
+            original_employee = self.data_processor.get_employee_by_id(original.employee_id)
+            if original_employee:
+                original_employee.current_assignments -= 1
+        self._commit_assignment(alternative, employee)
+        del self.proposals[proposal_id]
+
+        self._log_operation(
+            operation_type="assignment_confirm",
+            description=f"Confirmed alternative {employee_id} for patient {alternative.patient_id}",
+            details={"proposal_id": proposal_id, "replaced": original.employee_id if original else None}
+        )
+        return alternative
     
-    async def generate_weekly_schedule(self):
-        """Generate weekly schedule for all patients"""
-        self.db_manager.log_operation("weekly_schedule", "Starting weekly schedule generation")
+    async def generate_weekly_schedule(
+        self,
+        partitioned: bool = False,
+        partition_by: str = "region",
+        week_start: Optional[str] = None,
+        days: int = 7
+    ):
+        """Generate weekly schedule for all patients, one visit per patient per day"""
+        horizon_dates = week_dates(week_start, days)
+        self._ensure_loaded(horizon_dates[0], horizon_dates[-1])
+        if partitioned:
+            return await self._generate_partitioned_schedule(horizon_dates, partition_by)
+
+        self._log_operation("weekly_schedule", "Starting weekly schedule generation", {"dates": horizon_dates})
         assignments = []
-        for patient in self.data_processor.patients:
+        batched_calls = individual_calls = 0
+
+        async def prepare(patient: Patient, day: str) -> Optional[Dict[str, Any]]:
+            # The details are known already, so no extraction call is needed
             try:
-                prompt = f"Assign employee for patient {patient.PatientID} requiring {patient.RequiredSupport}"
-                assignment = await self.process_assignment_request(prompt)
-                assignments.append(assignment)
+                details = {
+                    "patient_id": patient.PatientID,
+                    "service_type": self.data_processor.get_primary_service(patient).value
+                }
+                request = await self._prepare_request(details, assignment_date=day)
+                request["prompt"] = f"Assign employee for patient {patient.PatientID} requiring {patient.RequiredSupport}"
+                return request
             except Exception as e:
-                logger.error(f"Failed to assign for {patient.PatientID}: {str(e)}")
-        # Simple optimization: sort by time
-        assignments.sort(key=lambda a: a.assigned_time)
-        self.db_manager.log_operation("weekly_schedule", "Completed weekly schedule", {"assignments_count": len(assignments)})
+                logger.error(f"Failed to assign for {patient.PatientID} on {day}: {str(e)}")
+                return None
+
+        for day in horizon_dates:
+            # Prune and shortlist every patient of the day first, in parallel so
+            # their travel lookups overlap
+            prepared = [
+                request for request in await asyncio.gather(*[prepare(patient, day) for patient in self.data_processor.patients])
+                if request is not None
+            ]
+            # Medicine first (BR-006), so later conflicts fall on other services
+            prepared.sort(key=lambda request: request["service_type"] != ServiceType.MEDICINE)
+            
+            # One AI call per chunk of patients, chunks in parallel
+            chunks = [prepared[i:i + self.selection_batch_size] for i in range(0, len(prepared), max(1, self.selection_batch_size))]
+            selections = {}
+            for chunk_selections in await asyncio.gather(*[
+                self.openai_service.find_best_assignments_batch([
+                    {
+                        "key": request["patient"].PatientID,
+                        "patient": request["patient"],
+                        "service_type": request["service_type"],
+                        "candidates": request["shortlist"],
+                        "travel_times": request["travel_times"]
+                    }
+                    for request in chunk
+                ])
+                for chunk in chunks
+            ]):
+                selections.update(chunk_selections)
+            batched_calls += len(chunks)
+            
+            # Commit in priority order; patients missing from the batched answers
+            # are retried with an individual call
+            for request in prepared:
+                patient = request["patient"]
+                try:
+                    ai_result = selections.get(patient.PatientID)
+                    if ai_result is None:
+                        individual_calls += 1
+                        ai_result = await self.openai_service.find_best_assignment(
+                            patient, request["shortlist"], request["service_type"], request["context"]
+                        )
+                    result = await self._finalize_request(request, ai_result, top_k=0, prompt=request["prompt"])
+                    assignments.append(result["assignment"])
+                except Exception as e:
+                    logger.error(f"Failed to assign for {patient.PatientID} on {day}: {str(e)}")
+        # Simple optimization: sort by date and time
+        assignments.sort(key=lambda a: (a.assignment_date, a.assigned_time))
+        self._log_operation("weekly_schedule", "Completed weekly schedule", {
+            "assignments_count": len(assignments),
+            "batched_ai_calls": batched_calls,
+            "individual_ai_calls": individual_calls
+        })
+        return assignments
+    
+    async def _generate_partitioned_schedule(self, horizon_dates: List[str], partition_by: str = "region") -> List[EmployeeAssignment]:
+        """
+        Generate the weekly schedule by solving independent partitions (one per
+        day, optionally split further by region) in parallel worker processes,
+        then reconciling staff shared across partitions
+        """
+        self._log_operation("weekly_schedule", "Starting partitioned weekly schedule generation", {"partition_by": partition_by, "dates": horizon_dates})
+        employees = self.data_processor.employees
+        patients = self.data_processor.patients
+        partitions = build_partitions(patients, employees, partition_by)
+        # Travel minutes by (employee_id, patient_id), shared by all partitions
+        travel_cache: Dict[tuple, int] = {}
+        loop = asyncio.get_running_loop()
+        # Payloads are built concurrently, so their travel lookups overlap
+        payloads = await asyncio.gather(*[
+            self._build_partition_payload(f"{day}/{key}", day, part["patients"], part["employees"], travel_cache)
+            for day in horizon_dates
+            for key, part in partitions.items()
+        ])
+        results = await asyncio.gather(*[
+            loop.run_in_executor(self.partition_executor, solve_partition, payload) for payload in payloads
+        ])
+        selections = [selection for result in results for selection in result]
+
+        # Reconciliation pass: enforce the daily capacity of shared staff, then
+        # re-solve rejected and unserved patients against the full roster
+        remaining = {
+            (emp.EmployeeID, day): 0 if self.horizon.is_blocked(emp.EmployeeID, day) else emp.max_patients_per_day - self.horizon.count(emp.EmployeeID, day)
+            for emp in employees
+            for day in horizon_dates
+        }
+        reconciled = reconcile_selections(selections, remaining)
+        accepted = reconciled["accepted"]
+        served = {(selection["patient_id"], selection["assignment_date"]) for selection in accepted}
+        for selection in accepted:
+            remaining[(selection["employee_id"], selection["assignment_date"])] -= 1
+
+        # Days are independent, so each day's re-solve runs in its own worker
+        async def resolve_leftover(day: str) -> List[Dict[str, Any]]:
+            leftover = [p for p in patients if (p.PatientID, day) not in served]
+            if not leftover:
+                return []
+            day_remaining = {emp.EmployeeID: remaining[(emp.EmployeeID, day)] for emp in employees}
+            payload = await self._build_partition_payload(f"{day}/reconciliation", day, leftover, employees, travel_cache, day_remaining)
+            return await loop.run_in_executor(self.partition_executor, solve_partition, payload)
+
+        for resolved in await asyncio.gather(*[resolve_leftover(day) for day in horizon_dates]):
+            accepted.extend(resolved)
+
+        assignments = []
+        for selection in accepted:
+            employee = self.data_processor.get_employee_by_id(selection["employee_id"])
+            patient = self.data_processor.get_patient_by_id(selection["patient_id"])
+            try:
+                assignment = self._create_assignment(
+                    employee=employee,
+                    patient=patient,
+                    service_type=ServiceType(selection["service_type"]),
+                    ai_result={
+                        "estimated_travel_time": selection["estimated_travel_time"],
+                        "priority_score": selection["score"],
+                        "reasoning": selection["reasoning"]
+                    },
+                    assignment_date=selection["assignment_date"]
+                )
+            except ReservationConflict as e:
+                logger.warning(f"Failed to assign for {patient.PatientID} on {selection['assignment_date']}: {str(e)}")
+                continue
+            self._commit_assignment(assignment, employee)
+            assignments.append(assignment)
+
+        unassigned = len(patients) * len(horizon_dates) - len(assignments)
+        if unassigned:
+            logger.warning(f"Partitioned schedule left {unassigned} patient visits unassigned")
+        assignments.sort(key=lambda a: (a.assignment_date, a.assigned_time))
+        self._log_operation("weekly_schedule", "Completed partitioned weekly schedule", {
+            "assignments_count": len(assignments),
+            "partitions": len(payloads),
+            "reconciled": len(reconciled["rejected"])
+        })
         return assignments
     
+    async def _build_partition_payload(
+        self,
+        key: str,
+        day: str,
+        patients: List[Patient],
+        employees: List[Employee],
+        travel_cache: Dict[tuple, int],
+        remaining: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the picklable input of one partition: roster slice, travel
+        sub-matrix and the pairs that pass the candidate pipeline's hard
+        constraints (the worker only checks capacity). Travel is only looked up
+        for pairs that pass the cheaper stages; the others are infeasible, so
+        their travel entry is a placeholder the worker never reads.
+        """
+        patient_dicts = []
+        for patient in patients:
+            patient_dict = patient.dict()
+            patient_dict["service_type"] = self.data_processor.get_primary_service(patient).value
+            patient_dicts.append(patient_dict)
+
+        async def prune(patient: Patient, service_type: str) -> set:
+            request = {
+                "patient": patient,
+                "service_type": ServiceType(service_type),
+                "assignment_date": day,
+                "preferred_time": None,
+                # Pairs seen by an earlier partition or day are not looked up again
+                "travel_times": {
+                    emp.EmployeeID: travel_cache[(emp.EmployeeID, patient.PatientID)]
+                    for emp in employees
+                    if (emp.EmployeeID, patient.PatientID) in travel_cache
+                }
+            }
+            pruning = await self.candidate_pipeline.run(employees, request)
+            for employee_id, minutes in request["travel_times"].items():
+                travel_cache[(employee_id, patient.PatientID)] = minutes
+            return {emp.EmployeeID for emp in pruning["candidates"]}
+
+        kept = await asyncio.gather(*[
+            prune(patient, patient_dict["service_type"]) for patient, patient_dict in zip(patients, patient_dicts)
+        ])
+        feasible = [[emp.EmployeeID in kept_ids for emp in employees] for kept_ids in kept]
+        travel = [
+            [travel_cache.get((emp.EmployeeID, patient.PatientID), DEFAULT_TRAVEL_MINUTES) for emp in employees]
+            for patient in patients
+        ]
+
+        if remaining is None:
+            loads = {
+                emp.EmployeeID: emp.max_patients_per_day if self.horizon.is_blocked(emp.EmployeeID, day) else self.horizon.count(emp.EmployeeID, day)
+                for emp in employees
+            }
+        else:
+            loads = {emp.EmployeeID: emp.max_patients_per_day - remaining[emp.EmployeeID] for emp in employees}
+
+        return {
+            "key": key,
+            "date": day,
+            "patients": patient_dicts,
+            "employees": [emp.dict() for emp in employees],
+            "travel": travel,
+            "feasible": feasible,
+            "loads": loads,
+            "max_loads": {emp.EmployeeID: emp.max_patients_per_day for emp in employees}
+        }
+    
+    def _commit_assignment(self, assignment: EmployeeAssignment, employee: Employee, hold: Optional[int] = None) -> int:
+        """Record a new assignment in the database and the assignment store"""
+        return self._commit_assignments([(assignment, employee)], holds=[hold])[0]
+    
+    def _commit_assignments(self, pairs: List[tuple], holds: Optional[List[Optional[int]]] = None) -> List[int]:
+        """
+        Record (assignment, employee) pairs in one database transaction and the
+        store; `holds` are their reservation hold keys, if held
+        """
+        if self.persist:
+            row_ids = self.db_manager.log_assignments([assignment.dict() for assignment, _ in pairs])
+        else:
+            row_ids = [None] * len(pairs)
+        holds = holds or [None] * len(pairs)
+        record_ids = []
+        for (assignment, employee), row_id, hold in zip(pairs, row_ids, holds):
+            employee.current_assignments += 1
+            record_ids.append(self.assignment_store.add(assignment, record_id=row_id, hold=hold))
+        return record_ids
+    
     def _map_service_type(self, service_str: str) -> ServiceType:
         """Map string to ServiceType enum"""
         service_mapping = {
@@ -173,48 +955,60 @@ class RotaService:
         
         return service_mapping.get(service_str.lower(), ServiceType.MEDICINE)
     
-    def _filter_available_employees(self, employees: List[Employee]) -> List[Employee]:
-        """Filter employees based on availability and current workload"""
-        available = []
-        
-        for emp in employees:
-            # Check if employee is not overloaded
-            if emp.current_assignments < emp.max_patients_per_day:
-                available.append(emp)
-        
-        return available
-    
     def _create_assignment(
         self, 
         employee: Employee, 
         patient: Patient, 
         service_type: ServiceType,
         ai_result: Dict[str, Any],
-        preferred_time: Optional[str] = None
+        preferred_time: Optional[str] = None,
+        assignment_date: Optional[str] = None
     ) -> EmployeeAssignment:
-        """Create an EmployeeAssignment object"""
+        """
+        Create an EmployeeAssignment object on the given day (defaults to today).
+        Raises ReservationConflict if the employee has no free slot left that
+        day before their LatestEnd.
+        """
         
         # Calculate timing
         current_time = datetime.now()
+        day = assignment_date or current_time.date().isoformat()
+        day_start = datetime.strptime(day, "%Y-%m-%d")
+        
+        # Get durations from AI result
+        travel_time = ai_result.get("estimated_travel_time", 15)
+        service_duration = ai_result.get("estimated_duration", 30)
         
-        # Use preferred time if provided, otherwise use current time + 1 hour
+        # Use preferred time if provided, otherwise the employee's first free slot
+        # that day (not earlier than an hour from now)
+        start_datetime = None
         if preferred_time:
             try:
                 assigned_time = datetime.strptime(preferred_time, "%H:%M").time()
-                start_datetime = current_time.replace(
-                    hour=assigned_time.hour, 
-                    minute=assigned_time.minute, 
-                    second=0, 
-                    microsecond=0
-                )
+                start_datetime = day_start.replace(hour=assigned_time.hour, minute=assigned_time.minute)
             except:
-                start_datetime = current_time + timedelta(hours=1)
-        else:
-            start_datetime = current_time + timedelta(hours=1)
-        
-        # Get durations from AI result
-        travel_time = ai_result.get("estimated_travel_time", 15)
-        service_duration = ai_result.get("estimated_duration", 30)
+                start_datetime = None
+        if start_datetime is None:
+            try:
+                earliest = to_minutes(employee.EarliestStart)
+            except (ValueError, AttributeError):
+                earliest = 9 * 60
+            # The visit must end by LatestEnd and on the same day (overnight
+            # windows are cut at midnight)
+            try:
+                latest = to_minutes(employee.LatestEnd)
+            except (ValueError, AttributeError):
+                latest = 24 * 60
+            if latest <= earliest:
+                latest = 24 * 60
+            if day == current_time.date().isoformat():
+                # Minutes since the start of the day, so late evenings do not wrap to the morning
+                soonest = current_time + timedelta(hours=1) - day_start
+                earliest = max(earliest, int(soonest.total_seconds() // 60))
+            start_minutes = self.horizon.next_free_start(employee.EmployeeID, day, earliest, service_duration, gap=travel_time)
+            if start_minutes + service_duration > min(latest, 24 * 60):
+                raise ReservationConflict(f"{employee.Name} has no free slot left on {day} before {employee.LatestEnd}")
+            start_datetime = day_start + timedelta(minutes=start_minutes)
         
         # Calculate end time
         end_datetime = start_datetime + timedelta(minutes=service_duration)
@@ -231,14 +1025,34 @@ class RotaService:
             start_time=start_datetime.strftime("%H:%M"),
             end_time=end_datetime.strftime("%H:%M"),
             priority_score=ai_result.get("priority_score", 5.0),
-            assignment_reason=ai_result.get("reasoning", "Automatic assignment")
+            assignment_reason=ai_result.get("reasoning", "Automatic assignment"),
+            assignment_date=start_datetime.date().isoformat(),
+            shift=shift_for_time(start_datetime.strftime("%H:%M"))
         )
         
         return assignment
     
-    def get_current_assignments(self) -> List[Dict]:
-        """Get all current assignments"""
-        return [assignment.dict() for assignment in self.current_assignments]
+    @property
+    def current_assignments(self) -> List[EmployeeAssignment]:
+        """All current assignments (kept for callers of the former list attribute)"""
+        return self.assignment_store.all()
+    
+    def get_current_assignments(
+        self,
+        employee_id: Optional[str] = None,
+        patient_id: Optional[str] = None,
+        service_type: Optional[str] = None,
+        date: Optional[str] = None
+    ) -> List[Dict]:
+        """Get current assignments, optionally filtered through the store indexes"""
+        record_ids = self.assignment_store.query(employee_id, patient_id, service_type, date)
+        return self.assignment_store.serialized(record_ids)
+    
+    def get_employee_workload(self, employee_id: Optional[str] = None) -> Dict[str, Any]:
+        """Running workload totals (visits, minutes worked, travel minutes) per employee"""
+        if employee_id:
+            return {employee_id: self.assignment_store.employee_totals(employee_id)}
+        return self.assignment_store.workload()
     
     def get_employee_schedule(self, employee_id: str, date: str = None) -> DailySchedule:
         """Get daily schedule for a specific employee"""
@@ -249,11 +1063,8 @@ class RotaService:
         if not employee:
             raise Exception(f"Employee {employee_id} not found")
         
-        # Filter assignments for this employee and date
-        employee_assignments = [
-            assignment for assignment in self.current_assignments
-            if assignment.employee_id == employee_id
-        ]
+        # Assignments for this employee and date from the day index
+        employee_assignments = self.employee_assignments(employee_id, date)
         
         # Calculate metrics
         total_working_hours = sum(
@@ -277,29 +1088,41 @@ class RotaService:
             workload_percentage=workload_percentage
         )
     
+    def get_analytics(self) -> Dict[str, Any]:
+        """Schedule analytics, recomputed only when the assignment store changes"""
+        return self.analytics.get(self.assignment_store, self.data_processor.employees, self.data_processor.patients)
+    
     def optimize_schedule(self) -> Dict[str, Any]:
-        """Optimize the current schedule using AI"""
-        if not self.current_assignments:
+        """Analyse the current schedule and point out where it can be improved"""
+        if not len(self.assignment_store):
             return {"message": "No assignments to optimize"}
         
-        # This would use the OpenAI service to optimize
-        # For now, return basic analysis
-        employees_workload = {}
-        for assignment in self.current_assignments:
-            emp_id = assignment.employee_id
-            if emp_id not in employees_workload:
-                employees_workload[emp_id] = []
-            employees_workload[emp_id].append(assignment)
+        analytics = self.get_analytics()
+        suggestions = []
+        if analytics["conflicts"]["overlaps"] or analytics["conflicts"]["over_capacity_days"]:
+            suggestions.append("Resolve overlapping or over-capacity visits (see /validate-rota)")
+        if analytics["workload_balance"]["gini"] > 0.3:
+            suggestions.append(
+                f"Workload is uneven (Gini {analytics['workload_balance']['gini']}); "
+                f"{analytics['workload_balance']['idle_employees']} employees have no visits"
+            )
+        if analytics["travel"]["travel_to_care_ratio"] > 0.5:
+            suggestions.append("Travel exceeds half of care time; try partitioned generation by region")
+        if analytics["coverage"]["patients_short"]:
+            suggestions.append(f"{analytics['coverage']['patients_short']} patients are below their required support hours")
         
         return {
-            "total_assignments": len(self.current_assignments),
-            "employees_involved": len(employees_workload),
-            "average_assignments_per_employee": len(self.current_assignments) / max(1, len(employees_workload))
+            "total_assignments": analytics["total_assignments"],
+            "employees_involved": analytics["employees_involved"],
+            "average_assignments_per_employee": analytics["total_assignments"] / max(1, analytics["employees_involved"]),
+            "analytics": analytics,
+            "suggestions": suggestions
         }
     
     def clear_assignments(self):
         """Clear all current assignments (for testing/reset)"""
-        self.current_assignments = []
+        self.assignment_store.clear()
+        self.proposals.clear()
         # Clear assignments from database
         cursor = self.db_manager.conn.cursor()
         cursor.execute("DELETE FROM assignments")
@@ -309,28 +1132,40 @@ class RotaService:
             employee.current_assignments = 0
         logger.info("Cleared all assignments from memory and database")
     
+    def validate_rota(self, start_date: Optional[str] = None, days: Optional[int] = None) -> Dict[str, Any]:
+        """Check the loaded assignments (or those in a date range) against the business rules"""
+        if start_date:
+            dates = week_dates(start_date, days or 1)
+            self._ensure_loaded(dates[0], dates[-1])
+            record_ids = [
+                record_id
+                for day in dates
+                for record_id in self.assignment_store.query(day=day)
+            ]
+        else:
+            record_ids = self.assignment_store.record_ids()
+        return validate_rota(
+            self.assignment_store.serialized(record_ids),
+            self.data_processor.employees,
+            self.data_processor.patients,
+            record_ids=record_ids
+        )
+    
     def validate_assignment_rules(self, assignment: EmployeeAssignment) -> List[str]:
-        """Validate that an assignment follows all the rules"""
-        violations = []
-        
-        employee = self.data_processor.get_employee_by_id(assignment.employee_id)
-        patient = self.data_processor.get_patient_by_id(assignment.patient_id)
-        
-        if not employee or not patient:
-            violations.append("Employee or patient not found")
-            return violations
-        
-        # Rule 1: Medicine services require qualified personnel (nurses)
-        if assignment.service_type == ServiceType.MEDICINE:
-            if employee.Qualification != QualificationEnum.NURSE:
-                violations.append("Medicine services require a qualified nurse")
-        
-        # Rule 3: Language preference check
-        if patient.LanguagePreference not in employee.LanguageSpoken and patient.LanguagePreference != "English":
-            violations.append(f"Employee doesn't speak patient's preferred language ({patient.LanguagePreference})")
-        
-        # Workload check
-        if employee.current_assignments >= employee.max_patients_per_day:
-            violations.append("Employee workload exceeds maximum daily capacity")
-        
-        return violations 
\ No newline at end of file
+        """Validate that an assignment follows all the rules, alongside the employee's other visits that day"""
+        day = assignment.assignment_date or date.today().isoformat()
+        record_ids = [
+            record_id for record_id in self.assignment_store.query(employee_id=assignment.employee_id, day=day)
+            if self.assignment_store.get(record_id) is not assignment
+        ]
+        report = validate_rota(
+            self.assignment_store.serialized(record_ids) + [assignment.dict()],
+            self.data_processor.employees,
+            self.data_processor.patients,
+            record_ids=record_ids + ["candidate"]
+        )
+        return [
+            violation["message"]
+            for violation in report["violations"]
+            if violation["record_id"] == "candidate"
+        ]
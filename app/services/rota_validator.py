@@ -0,0 +1,149 @@
+from typing import Dict, List, Any, Optional
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .candidate_pipeline import MAX_TRAVEL_MINUTES
+from .candidate_ranker import split_languages
+
+logger = logging.getLogger(__name__)
+
+# Minimum break between consecutive visits of one employee in minutes (BR-012)
+MIN_BREAK_MINUTES = int(os.getenv("ROTA_MIN_BREAK_MINUTES", "10"))
+
+# Rule code, severity and message for each check. Language matching is
+# preferred but not mandatory (BR-008), so it is only reported as a warning.
+RULES = {
+    "nurse_only_medicine": ("BR-001", "error", "Medicine services require a qualified nurse"),
+    "certificate_expired": ("FR-E002", "error", "Employee certificate expired before the assignment date"),
+    "language_mismatch": ("BR-008", "warning", "Employee doesn't speak the patient's preferred language"),
+    "capacity_exceeded": ("BR-002", "error", "Employee exceeds maximum daily visits"),
+    "overlap": ("BR-011", "error", "Visit overlaps another visit of the same employee"),
+    "short_break": ("BR-012", "error", "Break before this visit is shorter than the minimum"),
+    "travel_exceeded": ("BR-013", "error", "Travel time exceeds the 45 minute maximum"),
+    "unknown_reference": ("DATA", "error", "Employee or patient not found")
+}
+
+
+def _minutes(times: pd.Series) -> np.ndarray:
+    """Vectorized 'HH:MM' to minutes from midnight (-1 where missing)"""
+    parts = times.fillna("").str.extract(r"^(\d{1,2}):(\d{2})")
+    minutes = pd.to_numeric(parts[0], errors="coerce") * 60 + pd.to_numeric(parts[1], errors="coerce")
+    return minutes.fillna(-1).to_numpy(dtype=np.int64)
+
+
+def validate_rota(
+    assignments: List[Dict[str, Any]],
+    employees: List[Any],
+    patients: List[Any],
+    record_ids: Optional[List[Any]] = None,
+    min_break: int = MIN_BREAK_MINUTES,
+    max_travel: int = MAX_TRAVEL_MINUTES
+) -> Dict[str, Any]:
+    """
+    Check a whole rota against the business rules in vectorized passes.
+
+    `assignments` are serialized EmployeeAssignment dicts (as stored in the
+    assignment store); `record_ids` label them in the report. Returns the
+    violation counts per rule and one entry per violation.
+    """
+    started = time.perf_counter()
+    report = {
+        "valid": True,
+        "checked": len(assignments),
+        "violation_counts": {rule: 0 for rule in RULES},
+        "violations": [],
+        "seconds": 0.0
+    }
+    if not assignments:
+        return report
+
+    df = pd.DataFrame(assignments)
+    df["record_id"] = record_ids if record_ids is not None else range(len(df))
+    df["service_type"] = df["service_type"].map(lambda value: getattr(value, "value", value))
+
+    employee_df = pd.DataFrame({
+        "employee_id": [emp.EmployeeID for emp in employees],
+        "qualification": [emp.Qualification.value for emp in employees],
+        "certificate_expiry": [str(emp.CertificateExpiryDate)[:10] for emp in employees],
+        "max_per_day": [emp.max_patients_per_day for emp in employees]
+    })
+    patient_df = pd.DataFrame({
+        "patient_id": [patient.PatientID for patient in patients],
+        "languages": [
+            [lang for lang in split_languages(patient.LanguagePreference) if lang != "english"]
+            for patient in patients
+        ]
+    })
+    df = df.merge(employee_df, on="employee_id", how="left").merge(patient_df, on="patient_id", how="left")
+
+    masks: Dict[str, np.ndarray] = {}
+    known = df["qualification"].notna().to_numpy() & df["languages"].notna().to_numpy()
+    masks["unknown_reference"] = ~known
+
+    # BR-001 / FR-E002 / BR-013: row-wise comparisons
+    masks["nurse_only_medicine"] = known & (df["service_type"] == "medicine").to_numpy() & (df["qualification"] != "Nurse").to_numpy()
+    masks["certificate_expired"] = known & (df["certificate_expiry"].fillna("") < df["assignment_date"].fillna("")).to_numpy()
+    masks["travel_exceeded"] = df["travel_time"].to_numpy() > max_travel
+
+    # BR-008: explode each visit into (employee, preferred non-English language)
+    # pairs; a visit matches if any pair is in the spoken-language table
+    spoken = {
+        f"{emp.EmployeeID}|{language}"
+        for emp in employees
+        for language in split_languages(emp.LanguageSpoken)
+    }
+    preferred = df["languages"].map(lambda langs: langs if isinstance(langs, list) else []).explode().dropna()
+    matched = (df["employee_id"].loc[preferred.index] + "|" + preferred).isin(spoken).groupby(level=0).any()
+    has_preference = np.zeros(len(df), dtype=bool)
+    has_preference[matched.index.to_numpy()] = True
+    speaks = np.zeros(len(df), dtype=bool)
+    speaks[matched.index.to_numpy()] = matched.to_numpy()
+    masks["language_mismatch"] = known & has_preference & ~speaks
+
+    # BR-002: visits per employee per day against the daily maximum
+    per_day = df.groupby(["employee_id", "assignment_date"])["record_id"].transform("size").to_numpy()
+    masks["capacity_exceeded"] = known & (per_day > df["max_per_day"].fillna(np.inf).to_numpy())
+
+    # BR-011 / BR-012: compare each visit with the previous one of the same employee and day
+    df["start"] = _minutes(df["start_time"])
+    df["end"] = df["start"] + df["estimated_duration"].to_numpy()
+    ordered = df[df["start"] >= 0].sort_values(["employee_id", "assignment_date", "start"])
+    groups = ordered.groupby(["employee_id", "assignment_date"])
+    previous_end = groups["end"].shift()
+    next_start = groups["start"].shift(-1)
+    gap = (ordered["start"] - previous_end).to_numpy()
+    has_previous = previous_end.notna().to_numpy()
+    has_next = next_start.notna().to_numpy()
+    overlap = np.zeros(len(df), dtype=bool)
+    short_break = np.zeros(len(df), dtype=bool)
+    # Both visits of an overlapping pair are reported
+    overlap[ordered.index.to_numpy()] = (has_previous & (gap < 0)) | (has_next & (next_start.to_numpy() < ordered["end"].to_numpy()))
+    short_break[ordered.index.to_numpy()] = has_previous & (gap >= 0) & (gap < min_break)
+    masks["overlap"] = overlap
+    masks["short_break"] = short_break
+
+    for rule, mask in masks.items():
+        code, severity, message = RULES[rule]
+        rows = df[mask]
+        report["violation_counts"][rule] = int(len(rows))
+        for row in rows.itertuples(index=False):
+            report["violations"].append({
+                "rule": rule,
+                "code": code,
+                "severity": severity,
+                "message": message,
+                "record_id": row.record_id,
+                "employee_id": row.employee_id,
+                "patient_id": row.patient_id,
+                "assignment_date": row.assignment_date,
+                "start_time": row.start_time
+            })
+
+    report["valid"] = not any(violation["severity"] == "error" for violation in report["violations"])
+    report["seconds"] = round(time.perf_counter() - started, 6)
+    logger.debug(f"Validated {len(df)} assignments in {report['seconds']}s: {report['violation_counts']}")
+    return report
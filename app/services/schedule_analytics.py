@@ -0,0 +1,177 @@
+from typing import Dict, List, Any, Optional, Tuple
+from collections import defaultdict
+import logging
+import time
+
+from .schedule_horizon import to_minutes
+
+logger = logging.getLogger(__name__)
+
+
+def gini(values: List[float]) -> float:
+    """Gini coefficient of non-negative values (0 = perfectly even, 1 = all on one)"""
+    values = sorted(values)
+    total = sum(values)
+    if not values or total <= 0:
+        return 0.0
+    weighted = sum((i + 1) * value for i, value in enumerate(values))
+    return (2 * weighted) / (len(values) * total) - (len(values) + 1) / len(values)
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def _available_minutes(employee) -> int:
+    """Length of an employee's EarliestStart-LatestEnd window (FR-E005)"""
+    try:
+        earliest = to_minutes(employee.EarliestStart)
+        latest = to_minutes(employee.LatestEnd)
+    except (ValueError, AttributeError):
+        return 8 * 60
+    if latest <= earliest:
+        latest += 24 * 60
+    return latest - earliest
+
+
+class ScheduleAnalytics:
+    """
+    Schedule metrics computed locally in one pass over the assignment store:
+    utilization distribution, workload balance (FR-A011), travel-to-care
+    ratio, coverage shortfall (FR-A013) and conflicts (BR-002, BR-011).
+
+    Results are cached against the store version, so repeated dashboard
+    requests cost nothing until the rota changes.
+    """
+
+    def __init__(self):
+        self._cache_key: Optional[Tuple] = None
+        self._cached: Optional[Dict[str, Any]] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, store, employees: List[Any], patients: List[Any]) -> Dict[str, Any]:
+        key = (id(store), store.version, id(employees), len(employees), id(patients), len(patients))
+        if key == self._cache_key:
+            self.hits += 1
+            return self._cached
+        self.misses += 1
+        self._cached = self.compute(store, employees, patients)
+        self._cache_key = key
+        return self._cached
+
+    def compute(self, store, employees: List[Any], patients: List[Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        employees_by_id = {emp.EmployeeID: emp for emp in employees}
+
+        visits: Dict[str, int] = defaultdict(int)
+        day_minutes: Dict[Tuple[str, str], int] = defaultdict(int)
+        day_visits: Dict[Tuple[str, str], int] = defaultdict(int)
+        intervals: Dict[Tuple[str, str], List[Tuple[int, int]]] = defaultdict(list)
+        delivered: Dict[Tuple[str, str], int] = defaultdict(int)
+        days = set()
+        care_minutes = travel_minutes = 0
+
+        # Single pass over the store
+        for assignment in store:
+            day = assignment.assignment_date
+            employee_day = (assignment.employee_id, day)
+            visits[assignment.employee_id] += 1
+            day_visits[employee_day] += 1
+            day_minutes[employee_day] += assignment.estimated_duration + assignment.travel_time
+            delivered[(assignment.patient_id, day)] += assignment.estimated_duration
+            care_minutes += assignment.estimated_duration
+            travel_minutes += assignment.travel_time
+            days.add(day)
+            if assignment.start_time:
+                start = to_minutes(assignment.start_time)
+                intervals[employee_day].append((start, start + assignment.estimated_duration))
+
+        # Utilization of each working employee-day against the employee's window
+        utilization = sorted(
+            minutes / max(1, _available_minutes(employees_by_id[emp_id]))
+            for (emp_id, _), minutes in day_minutes.items()
+            if emp_id in employees_by_id
+        )
+        buckets = {"0-25%": 0, "25-50%": 0, "50-75%": 0, "75-100%": 0, ">100%": 0}
+        for value in utilization:
+            if value > 1:
+                buckets[">100%"] += 1
+            else:
+                buckets[list(buckets)[min(3, int(value * 4))]] += 1
+
+        # Workload balance over the whole roster, idle staff included (FR-A011)
+        loads = [visits.get(emp.EmployeeID, 0) for emp in employees]
+        mean_load = sum(loads) / len(loads) if loads else 0.0
+        variance = sum((load - mean_load) ** 2 for load in loads) / len(loads) if loads else 0.0
+
+        # Coverage shortfall: required daily support hours against delivered care (FR-A013)
+        shortfall_minutes = 0
+        patients_short = set()
+        for day in days:
+            for patient in patients:
+                missing = patient.RequiredHoursOfSupport * 60 - delivered.get((patient.PatientID, day), 0)
+                if missing > 0:
+                    shortfall_minutes += missing
+                    patients_short.add(patient.PatientID)
+
+        # Conflicts: overlapping visits (BR-011) and over-capacity days (BR-002)
+        overlaps = 0
+        for employee_intervals in intervals.values():
+            employee_intervals.sort()
+            overlaps += sum(
+                1 for previous, current in zip(employee_intervals, employee_intervals[1:])
+                if current[0] < previous[1]
+            )
+        over_capacity = sum(
+            1 for (emp_id, _), count in day_visits.items()
+            if emp_id in employees_by_id and count > employees_by_id[emp_id].max_patients_per_day
+        )
+
+        required_minutes = sum(patient.RequiredHoursOfSupport * 60 for patient in patients) * len(days)
+        result = {
+            "total_assignments": len(store),
+            "days": sorted(days),
+            "employees_involved": len(visits),
+            "utilization": {
+                "employee_days": len(utilization),
+                "mean": round(sum(utilization) / len(utilization), 4) if utilization else 0.0,
+                "min": round(utilization[0], 4) if utilization else 0.0,
+                "p50": round(_percentile(utilization, 0.5), 4),
+                "p90": round(_percentile(utilization, 0.9), 4),
+                "max": round(utilization[-1], 4) if utilization else 0.0,
+                "histogram": buckets
+            },
+            "workload_balance": {
+                "mean_visits": round(mean_load, 3),
+                "variance": round(variance, 3),
+                "gini": round(gini(loads), 4),
+                "idle_employees": sum(1 for load in loads if load == 0),
+                "max_visits": max(loads) if loads else 0
+            },
+            "travel": {
+                "care_minutes": care_minutes,
+                "travel_minutes": travel_minutes,
+                "travel_to_care_ratio": round(travel_minutes / care_minutes, 4) if care_minutes else 0.0
+            },
+            "coverage": {
+                "required_minutes": required_minutes,
+                "shortfall_minutes": shortfall_minutes,
+                "coverage_rate": round(1 - shortfall_minutes / required_minutes, 4) if required_minutes else 1.0,
+                "patients_short": len(patients_short)
+            },
+            "conflicts": {
+                "overlaps": overlaps,
+                "over_capacity_days": over_capacity
+            },
+            "version": store.version
+        }
+        result["seconds"] = round(time.perf_counter() - started, 6)
+        logger.debug(f"Computed schedule analytics for {len(store)} assignments in {result['seconds']}s")
+        return result
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,204 @@
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import date, datetime, timedelta
+import bisect
+
+from ..models.schemas import EmployeeAssignment
+
+# Shift windows in minutes from midnight (FR-E004). Evening wraps past midnight.
+SHIFT_WINDOWS = {
+    "Breakfast": (6 * 60, 14 * 60),
+    "Lunch": (14 * 60, 22 * 60),
+    "Evening": (22 * 60, 6 * 60)
+}
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def to_minutes(hhmm: str) -> int:
+    """Convert an 'HH:MM' string to minutes from midnight"""
+    hour, minute = hhmm.strip().split(":")[:2]
+    return int(hour) * 60 + int(minute)
+
+
+def shift_for_time(hhmm: str) -> str:
+    """Return the shift (Breakfast/Lunch/Evening) a start time falls into"""
+    minutes = to_minutes(hhmm)
+    if SHIFT_WINDOWS["Breakfast"][0] <= minutes < SHIFT_WINDOWS["Breakfast"][1]:
+        return "Breakfast"
+    if SHIFT_WINDOWS["Lunch"][0] <= minutes < SHIFT_WINDOWS["Lunch"][1]:
+        return "Lunch"
+    return "Evening"
+
+
+def week_dates(week_start: Optional[str] = None, days: int = 7) -> List[str]:
+    """List the YYYY-MM-DD dates of a scheduling horizon (defaults to starting today)"""
+    start = datetime.strptime(week_start, "%Y-%m-%d").date() if week_start else date.today()
+    return [(start + timedelta(days=offset)).isoformat() for offset in range(days)]
+
+
+def resolve_date(value: Optional[str], today: Optional[date] = None) -> str:
+    """
+    Resolve 'today', 'tomorrow', a weekday name or a YYYY-MM-DD string to a
+    YYYY-MM-DD date. Weekday names resolve to the next such day (today included).
+    """
+    today = today or date.today()
+    if not value:
+        return today.isoformat()
+
+    text = str(value).strip().lower()
+    if text == "today":
+        return today.isoformat()
+    if text == "tomorrow":
+        return (today + timedelta(days=1)).isoformat()
+    if text in WEEKDAYS:
+        offset = (WEEKDAYS.index(text) - today.weekday()) % 7
+        return (today + timedelta(days=offset)).isoformat()
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        return today.isoformat()
+
+
+class ScheduleHorizon:
+    """
+    Day-indexed view of the rota: per (employee, date) sorted visit intervals
+    for capacity and overlap checks, plus a (date, shift) index for shift queries.
+
+    Tentative holds (see ReservationManager) are indexed like visits and kept
+    by key: AssignmentStore.add() turns a hold into the committed visit, and
+    release() drops one that was not committed.
+
+    snapshot() shares the per-day buckets with the copy; either side copies a
+    bucket the first time it writes to it (copy-on-write).
+    """
+
+    def __init__(self):
+        self._intervals: Dict[Tuple[str, str], List[Tuple[int, int]]] = {}
+        self._by_employee_day: Dict[Tuple[str, str], List[EmployeeAssignment]] = {}
+        self._by_shift: Dict[Tuple[Optional[str], Optional[str]], List[EmployeeAssignment]] = {}
+        # (employee_id, date) pairs on which an employee cannot take visits
+        self.blocked: Set[Tuple[str, str]] = set()
+        self._holds: Dict[int, EmployeeAssignment] = {}
+        self._next_hold = 1
+        self._owned: Set[int] = set()
+
+    def _bucket(self, mapping: Dict, key) -> List:
+        """Return a bucket this horizon may modify, copying it if it is shared"""
+        bucket = mapping.get(key)
+        if bucket is None or id(bucket) not in self._owned:
+            bucket = list(bucket) if bucket is not None else []
+            mapping[key] = bucket
+            self._owned.add(id(bucket))
+        return bucket
+
+    def snapshot(self) -> "ScheduleHorizon":
+        """Cheap copy-on-write copy: only the bucket maps are copied"""
+        clone = ScheduleHorizon()
+        clone._intervals = dict(self._intervals)
+        clone._by_employee_day = dict(self._by_employee_day)
+        clone._by_shift = dict(self._by_shift)
+        clone.blocked = set(self.blocked)
+        clone._holds = dict(self._holds)
+        clone._next_hold = self._next_hold
+        # Every existing bucket is now shared with the clone
+        self._owned = set()
+        return clone
+
+    @staticmethod
+    def _interval(assignment: EmployeeAssignment) -> Tuple[int, int]:
+        start = to_minutes(assignment.start_time)
+        return start, start + assignment.estimated_duration
+
+    def add(self, assignment: EmployeeAssignment):
+        """Index an assignment by day"""
+        if not assignment.assignment_date or not assignment.start_time:
+            return
+        key = (assignment.employee_id, assignment.assignment_date)
+        bisect.insort(self._bucket(self._intervals, key), self._interval(assignment))
+        self._bucket(self._by_employee_day, key).append(assignment)
+        self._bucket(self._by_shift, (assignment.assignment_date, assignment.shift)).append(assignment)
+
+    @staticmethod
+    def _position(bucket: List[EmployeeAssignment], assignment: EmployeeAssignment) -> Optional[int]:
+        """Index of this very assignment object in a bucket (equal copies are other visits)"""
+        return next((index for index, entry in enumerate(bucket) if entry is assignment), None)
+
+    def remove(self, assignment: EmployeeAssignment):
+        """Drop an assignment from the day indexes"""
+        key = (assignment.employee_id, assignment.assignment_date)
+        if self._position(self._by_employee_day.get(key, []), assignment) is None:
+            return
+        self._bucket(self._intervals, key).remove(self._interval(assignment))
+        for bucket in (self._bucket(self._by_employee_day, key), self._bucket(self._by_shift, (assignment.assignment_date, assignment.shift))):
+            del bucket[self._position(bucket, assignment)]
+
+    def hold(self, assignment: EmployeeAssignment) -> int:
+        """Index a tentative assignment and return the key of its hold"""
+        key = self._next_hold
+        self._next_hold += 1
+        self._holds[key] = assignment
+        self.add(assignment)
+        return key
+
+    def take_hold(self, key: int) -> Optional[EmployeeAssignment]:
+        """Claim a hold for commit; its assignment stays indexed as a committed visit"""
+        return self._holds.pop(key, None)
+
+    def release(self, key: int) -> bool:
+        """Drop a hold that was not committed; False if it was already committed or released"""
+        assignment = self._holds.pop(key, None)
+        if assignment is None:
+            return False
+        self.remove(assignment)
+        return True
+
+    def clear(self):
+        self._intervals = {}
+        self._by_employee_day = {}
+        self._by_shift = {}
+        self.blocked = set()
+        self._holds = {}
+        self._owned = set()
+
+    def block(self, employee_id: str, day: str):
+        """Mark an employee as unavailable for new visits on a day"""
+        self.blocked.add((employee_id, day))
+
+    def is_blocked(self, employee_id: str, day: str) -> bool:
+        return (employee_id, day) in self.blocked
+
+    def count(self, employee_id: str, day: str) -> int:
+        """Number of visits an employee has on a day"""
+        return len(self._intervals.get((employee_id, day), []))
+
+    def has_capacity(self, employee_id: str, day: str, max_per_day: int) -> bool:
+        return not self.is_blocked(employee_id, day) and self.count(employee_id, day) < max_per_day
+
+    def overlaps(self, employee_id: str, day: str, start: int, end: int) -> bool:
+        """Check whether [start, end) overlaps an existing visit (BR-011)"""
+        intervals = self._intervals.get((employee_id, day), [])
+        index = bisect.bisect_left(intervals, (start, end))
+        if index > 0 and intervals[index - 1][1] > start:
+            return True
+        return index < len(intervals) and intervals[index][0] < end
+
+    def next_free_start(self, employee_id: str, day: str, earliest: int, duration: int, gap: int = 0) -> int:
+        """Earliest start at or after `earliest` that fits `duration` minutes between visits"""
+        start = earliest
+        for interval_start, interval_end in self._intervals.get((employee_id, day), []):
+            if start + duration + gap <= interval_start:
+                break
+            start = max(start, interval_end + gap)
+        return start
+
+    def employee_assignments(self, employee_id: str, start_day: str, end_day: Optional[str] = None) -> List[EmployeeAssignment]:
+        """Assignments of one employee between two dates (inclusive), in time order"""
+        days = week_dates(start_day, (datetime.strptime(end_day or start_day, "%Y-%m-%d") - datetime.strptime(start_day, "%Y-%m-%d")).days + 1)
+        result = []
+        for day in days:
+            result.extend(sorted(self._by_employee_day.get((employee_id, day), []), key=lambda a: a.start_time))
+        return result
+
+    def shift_assignments(self, day: str, shift: str) -> List[EmployeeAssignment]:
+        """All assignments of one shift on one day"""
+        return list(self._by_shift.get((day, shift), []))
@@ -0,0 +1,121 @@
+from typing import Dict, List, Any
+from datetime import date
+import asyncio
+import logging
+import time
+
+from .rota_service import RotaService
+from .assignment_store import AssignmentStore
+from .schedule_horizon import resolve_date
+from ..models.schemas import SimulationScenario, AssignmentRequestItem
+
+logger = logging.getLogger(__name__)
+
+
+class SimulationService:
+    """
+    What-if scheduling: each scenario runs against a copy-on-write fork of the
+    live RotaService with persistence disabled, and is reported as a diff and
+    metrics against the live state at the time of the fork.
+    """
+
+    def __init__(self, rota_service: RotaService):
+        self.rota_service = rota_service
+
+    async def run_scenarios(self, scenarios: List[SimulationScenario]) -> List[Dict[str, Any]]:
+        """Run several scenarios concurrently"""
+        results = await asyncio.gather(*[self.run_scenario(scenario) for scenario in scenarios], return_exceptions=True)
+        reports = []
+        for scenario, result in zip(scenarios, results):
+            if isinstance(result, Exception):
+                logger.error(f"Simulation {scenario.name or ''} failed: {str(result)}")
+                reports.append({"name": scenario.name, "success": False, "message": str(result)})
+            else:
+                reports.append(result)
+
+        self.rota_service.db_manager.log_operation(
+            "simulation",
+            f"Ran {len(scenarios)} what-if scenarios",
+            {"scenarios": [scenario.name for scenario in scenarios]}
+        )
+        return reports
+
+    async def run_scenario(self, scenario: SimulationScenario) -> Dict[str, Any]:
+        started = time.perf_counter()
+        simulation = self.rota_service.fork()
+        baseline = simulation.assignment_store.snapshot()
+        store = simulation.assignment_store
+
+        # Take staff off and collect the visits they can no longer make
+        displaced_ids = []
+        today = date.today().isoformat()
+        for off in scenario.unavailable:
+            if off.date:
+                day = resolve_date(off.date)
+                simulation.horizon.block(off.employee_id, day)
+                displaced_ids.extend(store.query(employee_id=off.employee_id, day=day))
+            else:
+                simulation.data_processor.employees = [
+                    emp for emp in simulation.data_processor.employees if emp.EmployeeID != off.employee_id
+                ]
+                displaced_ids.extend(
+                    record_id for record_id in store.query(employee_id=off.employee_id)
+                    if (store.get(record_id).assignment_date or today) >= today
+                )
+
+        reassign = []
+        for record_id in dict.fromkeys(displaced_ids):
+            assignment = store.remove(record_id)
+            if assignment:
+                reassign.append(AssignmentRequestItem(
+                    patient_id=assignment.patient_id,
+                    service_type=assignment.service_type,
+                    preferred_time=assignment.start_time,
+                    preferred_date=assignment.assignment_date
+                ))
+
+        requests = reassign + list(scenario.requests)
+        batch = await simulation.process_batch_requests(requests) if requests else {"results": []}
+        failed = [item for item in batch["results"] if not item["success"]]
+
+        weekly_count = 0
+        if scenario.generate_weekly:
+            weekly = await simulation.generate_weekly_schedule(
+                partitioned=scenario.partitioned,
+                week_start=scenario.week_start,
+                days=scenario.days
+            )
+            weekly_count = len(weekly)
+
+        base_ids = set(baseline.record_ids())
+        final_ids = set(store.record_ids())
+        return {
+            "name": scenario.name,
+            "success": True,
+            "message": "Simulation completed",
+            "diff": {
+                "added": store.serialized(sorted(final_ids - base_ids)),
+                "removed": baseline.serialized(sorted(base_ids - final_ids))
+            },
+            "reassigned": len(reassign),
+            "unassigned": [{"index": item["index"], "message": item["message"]} for item in failed],
+            "weekly_assignments": weekly_count,
+            "metrics": {
+                "live": self._metrics(baseline),
+                "simulated": self._metrics(store)
+            },
+            "seconds": round(time.perf_counter() - started, 4)
+        }
+
+    @staticmethod
+    def _metrics(store: AssignmentStore) -> Dict[str, Any]:
+        """Headline metrics from the store's running totals"""
+        workload = store.workload()
+        visits = [totals["visits"] for totals in workload.values()]
+        return {
+            "total_assignments": len(store),
+            "employees_involved": len(workload),
+            "total_minutes_worked": sum(totals["minutes_worked"] for totals in workload.values()),
+            "total_travel_minutes": sum(totals["travel_minutes"] for totals in workload.values()),
+            "max_visits_per_employee": max(visits) if visits else 0
+        }
@@ -0,0 +1,137 @@
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# (origin, destination, mode, time-of-day bucket)
+TravelKey = Tuple[str, str, str, int]
+
+
+def normalize_address(address: str) -> str:
+    """Canonical form of an address for cache keys: lower case, no commas, collapsed whitespace"""
+    return " ".join((address or "").lower().replace(",", " ").split())
+
+
+def travel_key(origin: str, destination: str, mode: str, departure: datetime, bucket_minutes: int = 60) -> TravelKey:
+    """Cache key for a trip; departures in the same time-of-day bucket share an entry"""
+    bucket = (departure.hour * 60 + departure.minute) // max(1, bucket_minutes)
+    return (normalize_address(origin), normalize_address(destination), mode, bucket)
+
+
+class TravelCache:
+    """
+    Two-tier cache of travel minutes: an in-memory LRU in front of the
+    SQLite `travel_cache` table (when a DatabaseManager is given), so entries
+    survive restarts. Entries are refreshed after `ttl_seconds`; if a refresh
+    fails the stale value is served (see TravelService.travel_matrix_async,
+    which also de-duplicates concurrent misses for the same key).
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        bucket_minutes: Optional[int] = None,
+        db_manager=None
+    ):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("TRAVEL_CACHE_SIZE", "10000"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("TRAVEL_CACHE_TTL_SECONDS", "604800"))
+        self.bucket_minutes = bucket_minutes if bucket_minutes is not None else int(os.getenv("TRAVEL_CACHE_BUCKET_MINUTES", "60"))
+        self.db_manager = db_manager
+        self._entries: "OrderedDict[TravelKey, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.stale_served = 0
+        self.evictions = 0
+
+    def key(self, origin: str, destination: str, mode: str, departure: Optional[datetime] = None) -> TravelKey:
+        return travel_key(origin, destination, mode, departure or datetime.now(), self.bucket_minutes)
+
+    def _remember(self, key: TravelKey, minutes: int, expires_at: float):
+        self._entries[key] = (expires_at, minutes)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _lookup(self, key: TravelKey, now: float) -> Optional[tuple]:
+        """(expires_at, minutes) from memory, then from SQLite; may be expired"""
+        entry = self._entries.get(key)
+        if entry is None and self.db_manager is not None:
+            try:
+                stored = self.db_manager.get_cached_travel(key)
+            except Exception as e:
+                logger.warning(f"Error reading travel cache: {str(e)}")
+                stored = None
+            if stored:
+                entry = (stored["expires_at"], stored["minutes"])
+                if entry[0] > now:
+                    self._remember(key, entry[1], entry[0])
+                    self.persistent_hits += 1
+                    return entry
+        elif entry is not None and entry[0] > now:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry
+
+    def get(self, key: TravelKey) -> Optional[int]:
+        """Cached minutes if fresh, otherwise None"""
+        minutes, fresh = self.lookup(key)
+        return minutes if fresh else None
+
+    def lookup(self, key: TravelKey) -> Tuple[Optional[int], bool]:
+        """Cached minutes (possibly expired, None if absent) and whether they are fresh"""
+        now = time.time()
+        with self._lock:
+            entry = self._lookup(key, now)
+            if entry and entry[0] > now:
+                return entry[1], True
+            if entry:
+                self.refreshes += 1
+            else:
+                self.misses += 1
+        return (entry[1] if entry else None), False
+
+    def put(self, key: TravelKey, minutes: int):
+        self.put_many([(key, minutes)])
+
+    def put_many(self, entries: List[Tuple[TravelKey, int]]):
+        """Cache several (key, minutes) entries; persisted in one transaction"""
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            for key, minutes in entries:
+                self._remember(key, minutes, expires_at)
+            if self.db_manager is not None:
+                try:
+                    self.db_manager.store_cached_travel_many([(key, minutes, expires_at) for key, minutes in entries])
+                except Exception as e:
+                    logger.warning(f"Error writing travel cache: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.persistent_hits + self.misses + self.refreshes
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "bucket_minutes": self.bucket_minutes,
+            "persistent": self.db_manager is not None,
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "stale_served": self.stale_served,
+            "hit_rate": round((self.hits + self.persistent_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,168 @@
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+import csv
+import logging
+import math
+import os
+import re
+
+import numpy as np
+
+from ..models.schemas import TransportModeEnum
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CENTROIDS = Path(__file__).resolve().parent.parent / "data" / "postcode_centroids.csv"
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Door-to-door profile per transport mode: average speed (km/h), road factor
+# (route length over straight-line distance) and fixed minutes for parking,
+# waiting or locking up
+SPEED_PROFILES = {
+    TransportModeEnum.CAR: (32.0, 1.3, 4),
+    TransportModeEnum.PUBLIC_TRANSPORT: (16.0, 1.4, 10),
+    TransportModeEnum.BICYCLE: (15.0, 1.25, 2),
+    TransportModeEnum.WALKING: (5.0, 1.2, 0)
+}
+
+_MODE_ALIASES = {
+    "driving": TransportModeEnum.CAR,
+    "transit": TransportModeEnum.PUBLIC_TRANSPORT,
+    "public_transport": TransportModeEnum.PUBLIC_TRANSPORT,
+    "bicycling": TransportModeEnum.BICYCLE,
+    "bike": TransportModeEnum.BICYCLE
+}
+
+# Full UK postcode at the end of an address ("12 Mill Road, S4 6DD")
+_POSTCODE = re.compile(r"([A-Z]{1,2}[0-9][0-9A-Z]?)\s*([0-9][A-Z]{2})\s*$")
+_OUTWARD = re.compile(r"^([A-Z]{1,2})[0-9]")
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def haversine_matrix_km(origins: np.ndarray, destinations: np.ndarray) -> np.ndarray:
+    """Great-circle distances between (n, 2) and (m, 2) arrays of lat/lon degrees, shape (n, m)"""
+    start = np.radians(origins)[:, None, :]
+    end = np.radians(destinations)[None, :, :]
+    dphi = end[..., 0] - start[..., 0]
+    dlambda = end[..., 1] - start[..., 1]
+    a = np.sin(dphi / 2) ** 2 + np.cos(start[..., 0]) * np.cos(end[..., 0]) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def transport_mode(mode: str) -> TransportModeEnum:
+    """TransportModeEnum for an employee mode ("Car", "public transport") or Google mode ("driving")"""
+    key = (mode or "").strip().lower()
+    for member in TransportModeEnum:
+        if member.value.lower() == key:
+            return member
+    return _MODE_ALIASES.get(key, TransportModeEnum.CAR)
+
+
+def split_postcode(text: str) -> Optional[Tuple[str, str]]:
+    """(outward, inward) codes of the postcode a string ends with, e.g. ("S4", "6DD")"""
+    match = _POSTCODE.search((text or "").upper())
+    return (match.group(1), match.group(2)) if match else None
+
+
+class PostcodeGeocoder:
+    """
+    In-memory postcode -> (lat, lon) table loaded from a CSV with
+    postcode, latitude and longitude columns. Rows may be full postcodes,
+    outward codes ("S4") or areas ("S"); a lookup falls back from the full
+    postcode to its outward code and then to its area.
+
+    The bundled table holds approximate area centroids for the UK plus the
+    districts in the sample data; point POSTCODE_CENTROIDS_FILE at an extract
+    of the ONS Postcode Directory for full coverage.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or os.getenv("POSTCODE_CENTROIDS_FILE") or DEFAULT_CENTROIDS)
+        self._points: Dict[str, Tuple[float, float]] = {}
+        self.resolved = {"postcode": 0, "outward": 0, "area": 0, "unknown": 0}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, newline="") as f:
+                for row in csv.DictReader(f):
+                    code = row["postcode"].upper().replace(" ", "")
+                    self._points[code] = (float(row["latitude"]), float(row["longitude"]))
+            logger.info(f"Loaded {len(self._points)} postcode centroids from {self.path}")
+        except Exception as e:
+            logger.error(f"Error loading postcode centroids from {self.path}: {str(e)}")
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def locate(self, text: str) -> Optional[Tuple[float, float]]:
+        """Centroid for the postcode at the end of `text`, or None if it cannot be placed"""
+        parts = split_postcode(text)
+        if parts is None:
+            self.resolved["unknown"] += 1
+            return None
+        outward, inward = parts
+        point = self._points.get(outward + inward)
+        if point is not None:
+            self.resolved["postcode"] += 1
+            return point
+        point = self._points.get(outward)
+        if point is not None:
+            self.resolved["outward"] += 1
+            return point
+        point = self._points.get(_OUTWARD.match(outward).group(1))
+        self.resolved["area" if point is not None else "unknown"] += 1
+        return point
+
+
+class OfflineTravelEstimator:
+    """
+    Travel minutes without a network call: straight-line distance between
+    postcode centroids, stretched by the mode's road factor, at the mode's
+    average speed plus its fixed overhead (see SPEED_PROFILES).
+    """
+
+    def __init__(self, geocoder: Optional[PostcodeGeocoder] = None):
+        self.geocoder = geocoder if geocoder is not None else PostcodeGeocoder()
+        self.estimates = 0
+
+    @staticmethod
+    def minutes_for(distance_km: float, mode: TransportModeEnum) -> int:
+        kmh, road_factor, overhead = SPEED_PROFILES[mode]
+        return max(1, math.ceil(distance_km * road_factor / kmh * 60 + overhead))
+
+    def estimate(self, origin: str, destination: str, mode: str) -> Optional[int]:
+        """Minutes from origin to destination (addresses ending in a postcode), or None if either cannot be placed"""
+        start = self.geocoder.locate(origin)
+        end = self.geocoder.locate(destination)
+        if start is None or end is None:
+            return None
+        self.estimates += 1
+        return self.minutes_for(haversine_km(*start, *end), transport_mode(mode))
+
+    def _points(self, addresses: List[str]) -> np.ndarray:
+        points = [self.geocoder.locate(address) for address in addresses]
+        return np.array([point if point is not None else (np.nan, np.nan) for point in points], dtype=float).reshape(-1, 2)
+
+    def estimate_matrix(self, origins: List[str], destinations: List[str], mode: str) -> np.ndarray:
+        """
+        Minutes from every origin to every destination for one mode, shape
+        (len(origins), len(destinations)); NaN where either end cannot be placed
+        """
+        kmh, road_factor, overhead = SPEED_PROFILES[transport_mode(mode)]
+        distances = haversine_matrix_km(self._points(origins), self._points(destinations))
+        minutes = np.maximum(1.0, np.ceil(distances * road_factor / kmh * 60 + overhead))
+        self.estimates += int(np.count_nonzero(~np.isnan(minutes)))
+        return minutes
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"postcodes": len(self.geocoder), "estimates": self.estimates, "resolved": dict(self.geocoder.resolved)}
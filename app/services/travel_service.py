@@ -1,16 +1,96 @@
 import os
+import asyncio
 import googlemaps
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Dict, Any, List, Optional
 import logging
 
+from .rate_limiter import TokenBucket
+from .travel_cache import TravelCache, TravelKey
+from .travel_estimator import OfflineTravelEstimator, split_postcode
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_TRAVEL_MINUTES = 15
+
+TRAVEL_PROVIDERS = ("auto", "google", "offline", "fixed")
+
+# Distance Matrix API limits per request
+MATRIX_MAX_ORIGINS = 25
+MATRIX_MAX_DESTINATIONS = 25
+MATRIX_MAX_ELEMENTS = 100
+
+
+def full_address(record) -> str:
+    """Employee or patient address with its postcode, as passed to the travel provider"""
+    if split_postcode(record.Address):
+        return record.Address
+    return f"{record.Address}, {record.PostCode}"
+
+
 class TravelService:
-    def __init__(self):
+    """
+    Travel minutes between two addresses. Providers (TRAVEL_PROVIDER):
+    google - Distance Matrix API, cached, with the offline estimate when it has no answer;
+    offline - postcode centroid estimate (see OfflineTravelEstimator), no network;
+    fixed - a flat DEFAULT_TRAVEL_MINUTES for every pair;
+    auto (default) - google when GOOGLE_MAPS_API_KEY is set, otherwise offline.
+
+    Every provider call and cache read or write runs on a bounded thread pool,
+    never on the event loop. Provider calls are cut off after `call_timeout`
+    seconds (the offline estimate answers instead) and share two token buckets
+    sized to the provider quota: requests per second, and Distance Matrix
+    elements (origins x destinations) per second. Concurrent lookups missing
+    the same pair share one provider request: the first registers the pair in
+    flight and the others await its answer.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[TravelCache] = None,
+        provider: Optional[str] = None,
+        estimator: Optional[OfflineTravelEstimator] = None,
+        max_concurrency: Optional[int] = None,
+        rate_limit: Optional[float] = None,
+        element_rate_limit: Optional[float] = None,
+        call_timeout: Optional[float] = None
+    ):
         api_key = os.getenv("GOOGLE_MAPS_API_KEY")
-        if not api_key:
-            logger.warning("Google Maps API key not set. Using default estimates.")
-        self.client = googlemaps.Client(key=api_key) if api_key else None
+        provider = (provider or os.getenv("TRAVEL_PROVIDER", "auto")).strip().lower()
+        if provider not in TRAVEL_PROVIDERS:
+            logger.warning(f"Unknown TRAVEL_PROVIDER '{provider}'. Using auto.")
+            provider = "auto"
+        if provider == "auto":
+            provider = "google" if api_key else "offline"
+        if provider == "google" and not api_key:
+            logger.warning("Google Maps API key not set. Using offline estimates.")
+            provider = "offline"
+        self.provider = provider
+        self.max_concurrency = max_concurrency if max_concurrency is not None else int(os.getenv("TRAVEL_MAX_CONCURRENCY", "8"))
+        self.call_timeout = call_timeout if call_timeout is not None else float(os.getenv("TRAVEL_TIMEOUT_SECONDS", "5"))
+        rate_limit = rate_limit if rate_limit is not None else float(os.getenv("TRAVEL_RATE_LIMIT_PER_SECOND", "50"))
+        self.rate_limiter = TokenBucket(rate_limit, int(os.getenv("TRAVEL_RATE_LIMIT_BURST", "0")) or None)
+        element_rate_limit = element_rate_limit if element_rate_limit is not None else float(os.getenv("TRAVEL_RATE_LIMIT_ELEMENTS_PER_SECOND", "1000"))
+        # The burst must hold a full-size request, or larger ones would be under-counted
+        self.element_limiter = TokenBucket(element_rate_limit, max(MATRIX_MAX_ELEMENTS, int(element_rate_limit)))
+        self.executor = ThreadPoolExecutor(max_workers=max(1, self.max_concurrency), thread_name_prefix="travel")
+        self._slots: Optional[asyncio.Semaphore] = None
+        # Pairs with a provider request in progress, awaited by concurrent lookups
+        self._in_flight: Dict[TravelKey, asyncio.Future] = {}
+        self.client = googlemaps.Client(
+            key=api_key, timeout=self.call_timeout, retry_timeout=self.call_timeout
+        ) if provider == "google" else None
+        self.estimator = estimator if estimator is not None else (OfflineTravelEstimator() if provider != "fixed" else None)
+        # Provider results by origin, destination, mode and time-of-day bucket
+        self.cache = cache if cache is not None else TravelCache()
+        self.matrix_calls = 0
+        self.matrix_elements = 0
+        self.default_estimates = 0
+        self.timeouts = 0
+        self.coalesced = 0
+        logger.info(f"Travel provider: {self.provider}")
 
     def _map_transport_mode(self, transport_mode: str) -> str:
         """Map transport mode to Google Maps API mode"""
@@ -24,22 +104,231 @@ class TravelService:
         }
         return mode_mapping.get(transport_mode.lower(), "driving")
 
-    def calculate_travel_time(self, origin: str, destination: str, mode: str = "driving") -> int:
-        """Calculate travel time in minutes"""
-        if not self.client:
-            # Default estimate
-            return 15
-        
+    def _estimate(self, origin: str, destination: str, mode: str) -> int:
+        """Offline estimate, or DEFAULT_TRAVEL_MINUTES if the addresses cannot be placed"""
+        minutes = self.estimator.estimate(origin, destination, mode) if self.estimator is not None else None
+        if minutes is None:
+            self.default_estimates += 1
+            return DEFAULT_TRAVEL_MINUTES
+        return minutes
+
+    async def _run(self, fn, *args, elements: int = 0):
+        """
+        Run a blocking provider call on the thread pool; None if its rate limit
+        tokens are not available within call_timeout, or the call itself exceeds it
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(max(1, self.max_concurrency))
+        loop = asyncio.get_running_loop()
+        # Wait for a free worker, then for the quota, so neither counts against the call's timeout
+        async with self._slots:
+            # Billed and rate limited per element, so both quotas apply
+            if not await self.rate_limiter.acquire(timeout=self.call_timeout) or \
+                    (elements and not await self.element_limiter.acquire(elements, timeout=self.call_timeout)):
+                logger.warning("Travel provider rate limit reached; skipping request")
+                return None
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(self.executor, fn, *args), self.call_timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                logger.warning(f"Travel provider call timed out after {self.call_timeout}s")
+                return None
+
+    @staticmethod
+    def _group_by_mode(modes: List[str]) -> Dict[str, List[int]]:
+        groups: Dict[str, List[int]] = {}
+        for i, mode in enumerate(modes):
+            groups.setdefault(mode, []).append(i)
+        return groups
+
+    async def travel_matrix_async(self, origins: List[str], modes: List[str], destinations: List[str]) -> np.ndarray:
+        """
+        Minutes from every origin (travelling by its own mode) to every
+        destination, shape (len(origins), len(destinations)). Origins are
+        grouped by mode; each group is answered from the cache, then by chunked
+        Distance Matrix requests (all requested concurrently) for the pairs
+        still missing and not already in flight, then by a stale cached value,
+        the offline estimate and finally DEFAULT_TRAVEL_MINUTES.
+        """
+        matrix = np.full((len(origins), len(destinations)), np.nan)
+        groups = self._group_by_mode(modes)
+        if not self.client or not destinations:
+            return self._complete_matrix(matrix, origins, destinations, groups)
+        # Cache reads and writes may hit SQLite, so they run on the thread pool too
+        loop = asyncio.get_running_loop()
+        plans = dict(zip(groups, await asyncio.gather(*[
+            loop.run_in_executor(self.executor, self._plan_matrix, [origins[i] for i in rows], destinations, mode)
+            for mode, rows in groups.items()
+        ])))
+        waits = [wait for plan in plans.values() for wait in self._claim_pairs(plan)]
+
+        async def fetch(plan: Dict[str, Any], chunk: tuple):
+            minutes = await self._run(
+                self._distance_matrix, *self._chunk_args(plan, chunk), elements=len(chunk[0]) * len(chunk[1])
+            )
+            pairs = self._fill_chunk(plan, chunk, minutes)
+            entries = [(plan["keys"][i][j], int(plan["block"][i, j])) for i, j in pairs if not np.isnan(plan["block"][i, j])]
+            if entries:
+                # One transaction per chunk; waiters are answered once it is cached
+                await loop.run_in_executor(self.executor, self.cache.put_many, entries)
+            self._release_pairs(plan, {pair: plan["flights"][pair] for pair in pairs})
+
+        async def wait(plan: Dict[str, Any], i: int, j: int, flight: asyncio.Future):
+            # Shielded, so a cancelled waiter does not cancel the owner's answer
+            minutes = await asyncio.shield(flight)
+            if minutes is not None:
+                plan["block"][i, j] = minutes
+
         try:
-            # Map the transport mode to Google Maps API mode
-            api_mode = self._map_transport_mode(mode)
-            
-            now = datetime.now()
-            directions = self.client.directions(origin, destination, mode=api_mode, departure_time=now)
-            if directions and directions[0]['legs']:
-                duration = directions[0]['legs'][0]['duration']['value']  # in seconds
-                return int(duration / 60)
-            return 15  # Default
+            await asyncio.gather(
+                *[fetch(plan, chunk) for plan in plans.values() for chunk in plan["chunks"]],
+                *[wait(*args) for args in waits]
+            )
+        finally:
+            for plan in plans.values():
+                self._release_pairs(plan, plan["flights"])
+        for mode, rows in groups.items():
+            block = plans[mode]["block"]
+            stale = np.isnan(block) & ~np.isnan(plans[mode]["stale"])
+            if stale.any():
+                self.cache.stale_served += int(np.count_nonzero(stale))
+                block[stale] = plans[mode]["stale"][stale]
+            matrix[rows] = block
+        return self._complete_matrix(matrix, origins, destinations, groups)
+
+    def _complete_matrix(self, matrix: np.ndarray, origins: List[str], destinations: List[str], groups: Dict[str, List[int]]) -> np.ndarray:
+        """Fill pairs without a provider answer from the offline estimate, then the default"""
+        if self.estimator is not None and destinations:
+            for mode, rows in groups.items():
+                missing = np.isnan(matrix[rows])
+                if missing.any():
+                    estimates = self.estimator.estimate_matrix([origins[i] for i in rows], destinations, mode)
+                    matrix[rows] = np.where(missing, estimates, matrix[rows])
+        missing = np.isnan(matrix)
+        self.default_estimates += int(np.count_nonzero(missing))
+        matrix[missing] = DEFAULT_TRAVEL_MINUTES
+        return matrix.astype(int)
+
+    @staticmethod
+    def _roster_args(employees: List, patients: List) -> tuple:
+        return (
+            [full_address(emp) for emp in employees],
+            [emp.TransportMode.value.lower() for emp in employees],
+            [full_address(patient) for patient in patients]
+        )
+
+    async def roster_matrix_async(self, employees: List, patients: List) -> np.ndarray:
+        """Minutes from each employee (by their transport mode) to each patient, shape (employees, patients)"""
+        return await self.travel_matrix_async(*self._roster_args(employees, patients))
+
+    def _plan_matrix(self, origins: List[str], destinations: List[str], mode: str) -> Dict[str, Any]:
+        """Cached minutes for one mode: fresh ones in `block` and expired ones in `stale` (NaN where missing)"""
+        api_mode = self._map_transport_mode(mode)
+        now = datetime.now()
+        keys = [[self.cache.key(origin, destination, api_mode, now) for destination in destinations] for origin in origins]
+        block = np.full((len(origins), len(destinations)), np.nan)
+        stale = np.full((len(origins), len(destinations)), np.nan)
+        for i, row in enumerate(keys):
+            for j, key in enumerate(row):
+                minutes, fresh = self.cache.lookup(key)
+                if minutes is not None:
+                    (block if fresh else stale)[i, j] = minutes
+        return {
+            "origins": origins, "destinations": destinations, "api_mode": api_mode,
+            "departure": now, "keys": keys, "block": block, "stale": stale
+        }
+
+    def _claim_pairs(self, plan: Dict[str, Any]) -> List[tuple]:
+        """
+        Register the plan's missing pairs as in flight and add the Distance
+        Matrix chunks, within the API limits, that cover them. Pairs another
+        lookup already has in flight are not requested again; they are
+        returned as (plan, i, j, future) to await instead.
+        """
+        loop = asyncio.get_running_loop()
+        block, keys = plan["block"], plan["keys"]
+        flights: Dict[tuple, asyncio.Future] = {}
+        waits = []
+        for i, j in zip(*np.nonzero(np.isnan(block))):
+            key = keys[i][j]
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                waits.append((plan, i, j, flight))
+            else:
+                flights[(i, j)] = self._in_flight[key] = loop.create_future()
+        plan["flights"] = flights
+
+        # Only origins and destinations with a claimed pair are requested
+        rows = sorted({i for i, _ in flights})
+        cols = sorted({j for _, j in flights})
+        row_size = min(MATRIX_MAX_ORIGINS, len(rows)) or 1
+        col_size = max(1, min(MATRIX_MAX_DESTINATIONS, MATRIX_MAX_ELEMENTS // row_size))
+        plan["chunks"] = [
+            (rows[r:r + row_size], cols[c:c + col_size])
+            for r in range(0, len(rows), row_size)
+            for c in range(0, len(cols), col_size)
+        ]
+        return waits
+
+    def _release_pairs(self, plan: Dict[str, Any], flights: Dict[tuple, asyncio.Future]):
+        """Answer the waiters on claimed pairs (None if unanswered) and drop them from the in-flight registry"""
+        for (i, j), flight in list(flights.items()):
+            key = plan["keys"][i][j]
+            if self._in_flight.get(key) is flight:
+                del self._in_flight[key]
+            if not flight.done():
+                minutes = plan["block"][i, j]
+                flight.set_result(None if np.isnan(minutes) else int(minutes))
+
+    @staticmethod
+    def _chunk_args(plan: Dict[str, Any], chunk: tuple) -> tuple:
+        row_chunk, col_chunk = chunk
+        return (
+            [plan["origins"][i] for i in row_chunk], [plan["destinations"][j] for j in col_chunk],
+            plan["api_mode"], plan["departure"]
+        )
+
+    def _fill_chunk(self, plan: Dict[str, Any], chunk: tuple, minutes: Optional[List[List[Optional[int]]]]) -> List[tuple]:
+        """Copy a chunk's answers for its claimed pairs into the plan's block; returns those pairs"""
+        block, flights = plan["block"], plan["flights"]
+        pairs = []
+        for a, i in enumerate(chunk[0]):
+            for b, j in enumerate(chunk[1]):
+                if (i, j) not in flights:
+                    continue
+                if minutes is not None and minutes[a][b] is not None:
+                    block[i, j] = minutes[a][b]
+                pairs.append((i, j))
+        return pairs
+
+    def _distance_matrix(self, origins: List[str], destinations: List[str], api_mode: str, departure: datetime) -> List[List[Optional[int]]]:
+        """Minutes from one Distance Matrix request (None per element without an answer)"""
+        self.matrix_calls += 1
+        self.matrix_elements += len(origins) * len(destinations)
+        minutes = [[None] * len(destinations) for _ in origins]
+        try:
+            response = self.client.distance_matrix(origins, destinations, mode=api_mode, departure_time=departure)
+            for a, row in enumerate(response.get("rows", [])[:len(origins)]):
+                for b, element in enumerate(row.get("elements", [])[:len(destinations)]):
+                    if element.get("status") == "OK":
+                        minutes[a][b] = int(element["duration"]["value"] / 60)  # in seconds
         except Exception as e:
-            logger.error(f"Error calculating travel time: {str(e)}")
-            return 15 
\ No newline at end of file
+            logger.error(f"Error calculating travel matrix: {str(e)}")
+        return minutes
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "matrix_calls": self.matrix_calls,
+            "matrix_elements": self.matrix_elements,
+            "default_estimates": self.default_estimates,
+            "timeouts": self.timeouts,
+            "coalesced": self.coalesced,
+            "max_concurrency": self.max_concurrency,
+            "call_timeout_seconds": self.call_timeout,
+            "rate_limit": self.rate_limiter.get_stats(),
+            "element_rate_limit": self.element_limiter.get_stats(),
+            "offline": self.estimator.get_stats() if self.estimator is not None else None,
+            "cache": self.cache.get_stats()
+        }
@@ -10,8 +10,35 @@ import {
   LightBulbIcon
 } from '@heroicons/react/24/outline';
 
+// Progress stages streamed by /assign-employee/stream
+const stageLabels = {
+  accepted: 'Request received',
+  parsed: 'Request understood',
+  shortlist: 'Candidates shortlisted',
+  travel_times: 'Travel times calculated',
+  selected: 'Employee selected'
+};
+
+const stageDetail = (stage, data) => {
+  switch (stage) {
+    case 'parsed':
+      return `${data.patient_id || 'Unknown patient'} · ${data.service_type || 'service not stated'}`;
+    case 'shortlist':
+      return `${data.shortlist.length} of ${data.candidates} available employees`;
+    case 'travel_times':
+      return `${Object.keys(data).length} employees`;
+    case 'selected':
+      return data.employee_id;
+    default:
+      return '';
+  }
+};
+
 function CreateAssignment() {
-  const { createAssignment, loading, error, clearError } = useStore();
+  const {
+    createAssignment, cancelAssignment, loading, error, clearError,
+    assignmentProgress, assignmentReasoning
+  } = useStore();
   const [prompt, setPrompt] = useState('');
   const [result, setResult] = useState(null);
 
@@ -92,7 +119,16 @@ function CreateAssignment() {
               />
             </div>
 
-            <div className="flex justify-end">
+            <div className="flex justify-end space-x-3">
+              {loading && (
+                <button
+                  type="button"
+                  onClick={cancelAssignment}
+                  className="px-6 py-3 rounded-lg font-medium text-gray-700 bg-white border border-gray-300 hover:bg-gray-50 transition-colors"
+                >
+                  Cancel
+                </button>
+              )}
               <button
                 type="submit"
                 disabled={loading || !prompt.trim()}
@@ -118,6 +154,28 @@ function CreateAssignment() {
           </form>
         </div>
 
+        {/* Streamed Progress */}
+        {loading && (
+          <div className="bg-white rounded-lg shadow-sm border border-gray-200 p-6">
+            <h3 className="text-lg font-medium text-gray-900 mb-4">Progress</h3>
+            <ul className="space-y-2">
+              {assignmentProgress.map(({ stage, elapsedMs, data }) => (
+                <li key={stage} className="flex items-center text-sm">
+                  <CheckCircleIcon className="h-4 w-4 text-green-600 mr-2" />
+                  <span className="font-medium text-gray-900">{stageLabels[stage] || stage}</span>
+                  <span className="ml-2 text-gray-600">{stageDetail(stage, data)}</span>
+                  <span className="ml-auto text-gray-400">{Math.round(elapsedMs)} ms</span>
+                </li>
+              ))}
+            </ul>
+            {assignmentReasoning && (
+              <pre className="mt-4 p-3 bg-gray-50 rounded-lg text-xs text-gray-600 whitespace-pre-wrap break-words">
+                {assignmentReasoning}
+              </pre>
+            )}
+          </div>
+        )}
+
         {/* Sample Prompts */}
         <div className="bg-white rounded-lg shadow-sm border border-gray-200 p-6">
           <div className="flex items-center mb-4">
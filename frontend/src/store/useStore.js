@@ -3,6 +3,31 @@ import axios from 'axios';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
+// One idempotency key per prompt, so resubmitting the same prompt is not
+// assigned twice by the backend
+const assignmentKeys = new Map();
+const idempotencyKeyFor = (prompt) => {
+  const normalized = prompt.trim().toLowerCase();
+  if (!assignmentKeys.has(normalized)) {
+    assignmentKeys.set(normalized, crypto.randomUUID());
+  }
+  return assignmentKeys.get(normalized);
+};
+
+// Aborts the assignment request being streamed
+let assignmentController = null;
+
+// Split a Server-Sent Events buffer into complete events and the remainder
+const parseEvents = (buffer) => {
+  const chunks = buffer.split('\n\n');
+  const rest = chunks.pop();
+  const events = chunks.map((chunk) => ({
+    stage: chunk.match(/^event: (.*)$/m)?.[1],
+    payload: JSON.parse(chunk.match(/^data: (.*)$/m)?.[1] || '{}')
+  }));
+  return { events, rest };
+};
+
 const useStore = create((set, get) => ({
   // State
   employees: [],
@@ -11,6 +36,8 @@ const useStore = create((set, get) => ({
   loading: false,
   error: null,
   uploadStatus: null,
+  assignmentProgress: [],
+  assignmentReasoning: '',
 
   // Actions
   setLoading: (loading) => set({ loading }),
@@ -97,33 +124,73 @@ const useStore = create((set, get) => ({
     }
   },
 
-  // Create assignment
+  // Create assignment, streaming each stage as the backend completes it
   createAssignment: async (prompt) => {
-    set({ loading: true, error: null });
+    assignmentController = new AbortController();
+    set({ loading: true, error: null, assignmentProgress: [], assignmentReasoning: '' });
     try {
-      const response = await axios.post(`${API_BASE_URL}/assign-employee`, {
-        prompt
+      const response = await fetch(`${API_BASE_URL}/assign-employee/stream`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKeyFor(prompt)
+        },
+        body: JSON.stringify({ prompt }),
+        signal: assignmentController.signal
       });
-      
-      if (response.data.success) {
+      if (!response.ok) {
+        const body = await response.json().catch(() => ({}));
+        throw new Error(body.detail || 'Failed to create assignment');
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let result = null;
+      while (!result) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        const { events, rest } = parseEvents(buffer + decoder.decode(value, { stream: true }));
+        buffer = rest;
+        for (const { stage, payload } of events) {
+          if (stage === 'token') {
+            set(state => ({ assignmentReasoning: state.assignmentReasoning + payload.data.text }));
+          } else if (stage === 'result' || stage === 'error') {
+            result = payload.data;
+          } else {
+            set(state => ({
+              assignmentProgress: [...state.assignmentProgress, { stage, elapsedMs: payload.elapsed_ms, data: payload.data }]
+            }));
+          }
+        }
+      }
+
+      if (result?.success) {
         // Add new assignment to state
         set(state => ({
-          assignments: [...state.assignments, response.data.assignment],
+          assignments: [...state.assignments, result.assignment],
           loading: false
         }));
-        return response.data;
+        return result;
       } else {
-        throw new Error(response.data.message);
+        throw new Error(result?.message || 'Assignment stream ended unexpectedly');
       }
     } catch (error) {
       set({ 
-        error: error.response?.data?.detail || error.message || 'Failed to create assignment',
+        error: error.name === 'AbortError' ? 'Assignment request cancelled' : error.message || 'Failed to create assignment',
         loading: false 
       });
       throw error;
+    } finally {
+      assignmentController = null;
     }
   },
 
+  // Cancel the assignment request in progress
+  cancelAssignment: () => {
+    assignmentController?.abort();
+  },
+
   // Generate weekly rota
   generateWeeklyRota: async () => {
     set({ loading: true, error: null });
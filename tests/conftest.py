@@ -0,0 +1,52 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# No network in the test run: the OpenAI endpoint refuses connections, so every
+# AI step takes its local fallback, and travel comes from the offline estimator
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("OPENAI_BASE_URL", "http://127.0.0.1:9/v1")
+os.environ.setdefault("OPENAI_MAX_RETRIES", "0")
+os.environ.setdefault("TRAVEL_PROVIDER", "offline")
+os.environ.setdefault("TRAVEL_CACHE_PERSIST", "false")
+
+from app.database import DatabaseManager  # noqa: E402
+from app.services.data_processor import DataProcessor  # noqa: E402
+from app.services.openai_service import OpenAIService  # noqa: E402
+from app.services.prompt_parser import PromptParser  # noqa: E402
+from app.services.rota_service import RotaService  # noqa: E402
+from app.services.travel_service import TravelService  # noqa: E402
+
+SAMPLE_DATA = ROOT / "input_files" / "Updated_Healthcare_Rota_System_Data.xlsx"
+
+
+async def build_services(data_dir: Path) -> SimpleNamespace:
+    """Services wired as in app.main, over a temporary database loaded with the sample data"""
+    db_manager = DatabaseManager(str(data_dir / "rota_operations.db"))
+    data_processor = DataProcessor(db_manager)
+    await data_processor.process_excel_file(str(SAMPLE_DATA))
+    openai_service = OpenAIService(
+        prompt_parser=PromptParser(patient_ids=lambda: [patient.PatientID for patient in data_processor.patients])
+    )
+    rota_service = RotaService(data_processor, openai_service, db_manager, TravelService())
+    return SimpleNamespace(
+        db_manager=db_manager,
+        data_processor=data_processor,
+        openai_service=openai_service,
+        rota_service=rota_service
+    )
+
+
+@pytest.fixture
+def services(tmp_path):
+    services = asyncio.run(build_services(tmp_path))
+    yield services
+    services.rota_service.close()
+    services.db_manager.close()
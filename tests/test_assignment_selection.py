@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services.openai_service import validated_selection
+
+
+def test_selection_requires_an_employee_id():
+    with pytest.raises(ValueError):
+        validated_selection({"reasoning": "no pick"})
+    with pytest.raises(ValueError):
+        validated_selection(["E001"])
+
+
+def test_selection_drops_malformed_optional_fields():
+    selection = validated_selection({
+        "employee_id": " E001 ",
+        "estimated_duration": "thirty",
+        "priority_score": 7,
+        "ranked_employee_ids": "E001,E002"
+    })
+    assert selection == {"employee_id": "E001", "priority_score": 7}
+
+
+@pytest.mark.parametrize("reply", ['{"reasoning": "no pick"}', '{"employee_id": 17}', '[]'])
+def test_malformed_reply_falls_back_to_local_selection(services, monkeypatch, reply):
+    async def chat(*args, **kwargs):
+        return reply
+
+    monkeypatch.setattr(services.openai_service, "_chat", chat)
+    patient = services.data_processor.patients[0]
+    result = asyncio.run(services.rota_service.propose_assignment(
+        f"Assign employee for patient {patient.PatientID} requiring personal care tomorrow"
+    ))
+    assert result["assignment"].patient_id == patient.PatientID
+    assert "local ranking" in result["assignment"].assignment_reason
+
+
+def test_selection_drops_booleans_and_negative_numbers():
+    selection = validated_selection({
+        "employee_id": "E001",
+        "estimated_duration": -30,
+        "priority_score": True,
+        "ranked_employee_ids": ["E001", 2, "E003"],
+        "reasoning": 42
+    })
+    assert selection == {"employee_id": "E001", "ranked_employee_ids": ["E001", "E003"], "reasoning": "42"}
+
+
+def test_batched_reply_skips_invalid_and_off_shortlist_selections(services, monkeypatch):
+    async def chat(*args, **kwargs):
+        return json.dumps({"selections": [
+            {"request_id": "r1", "employee_id": first.EmployeeID, "priority_score": -1},
+            {"request_id": "r2"},
+            {"request_id": "r3", "employee_id": "E999"},
+            "E001",
+            {"request_id": "r4", "employee_id": first.EmployeeID}
+        ]})
+
+    monkeypatch.setattr(services.openai_service, "_chat", chat)
+    first, second = services.data_processor.employees[:2]
+    patients = services.data_processor.patients
+    requests = [
+        {"key": key, "patient": patients[n], "service_type": "personal_care",
+         "candidates": [first, second], "travel_times": {first.EmployeeID: 12}}
+        for n, key in enumerate(["r1", "r2", "r3"])
+    ]
+
+    results = asyncio.run(services.openai_service.find_best_assignments_batch(requests))
+
+    # r2 has no pick, r3 picked outside its shortlist and r4 was never asked
+    assert list(results) == ["r1"]
+    assert results["r1"]["employee_id"] == first.EmployeeID
+    assert results["r1"]["estimated_travel_time"] == 12
+    assert "priority_score" not in results["r1"]
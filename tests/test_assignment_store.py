@@ -0,0 +1,54 @@
+from app.models.schemas import EmployeeAssignment, ServiceType
+from app.services.assignment_store import AssignmentStore
+
+
+def visit(employee_id, patient_id, start, day="2026-01-05", duration=30):
+    hours, minutes = divmod(int(start[:2]) * 60 + int(start[3:]) + duration, 60)
+    return EmployeeAssignment(
+        employee_id=employee_id,
+        employee_name=employee_id,
+        patient_id=patient_id,
+        patient_name=patient_id,
+        service_type=ServiceType.PERSONAL_CARE,
+        assigned_time=start,
+        estimated_duration=duration,
+        travel_time=10,
+        start_time=start,
+        end_time=f"{hours:02d}:{minutes:02d}",
+        priority_score=5.0,
+        assignment_reason="test",
+        assignment_date=day,
+        shift="Breakfast"
+    )
+
+
+def test_snapshot_changes_do_not_reach_the_original():
+    store = AssignmentStore()
+    first = store.add(visit("E001", "P001", "09:00"))
+    snapshot = store.snapshot()
+
+    snapshot.add(visit("E001", "P002", "10:00"))
+    snapshot.remove(first)
+
+    assert store.query(employee_id="E001") == [first]
+    assert store.employee_totals("E001")["visits"] == 1
+    assert store.horizon.count("E001", "2026-01-05") == 1
+    assert store.horizon.overlaps("E001", "2026-01-05", 9 * 60, 9 * 60 + 30)
+    assert not store.horizon.overlaps("E001", "2026-01-05", 10 * 60, 10 * 60 + 30)
+    assert snapshot.horizon.count("E001", "2026-01-05") == 1
+    assert not snapshot.horizon.overlaps("E001", "2026-01-05", 9 * 60, 9 * 60 + 30)
+
+
+def test_original_changes_do_not_reach_the_snapshot():
+    store = AssignmentStore()
+    store.add(visit("E001", "P001", "09:00"))
+    snapshot = store.snapshot()
+
+    store.add(visit("E001", "P002", "10:00"))
+    store.horizon.block("E002", "2026-01-05")
+
+    assert len(snapshot) == 1
+    assert snapshot.query(day="2026-01-05") == [1]
+    assert snapshot.horizon.count("E001", "2026-01-05") == 1
+    assert snapshot.horizon.has_capacity("E002", "2026-01-05", 8)
+    assert len(store.by_day("2026-01-05")) == 2
@@ -0,0 +1,89 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.models.schemas import QualificationEnum, ServiceType
+from app.services.candidate_pipeline import build_candidate_pipeline
+from app.services.schedule_horizon import ScheduleHorizon
+
+from test_assignment_store import visit
+
+
+class FakeTravel:
+    """Travel stand-in answering the same minutes for every employee and recording who was looked up"""
+
+    def __init__(self, minutes=20):
+        self.minutes = minutes
+        self.looked_up = []
+
+    async def roster_matrix_async(self, employees, patients):
+        self.looked_up.append([emp.EmployeeID for emp in employees])
+        return np.full((len(employees), len(patients)), self.minutes)
+
+
+def roster(services):
+    """Three employees free all day: a nurse, a carer and a carer with an expired certificate"""
+    base = services.data_processor.employees[0]
+    common = {"CertificateExpiryDate": "2030-01-01", "EarliestStart": "07:00", "LatestEnd": "22:00", "Shifts": "All"}
+    return [
+        base.model_copy(update={**common, "EmployeeID": "N1", "Qualification": QualificationEnum.NURSE}),
+        base.model_copy(update={**common, "EmployeeID": "C1", "Qualification": QualificationEnum.CARER}),
+        base.model_copy(update={**common, "EmployeeID": "C2", "Qualification": QualificationEnum.CARER,
+                                "CertificateExpiryDate": "2020-01-01"})
+    ]
+
+
+def request(services, service_type, **extra):
+    return {
+        "patient": services.data_processor.patients[0],
+        "service_type": service_type,
+        "assignment_date": "2026-01-05",
+        **extra
+    }
+
+
+def test_medicine_is_left_to_nurses(services):
+    pipeline = build_candidate_pipeline(FakeTravel(), ScheduleHorizon(), ["qualification"])
+
+    medicine = asyncio.run(pipeline.run(roster(services), request(services, ServiceType.MEDICINE)))
+    personal_care = asyncio.run(pipeline.run(roster(services), request(services, ServiceType.PERSONAL_CARE)))
+
+    assert [emp.EmployeeID for emp in medicine["candidates"]] == ["N1"]
+    assert len(personal_care["candidates"]) == 3
+    stats = pipeline.get_stats()
+    assert stats["runs"] == 2
+    stage = stats["stages"][0]
+    assert (stage["stage"], stage["evaluated"], stage["removed"]) == ("qualification", 6, 2)
+
+
+def test_travel_is_looked_up_for_survivors_only(services):
+    travel = FakeTravel(minutes=30)
+    horizon = ScheduleHorizon()
+    for n in range(8):
+        horizon.add(visit("C1", f"P{n:03d}", f"{7 + n:02d}:00"))
+    pipeline = build_candidate_pipeline(travel, horizon)
+
+    pending = request(services, ServiceType.PERSONAL_CARE, preferred_time="18:00")
+    result = asyncio.run(pipeline.run(roster(services), pending))
+
+    # C2's certificate has expired and C1 is at the daily maximum of 8 visits
+    assert [emp.EmployeeID for emp in result["candidates"]] == ["N1"]
+    assert travel.looked_up == [["N1"]]
+    assert pending["travel_times"] == {"N1": 30}
+    # Transport is the costly stage, so it runs after the cheap ones
+    assert result["stages"][-1]["stage"] == "transport"
+    assert sum(stage["removed"] for stage in result["stages"]) == 2
+
+
+def test_travel_over_the_cap_removes_the_candidate(services):
+    pipeline = build_candidate_pipeline(FakeTravel(minutes=50), ScheduleHorizon(), ["transport"])
+    result = asyncio.run(pipeline.run(roster(services)[:1], request(services, ServiceType.MEDICINE)))
+
+    assert result["candidates"] == []
+    assert pipeline.get_stats()["stages"][0]["removed"] == 1
+
+
+def test_unknown_stage_names_are_rejected():
+    with pytest.raises(ValueError, match="travel"):
+        build_candidate_pipeline(FakeTravel(), ScheduleHorizon(), ["qualification", "travel"])
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.deadline import DeadlineExceeded, deadline, remaining_budget
+from app.services.openai_service import OpenAIService
+
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker(window=4, failure_rate=0.5, min_calls=2, slow_ms=100, cooldown_seconds=0.05)
+    breaker.record(True, 10)
+    # A slow success counts as bad
+    breaker.record(True, 500)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # One probe at a time
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(True, 10)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+    stats = breaker.get_stats()
+    assert (stats["trips"], stats["probes"], stats["rejected"], stats["recent_calls"]) == (2, 2, 2, 0)
+
+
+def test_breaker_replaces_a_probe_that_never_reports():
+    breaker = CircuitBreaker(window=2, failure_rate=0.5, min_calls=1, cooldown_seconds=0.05)
+    breaker.record(False)
+    time.sleep(0.06)
+    assert breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.get_stats()["probes"] == 2
+
+
+def test_nested_deadlines_never_extend_the_outer_budget():
+    assert remaining_budget() is None
+    with deadline(0.2):
+        with deadline(5):
+            assert remaining_budget() <= 0.2
+        with deadline(None):
+            assert remaining_budget() <= 0.2
+    assert remaining_budget() is None
+
+
+def test_llm_calls_are_cut_off_at_the_deadline(monkeypatch):
+    service = OpenAIService(breaker=CircuitBreaker(min_calls=100))
+    created = []
+
+    async def slow_create(*args, **kwargs):
+        created.append(args)
+        await asyncio.sleep(1)
+
+    monkeypatch.setattr(service, "_create", slow_create)
+    messages = [{"role": "user", "content": "hello"}]
+
+    async def within(seconds):
+        with deadline(seconds):
+            started = time.monotonic()
+            with pytest.raises(DeadlineExceeded):
+                await service._chat(messages, 0.1)
+            return time.monotonic() - started
+
+    # The call is cut off early enough to leave the fallback its reserve
+    assert asyncio.run(within(0.3)) < 0.3
+    # With the budget already spent the LLM is not called at all
+    assert asyncio.run(within(0.05)) < 0.01
+    assert len(created) == 1
+    assert service.breaker.get_stats()["recent_failure_rate"] == 1.0
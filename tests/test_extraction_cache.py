@@ -0,0 +1,16 @@
+from app.services.extraction_cache import ExtractionCache, normalize_prompt
+
+
+def test_day_abbreviations_expand_only_as_days():
+    assert normalize_prompt("Patient P001 sat in a chair, needs exercise tmrw.") == "patient p001 sat in a chair, needs exercise tomorrow"
+    assert normalize_prompt("Visit P001 on Sat  at 10:00") == "visit p001 on saturday at 10:00"
+    assert normalize_prompt("visit p001 next fri or thurs") == "visit p001 next friday or thursday"
+    assert normalize_prompt("patient in the sun room") == "patient in the sun room"
+
+
+def test_spellings_of_one_prompt_share_an_entry():
+    cache = ExtractionCache(db_manager=None)
+    cache.put("Assign P001 exercise on Sat!", {"patient_id": "P001", "preferred_date": "saturday"})
+
+    assert cache.get("assign p001   exercise on saturday")["preferred_date"] == "saturday"
+    assert cache.get("assign p001 exercise sat") is None
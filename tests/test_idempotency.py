@@ -0,0 +1,55 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.services.request_coalescer import RequestCoalescer
+from conftest import build_services
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    with TestClient(main.app) as test_client:
+        # SQLite connections belong to the thread that opened them, so the
+        # services are built on the app's event loop thread
+        services = test_client.portal.call(build_services, tmp_path)
+        monkeypatch.setattr(main, "data_processor", services.data_processor)
+        monkeypatch.setattr(main, "rota_service", services.rota_service)
+        monkeypatch.setattr(main, "assignment_coalescer", RequestCoalescer())
+        # Flat travel times, so every sample patient has candidates
+        monkeypatch.setattr(services.rota_service.travel_service, "estimator", None)
+        test_client.services = services
+        yield test_client
+        services.rota_service.close()
+        test_client.portal.call(services.db_manager.close)
+
+
+def assign(client, prompt, key):
+    return client.post("/assign-employee", json={"prompt": prompt}, headers={"Idempotency-Key": key})
+
+
+def test_repeated_key_replays_the_original_result(client):
+    services = client.services
+    patient_id = services.data_processor.patients[1].PatientID
+    prompt = f"Assign employee for patient {patient_id} requiring personal care tomorrow"
+
+    first = assign(client, prompt, "visit-1")
+    # Whitespace and case do not change the request
+    repeat = assign(client, f"  {prompt.upper()} ", "visit-1")
+
+    assert first.status_code == repeat.status_code == 200
+    assert first.json()["success"]
+    assert repeat.json() == first.json()
+    assert len(services.rota_service.assignment_store) == 1
+    assert main.assignment_coalescer.get_stats()["replayed"] == 1
+
+
+def test_reusing_a_key_for_another_request_is_rejected(client):
+    services = client.services
+    patients = services.data_processor.patients
+    assert assign(client, f"Assign employee for patient {patients[1].PatientID} requiring personal care tomorrow", "visit-2").status_code == 200
+
+    reused = assign(client, f"Assign employee for patient {patients[2].PatientID} requiring personal care tomorrow", "visit-2")
+
+    assert reused.status_code == 422
+    assert "visit-2" in reused.json()["detail"]
+    assert len(services.rota_service.assignment_store) == 1
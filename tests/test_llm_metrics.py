@@ -0,0 +1,61 @@
+import asyncio
+import threading
+
+from app.database import DatabaseManager
+from app.services.llm_metrics import LLMMetrics
+
+
+def call(n, source="llm"):
+    return {
+        "operation": "find_best_assignment", "model": "gpt-4o-mini", "source": source,
+        "prompt_tokens": 100, "completion_tokens": 20, "estimated_prompt_tokens": 100,
+        "candidates_trimmed": 0, "retries": 0, "error": None, "duration_ms": float(n)
+    }
+
+
+def test_calls_are_written_in_batches_off_the_loop(tmp_path):
+    db_manager = DatabaseManager(str(tmp_path / "rota_operations.db"))
+    batches = []
+    log_llm_calls = db_manager.log_llm_calls
+
+    def spy(calls, max_rows):
+        batches.append((len(calls), threading.current_thread() is threading.main_thread()))
+        log_llm_calls(calls, max_rows)
+
+    db_manager.log_llm_calls = spy
+    metrics = LLMMetrics(db_manager=db_manager, max_rows=8, batch_size=4, flush_seconds=60)
+
+    async def scenario():
+        for n in range(10):
+            metrics.record(call(n, source="cache" if n % 2 else "llm"))
+        # Two full batches are on their way; the last two calls wait
+        assert metrics.get_stats()["persisted"]["pending"] == 2
+        return await metrics.recent_calls(100)
+
+    try:
+        recent = asyncio.run(scenario())
+        assert batches == [(4, False), (4, False), (2, False)]
+        # Only the newest max_rows calls are kept
+        assert [row["duration_ms"] for row in recent] == [9.0, 8.0, 7.0, 6.0, 5.0, 4.0, 3.0, 2.0]
+        assert metrics.get_stats()["operations"]["find_best_assignment"]["sources"] == {"llm": 5, "cache": 5}
+    finally:
+        asyncio.run(metrics.close())
+        db_manager.close()
+
+
+def test_a_partial_batch_is_written_after_flush_seconds(tmp_path):
+    db_manager = DatabaseManager(str(tmp_path / "rota_operations.db"))
+    metrics = LLMMetrics(db_manager=db_manager, batch_size=50, flush_seconds=0.05)
+
+    async def scenario():
+        metrics.record(call(1))
+        await asyncio.sleep(0.2)
+        await asyncio.gather(*list(metrics._writes))
+
+    try:
+        asyncio.run(scenario())
+        assert metrics.get_stats()["persisted"] == {"written": 1, "pending": 0}
+        assert len(db_manager.get_llm_calls()) == 1
+    finally:
+        metrics.executor.shutdown()
+        db_manager.close()
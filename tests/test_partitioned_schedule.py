@@ -0,0 +1,43 @@
+import asyncio
+
+from app.services.rota_validator import RULES
+
+
+def error_counts(report):
+    return {
+        rule: count
+        for rule, count in report["violation_counts"].items()
+        if count and RULES[rule][1] == "error"
+    }
+
+
+def test_partitioned_schedule_passes_validation(services):
+    rota_service = services.rota_service
+    assignments = asyncio.run(rota_service.generate_weekly_schedule(partitioned=True, days=3))
+
+    report = rota_service.validate_rota()
+    assert assignments
+    assert report["checked"] == len(assignments)
+    assert error_counts(report) == {}
+    assert report["valid"]
+
+
+def test_partitions_and_reconciliation_share_the_service_workers(services, monkeypatch):
+    rota_service = services.rota_service
+    executor = rota_service.partition_executor
+    submitted = []
+    submit = executor.submit
+
+    def counting_submit(fn, *args, **kwargs):
+        submitted.append(args[0]["key"])
+        return submit(fn, *args, **kwargs)
+
+    monkeypatch.setattr(executor, "submit", counting_submit)
+    asyncio.run(rota_service.generate_weekly_schedule(partitioned=True, days=2))
+    asyncio.run(rota_service.generate_weekly_schedule(partitioned=True, week_start="2030-01-07", days=1))
+
+    assert rota_service.partition_executor is executor
+    assert rota_service.fork().partition_executor is executor
+    # Every solve, reconciliation included, ran in the worker processes
+    assert any(key.endswith("/reconciliation") for key in submitted)
+    assert len({key.split("/")[0] for key in submitted}) == 3
@@ -0,0 +1,51 @@
+from app.models.schemas import ServiceType
+from app.services.prompt_compiler import PromptCompiler, read_table
+
+
+def candidate_ids(compiled):
+    return [row["id"] for row in read_table(compiled["messages"][1]["content"], "Candidates:")]
+
+
+def request_candidates(compiled):
+    rows = read_table(compiled["messages"][1]["content"], "Requests:")
+    return {row["request_id"]: [pair.split(":")[0] for pair in row["candidates"].split()] for row in rows}
+
+
+def test_selection_drops_the_lowest_ranked_candidates_to_fit_the_budget(services):
+    patient = services.data_processor.patients[0]
+    employees = services.data_processor.employees[:10]
+    context = {"employee_travel_times": {emp.EmployeeID: 10 for emp in employees}}
+
+    full = PromptCompiler(token_budget=0).selection(patient, employees, ServiceType.EXERCISE, context)
+    budget = full["prompt_tokens"] - 50
+    trimmed = PromptCompiler(token_budget=budget).selection(patient, employees, ServiceType.EXERCISE, context)
+
+    assert candidate_ids(full) == [emp.EmployeeID for emp in employees]
+    assert trimmed["prompt_tokens"] <= budget
+    assert candidate_ids(trimmed) == [emp.EmployeeID for emp in employees[:trimmed["candidates"]]]
+    assert trimmed["trimmed"] == len(employees) - trimmed["candidates"] > 0
+    # The top candidate is always kept, however small the budget
+    tiny = PromptCompiler(token_budget=1).selection(patient, employees, ServiceType.EXERCISE, context)
+    assert candidate_ids(tiny) == [employees[0].EmployeeID]
+
+
+def test_batch_selection_trims_the_longest_candidate_lists_first(services):
+    patients = services.data_processor.patients
+    employees = services.data_processor.employees
+    requests = [
+        {"key": "r1", "patient": patients[0], "service_type": "exercise", "candidates": employees[:12], "travel_times": {}},
+        {"key": "r2", "patient": patients[1], "service_type": "exercise", "candidates": employees[:3], "travel_times": {}}
+    ]
+
+    full = PromptCompiler(token_budget=0).batch_selection(requests)
+    trimmed = PromptCompiler(token_budget=full["prompt_tokens"] - 40).batch_selection(requests)
+    kept = request_candidates(trimmed)
+
+    assert trimmed["prompt_tokens"] <= full["prompt_tokens"] - 40
+    assert kept["r2"] == [emp.EmployeeID for emp in employees[:3]]
+    assert kept["r1"] == [emp.EmployeeID for emp in employees[:len(kept["r1"])]]
+    assert 3 <= len(kept["r1"]) < 12
+    assert (trimmed["candidates"], trimmed["trimmed"]) == (len(kept["r1"]) + 3, 12 - len(kept["r1"]))
+
+    tiny = request_candidates(PromptCompiler(token_budget=1).batch_selection(requests))
+    assert tiny == {"r1": [employees[0].EmployeeID], "r2": [employees[0].EmployeeID]}
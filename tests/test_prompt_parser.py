@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+from app.models.schemas import ServiceType
+from app.services.prompt_parser import PromptParser
+
+
+def parser(*patient_ids):
+    return PromptParser(threshold=0.8, patient_ids=lambda: list(patient_ids))
+
+
+def test_patient_reference_resolves_to_the_loaded_id():
+    ids = parser("P001", "P0042", "P12345")
+    assert ids.parse("patient p1 needs exercise today")["details"]["patient_id"] == "P001"
+    assert ids.parse("patient p42 needs exercise today")["details"]["patient_id"] == "P0042"
+    assert ids.parse("patient P12345 needs exercise today")["details"]["patient_id"] == "P12345"
+
+
+def test_unknown_or_ambiguous_patient_is_not_confident():
+    ids = parser("P012", "P0012")
+    assert ids.parse("patient p12 needs exercise today")["confidence"] < 0.8
+    assert ids.parse("patient p99 needs exercise today")["confidence"] < 0.8
+    assert ids.parse("patient p012 needs exercise today")["details"]["patient_id"] == "P012"
+
+
+def test_without_patient_ids_the_reference_is_kept():
+    assert PromptParser().parse("patient p0042 needs exercise")["details"]["patient_id"] == "P0042"
+
+
+def test_confident_prompts_take_the_fast_path():
+    ids = parser("P001")
+    details = ids.try_parse("The patient P001 is required Exercise today can you assign available employee.")
+    assert details == {
+        "patient_id": "P001",
+        "service_type": "exercise",
+        "preferred_time": None,
+        "preferred_date": "today",
+        "urgency": "medium"
+    }
+    assert ids.get_stats()["fast_path"] == 1
+
+
+def test_unclear_prompts_are_left_to_the_llm():
+    ids = parser("P001", "P002")
+    assert ids.try_parse("Someone needs a visit today") is None
+    assert ids.try_parse("Patient P001 needs exercise, not medicine, today") is None
+    assert ids.try_parse("Patient P001 and P002 need exercise today") is None
+    assert ids.try_parse("Patient P001 needs exercise at 09:00 or 15:00") is None
+    assert ids.get_stats()["fast_path"] == 0
+
+
+def test_extraction_only_calls_the_llm_below_the_threshold(services, monkeypatch):
+    calls = []
+
+    async def chat(messages, *args, **kwargs):
+        calls.append(messages[-1]["content"])
+        return json.dumps({"patient_id": "P001", "service_type": "exercise", "urgency": "medium"})
+
+    monkeypatch.setattr(services.openai_service, "_chat", chat)
+    extract = services.openai_service.extract_assignment_details
+
+    assert asyncio.run(extract("Patient P001 needs exercise today"))["patient_id"] == "P001"
+    assert calls == []
+    assert asyncio.run(extract("Please sort out a visit for the first patient"))["service_type"] == "exercise"
+    assert calls == ["Please sort out a visit for the first patient"]
+
+
+def test_prompts_read_medication_as_medicine_but_uploads_keep_the_baseline_keywords(services):
+    assert parser("P001").parse("patient p1 needs medication today")["details"]["service_type"] == "medicine"
+    # Upload parsing still only maps an explicit "medicine" service
+    assert services.data_processor._parse_services("Medication review, Medicine round, Exercise") == [
+        ServiceType.MEDICINE, ServiceType.EXERCISE
+    ]
@@ -0,0 +1,29 @@
+import asyncio
+import time
+
+from app.services.rate_limiter import TokenBucket
+
+
+def test_tokens_refill_at_the_configured_rate():
+    bucket = TokenBucket(rate=20, burst=2)
+
+    async def scenario():
+        # The burst is available at once, then one token every 1/rate seconds
+        started = time.monotonic()
+        assert await bucket.acquire() and await bucket.acquire()
+        assert time.monotonic() - started < 0.02
+        assert await bucket.acquire()
+        assert 0.04 <= time.monotonic() - started < 0.2
+        # A wait longer than the timeout is refused without sleeping
+        started = time.monotonic()
+        assert not await bucket.acquire(timeout=0.01)
+        assert time.monotonic() - started < 0.02
+        # Idle time refills the bucket, but never past the burst
+        await asyncio.sleep(0.3)
+        assert await bucket.acquire(2)
+        assert not await bucket.acquire(timeout=0)
+
+    asyncio.run(scenario())
+    stats = bucket.get_stats()
+    assert (stats["acquired"], stats["throttled"]) == (4, 2)
+    assert 0.04 <= stats["waited_seconds"] < 0.2
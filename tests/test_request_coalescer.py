@@ -0,0 +1,51 @@
+import asyncio
+
+from app.services.request_coalescer import RequestCoalescer
+
+
+def test_duplicate_survives_the_first_caller_disconnecting():
+    async def scenario():
+        coalescer = RequestCoalescer()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return "assigned"
+
+        first = asyncio.create_task(coalescer.run("k", "f", work))
+        await asyncio.sleep(0)
+        duplicate = asyncio.create_task(coalescer.run("k", "f", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await duplicate, runs, first.cancelled()
+
+    result, runs, first_cancelled = asyncio.run(scenario())
+    assert result == "assigned"
+    assert runs == [1]
+    assert first_cancelled
+
+
+def test_run_is_cancelled_with_its_last_waiter():
+    async def scenario():
+        coalescer = RequestCoalescer()
+        cancelled = []
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        waiter = asyncio.create_task(coalescer.run("k", "f", work))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0.01)
+        return cancelled, coalescer.get_stats()
+
+    cancelled, stats = asyncio.run(scenario())
+    assert cancelled == [1]
+    assert stats["in_flight"] == 0
+    assert stats["waiting"] == 0
+    assert stats["cached"] == 0
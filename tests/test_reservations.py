@@ -0,0 +1,128 @@
+import asyncio
+import json
+from collections import Counter
+
+import pytest
+
+from app.models.schemas import AssignmentRequestItem
+from app.services.assignment_store import AssignmentStore
+from app.services.reservations import ReservationConflict, ReservationManager
+from app.services.schedule_horizon import resolve_date
+
+from test_assignment_store import visit
+
+
+def test_concurrent_proposals_never_overbook(services, monkeypatch):
+    rota_service = services.rota_service
+    for employee in services.data_processor.employees:
+        monkeypatch.setattr(employee, "max_patients_per_day", 1)
+    # Flat travel times, so transport never removes anyone
+    monkeypatch.setattr(rota_service.travel_service, "estimator", None)
+
+    async def chat(*args, **kwargs):
+        # Every request picks the same employee while the others are in flight
+        await asyncio.sleep(0.01)
+        return json.dumps({"employee_id": "E009", "estimated_duration": 30})
+
+    monkeypatch.setattr(services.openai_service, "_chat", chat)
+    patients = services.data_processor.patients
+    prompts = [
+        f"Assign employee for patient {patients[i % len(patients)].PatientID} requiring personal care tomorrow"
+        for i in range(len(services.data_processor.employees) + 5)
+    ]
+
+    async def propose_all():
+        return await asyncio.gather(
+            *[rota_service.propose_assignment(prompt) for prompt in prompts],
+            return_exceptions=True
+        )
+
+    results = asyncio.run(propose_all())
+    assigned = [result["assignment"] for result in results if not isinstance(result, Exception)]
+    per_employee_day = Counter((a.employee_id, a.assignment_date) for a in assigned)
+
+    assert assigned
+    assert max(per_employee_day.values()) == 1
+    assert len(rota_service.assignment_store) == len(assigned)
+    assert rota_service.reservations.get_stats()["conflicts"] > 0
+    for (employee_id, day), count in per_employee_day.items():
+        assert rota_service.horizon.count(employee_id, day) == count
+
+
+def test_a_committed_hold_becomes_the_visit(services):
+    employee = services.data_processor.get_employee_by_id("E001")
+    store = AssignmentStore()
+    reservations = ReservationManager(store.horizon)
+    # An equal but separate visit is already booked on another day
+    store.add(visit("E001", "P001", "09:00", day="2026-01-06"))
+
+    with reservations.reserve(employee, lambda: visit("E001", "P001", "09:00")) as (held, hold):
+        with pytest.raises(ReservationConflict):
+            reservations.hold(employee, visit("E001", "P002", "09:15"))
+        store.add(held, hold=hold)
+
+    released = reservations.hold(employee, visit("E001", "P002", "10:00"))
+    reservations.release(released)
+
+    assert store.horizon.count("E001", "2026-01-05") == 1
+    assert store.horizon.employee_assignments("E001", "2026-01-05") == [held]
+    assert store.horizon.count("E001", "2026-01-06") == 1
+    assert reservations.get_stats() == {"held": 2, "committed": 1, "released": 1, "conflicts": 1}
+
+
+def test_batch_and_single_requests_share_the_reservations(services, monkeypatch):
+    rota_service = services.rota_service
+    for employee in services.data_processor.employees:
+        monkeypatch.setattr(employee, "max_patients_per_day", 1)
+    monkeypatch.setattr(rota_service.travel_service, "estimator", None)
+
+    async def chat(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return json.dumps({"employee_id": "E009", "estimated_duration": 30})
+
+    monkeypatch.setattr(services.openai_service, "_chat", chat)
+    patients = services.data_processor.patients
+    items = [AssignmentRequestItem(patient_id=patient.PatientID, preferred_date="tomorrow") for patient in patients]
+    prompts = [f"Assign employee for patient {patient.PatientID} requiring personal care tomorrow" for patient in patients[:5]]
+
+    async def run_all():
+        return await asyncio.gather(
+            rota_service.process_batch_requests(items),
+            *[rota_service.propose_assignment(prompt) for prompt in prompts],
+            return_exceptions=True
+        )
+
+    batch, *singles = asyncio.run(run_all())
+    assigned = [result["assignment"] for result in batch["results"] if result["success"]]
+    assigned += [result["assignment"] for result in singles if not isinstance(result, Exception)]
+    per_employee_day = Counter((a.employee_id, a.assignment_date) for a in assigned)
+
+    assert assigned
+    assert max(per_employee_day.values()) == 1
+    assert len(rota_service.assignment_store) == len(assigned)
+    assert rota_service.horizon._holds == {}
+
+
+def test_a_failing_batch_releases_its_holds(services, monkeypatch):
+    rota_service = services.rota_service
+    monkeypatch.setattr(rota_service.travel_service, "estimator", None)
+    travel_times = rota_service._travel_times
+    calls = []
+
+    async def failing_travel_times(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 3:
+            raise RuntimeError("travel provider down")
+        return await travel_times(*args, **kwargs)
+
+    monkeypatch.setattr(rota_service, "_travel_times", failing_travel_times)
+    items = [AssignmentRequestItem(patient_id=patient.PatientID, preferred_date="tomorrow") for patient in services.data_processor.patients[:5]]
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(rota_service.process_batch_requests(items))
+
+    assert rota_service.horizon._holds == {}
+    assert len(rota_service.assignment_store) == 0
+    tomorrow = resolve_date("tomorrow")
+    assert all(rota_service.horizon.count(employee.EmployeeID, tomorrow) == 0 for employee in services.data_processor.employees)
+    assert rota_service.reservations.get_stats()["released"] == 2
@@ -0,0 +1,54 @@
+from app.models.schemas import QualificationEnum, ServiceType
+from app.services.rota_validator import RULES, validate_rota
+
+from test_assignment_store import visit
+
+
+def people(services):
+    """A carer allowed two visits a day and an English-speaking patient"""
+    carer = services.data_processor.employees[0].model_copy(update={
+        "EmployeeID": "C1", "Qualification": QualificationEnum.CARER,
+        "CertificateExpiryDate": "2030-01-01", "max_patients_per_day": 2
+    })
+    patient = services.data_processor.patients[0].model_copy(update={"PatientID": "P1", "LanguagePreference": "English"})
+    return [carer], [patient]
+
+
+def test_clean_rota_is_valid(services):
+    employees, patients = people(services)
+    assignments = [visit("C1", "P1", "09:00").dict(), visit("C1", "P1", "10:00").dict()]
+
+    report = validate_rota(assignments, employees, patients)
+
+    assert report["valid"]
+    assert report["checked"] == 2
+    assert report["violations"] == []
+    assert set(report["violation_counts"]) == set(RULES)
+
+
+def test_each_broken_rule_is_reported_against_its_record(services):
+    employees, patients = people(services)
+    medicine = visit("C1", "P1", "12:00")
+    medicine.service_type = ServiceType.MEDICINE
+    assignments = [visit("C1", "P1", "09:00"), visit("C1", "P1", "09:15"), medicine]
+
+    report = validate_rota([a.dict() for a in assignments], employees, patients, record_ids=[11, 12, 13])
+
+    assert not report["valid"]
+    counts = report["violation_counts"]
+    assert (counts["overlap"], counts["capacity_exceeded"], counts["nurse_only_medicine"]) == (2, 3, 1)
+    assert sum(counts.values()) == 6
+    overlaps = sorted(v["record_id"] for v in report["violations"] if v["rule"] == "overlap")
+    assert overlaps == [11, 12]
+    medicine_violation = next(v for v in report["violations"] if v["rule"] == "nurse_only_medicine")
+    assert (medicine_violation["record_id"], medicine_violation["code"]) == (13, RULES["nurse_only_medicine"][0])
+
+
+def test_short_break_and_unknown_employee(services):
+    employees, patients = people(services)
+    assignments = [visit("C1", "P1", "09:00").dict(), visit("C1", "P1", "09:35").dict(), visit("X9", "P1", "09:00").dict()]
+
+    report = validate_rota(assignments, employees, patients, min_break=10)
+
+    counts = report["violation_counts"]
+    assert (counts["short_break"], counts["unknown_reference"], counts["overlap"]) == (1, 1, 0)
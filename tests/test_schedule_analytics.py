@@ -0,0 +1,38 @@
+from app.services.assignment_store import AssignmentStore
+from app.services.schedule_analytics import ScheduleAnalytics, gini
+
+from test_assignment_store import visit
+
+
+def test_gini_of_even_and_concentrated_loads():
+    assert gini([3, 3, 3]) == 0.0
+    assert gini([0, 0, 0]) == 0.0
+    assert round(gini([0, 0, 0, 4]), 4) == 0.75
+
+
+def test_metrics_and_caching_on_the_store_version(services):
+    employees = services.data_processor.employees
+    patient = services.data_processor.get_patient_by_id("P001")
+    store = AssignmentStore()
+    store.add(visit("E001", "P001", "09:00"))
+    store.add(visit("E001", "P001", "09:15"))
+    store.add(visit("E002", "P001", "10:00"))
+    analytics = ScheduleAnalytics()
+
+    result = analytics.get(store, employees, [patient])
+
+    assert result["total_assignments"] == 3
+    assert result["employees_involved"] == 2
+    assert result["conflicts"] == {"overlaps": 1, "over_capacity_days": 0}
+    assert result["travel"] == {"care_minutes": 90, "travel_minutes": 30, "travel_to_care_ratio": 0.3333}
+    assert result["workload_balance"]["idle_employees"] == len(employees) - 2
+    assert result["workload_balance"]["max_visits"] == 2
+    required = patient.RequiredHoursOfSupport * 60
+    assert result["coverage"]["required_minutes"] == required
+    assert result["coverage"]["shortfall_minutes"] == max(0, required - 90)
+
+    # Unchanged store: served from the cache; any change recomputes
+    assert analytics.get(store, employees, [patient]) is result
+    store.add(visit("E003", "P001", "11:00"))
+    assert analytics.get(store, employees, [patient])["total_assignments"] == 4
+    assert analytics.get_stats() == {"hits": 1, "misses": 2}
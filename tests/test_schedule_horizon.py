@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+
+from app.services.rota_service import RotaService
+from app.services.schedule_horizon import ScheduleHorizon
+
+from test_assignment_store import visit
+
+
+def test_next_free_start_skips_booked_visits():
+    horizon = ScheduleHorizon()
+    first = visit("E001", "P001", "09:00")
+    horizon.add(first)
+    horizon.add(visit("E001", "P002", "09:30"))
+
+    assert horizon.count("E001", "2026-01-05") == 2
+    assert horizon.next_free_start("E001", "2026-01-05", 9 * 60, 30) == 10 * 60
+    assert [a.patient_id for a in horizon.employee_assignments("E001", "2026-01-04", "2026-01-06")] == ["P001", "P002"]
+    assert len(horizon.shift_assignments("2026-01-05", "Breakfast")) == 2
+
+    # Removal is by identity: an equal copy is a different visit
+    horizon.remove(visit("E001", "P001", "09:00"))
+    assert horizon.count("E001", "2026-01-05") == 2
+    horizon.remove(first)
+    assert horizon.next_free_start("E001", "2026-01-05", 9 * 60, 30) == 9 * 60
+
+
+def test_startup_loads_only_the_active_window(services, monkeypatch):
+    today = date.today()
+    inside = (today + timedelta(days=1)).isoformat()
+    outside = (today - timedelta(days=400)).isoformat()
+    services.db_manager.log_assignments([
+        visit("E001", "P001", "09:00", day=inside).dict(),
+        visit("E001", "P002", "09:00", day=outside).dict()
+    ])
+
+    monkeypatch.setenv("ROTA_HORIZON_PAST_DAYS", "7")
+    monkeypatch.setenv("ROTA_HORIZON_FUTURE_DAYS", "14")
+    rota_service = RotaService(
+        services.data_processor, services.openai_service, services.db_manager, services.rota_service.travel_service
+    )
+
+    assert [a.patient_id for a in rota_service.current_assignments] == ["P001"]
+    # Reads outside the window go to the database without loading it
+    assert [a.patient_id for a in rota_service.employee_assignments("E001", outside)] == ["P002"]
+    assert [a.patient_id for a in rota_service.shift_assignments(outside, "Breakfast")] == ["P002"]
+    assert len(rota_service.assignment_store) == 1
+
+    # Scheduling for an outside date extends the window once, without duplicates
+    rota_service._ensure_loaded(outside, outside)
+    rota_service._ensure_loaded(outside, inside)
+    assert sorted(a.patient_id for a in rota_service.current_assignments) == ["P001", "P002"]
+    assert rota_service.horizon.count("E001", outside) == 1
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+
+from app.database import DatabaseManager
+from app.services import travel_cache
+from app.services.travel_cache import TravelCache
+from app.services.travel_service import TravelService
+
+
+class FakeMatrixClient:
+    """Distance Matrix stand-in answering 20 minutes for every pair after `delay` seconds"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.elements = 0
+        self.lock = threading.Lock()
+
+    def distance_matrix(self, origins, destinations, mode, departure_time):
+        with self.lock:
+            self.calls += 1
+            self.elements += len(origins) * len(destinations)
+        time.sleep(self.delay)
+        return {"rows": [{"elements": [{"status": "OK", "duration": {"value": 1200}} for _ in destinations]} for _ in origins]}
+
+
+def google_service(client, **kwargs):
+    service = TravelService(provider="offline", **kwargs)
+    service.client = client
+    return service
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(travel_cache.time, "time", lambda: now[0])
+    cache = TravelCache(ttl_seconds=60)
+    key = cache.key("1 A St, M1 1AA", "2 B St, S4 6DD", "driving")
+    cache.put(key, 12)
+
+    now[0] += 59
+    assert cache.get(key) == 12
+    now[0] += 2
+    assert cache.get(key) is None
+    # The expired value is still there to serve if a refresh fails
+    assert cache.lookup(key) == (12, False)
+    assert cache.get_stats()["refreshes"] == 2
+
+
+def test_entries_survive_a_restart(tmp_path):
+    db_manager = DatabaseManager(str(tmp_path / "rota_operations.db"))
+    try:
+        key = TravelCache().key("1 A St, M1 1AA", "2 B St, S4 6DD", "driving")
+        TravelCache(db_manager=db_manager).put(key, 17)
+
+        restarted = TravelCache(db_manager=db_manager)
+        assert restarted.get(key) == 17
+        assert restarted.get(key) == 17
+        stats = restarted.get_stats()
+        assert (stats["persistent_hits"], stats["hits"]) == (1, 1)
+    finally:
+        db_manager.close()
+
+
+def test_concurrent_lookups_share_one_provider_request():
+    service = google_service(FakeMatrixClient(delay=0.05), rate_limit=1000, element_rate_limit=10000)
+    origins = ["1 A St, M1 1AA", "3 C St, M2 2BB"]
+    destinations = ["2 B St, S4 6DD", "4 D St, S5 7EE", "5 E St, S6 8FF"]
+
+    async def lookups():
+        return await asyncio.gather(*[
+            service.travel_matrix_async(origins, ["car", "car"], destinations) for _ in range(5)
+        ])
+
+    matrices = asyncio.run(lookups())
+
+    assert service.client.calls == 1
+    assert service.client.elements == 6
+    assert service.coalesced == 4 * 6
+    assert all(matrix.tolist() == [[20, 20, 20], [20, 20, 20]] for matrix in matrices)
+    assert service._in_flight == {}
+
+
+def test_each_chunk_is_cached_in_one_write_off_the_loop(tmp_path):
+    db_manager = DatabaseManager(str(tmp_path / "rota_operations.db"))
+    writes = []
+    store = db_manager.store_cached_travel_many
+
+    def store_many(entries):
+        writes.append((len(entries), threading.current_thread() is threading.main_thread()))
+        store(entries)
+
+    db_manager.store_cached_travel_many = store_many
+    try:
+        service = google_service(FakeMatrixClient(), cache=TravelCache(db_manager=db_manager), rate_limit=1000, element_rate_limit=10000)
+        origins = [f"{n} A St, M1 1AA" for n in range(11)]
+        destinations = [f"{n} B St, S4 6DD" for n in range(10)]
+        asyncio.run(service.travel_matrix_async(origins, ["car"] * 11, destinations))
+
+        # 110 pairs need two requests of at most 100 elements (11x9 and 11x1), each written in one transaction
+        assert service.client.calls == 2
+        assert sorted(size for size, _ in writes) == [11, 99]
+        assert not any(on_loop for _, on_loop in writes)
+        assert TravelCache(db_manager=db_manager).get(service.cache.key(origins[10], destinations[9], "driving")) == 20
+    finally:
+        db_manager.close()
+
+
+def test_waiting_for_the_rate_limit_does_not_count_against_the_timeout():
+    # The second request waits 0.25s for a token, then takes 0.3s: over the
+    # timeout together, but each within it
+    service = google_service(FakeMatrixClient(delay=0.3), rate_limit=4, call_timeout=0.4, element_rate_limit=10000)
+    service.rate_limiter.burst = service.rate_limiter._tokens = 1
+
+    async def lookups():
+        return await asyncio.gather(
+            service.travel_matrix_async(["1 A St, M1 1AA"], ["car"], ["2 B St, S4 6DD"]),
+            service.travel_matrix_async(["3 C St, M2 2BB"], ["car"], ["4 D St, S5 7EE"])
+        )
+
+    first, second = asyncio.run(lookups())
+    assert service.timeouts == 0
+    assert first.tolist() == second.tolist() == [[20]]